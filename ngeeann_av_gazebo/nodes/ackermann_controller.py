@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 
-import threading, rospy, tf
+import threading, rospy, tf, math, time
 import numpy as np
-from ngeeann_av_msgs.msg import AckermannDrive
+from ngeeann_av_msgs.msg import AckermannDriveStamped, LatencySummary
+from sensor_msgs.msg import JointState
 from std_msgs.msg import Float64
 from controller_manager_msgs.srv import ListControllers
 
@@ -18,6 +19,18 @@ class _AckermannCtrlr(object):
         """Initialize this _AckermannCtrlr."""
 
         rospy.init_node("ackermann_controller")
+        startup_start = time.time()
+
+        # Startup timeout. A timeout of zero waits indefinitely for the controllers and transforms.
+        try:
+            startup_timeout = float(rospy.get_param("~startup_timeout", self._DEF_STARTUP_TIMEOUT))
+        except:
+            rospy.logwarn("The specified startup timeout value is invalid. The default timeout value will be used instead.")
+            startup_timeout = self._DEF_STARTUP_TIMEOUT
+        deadline = startup_start + startup_timeout if startup_timeout > 0.0 else None
+
+        # The transform listener fills its buffer in the background while the controllers are waited on.
+        tfl = tf.TransformListener()
 
         # Wheels
         (left_steer_link_name, left_steer_ctrlr_name, left_front_axle_ctrlr_name, self._left_front_inv_circ) = self._get_front_wheel_params("left")
@@ -29,10 +42,11 @@ class _AckermannCtrlr(object):
         (self._right_rear_link_name, right_rear_axle_ctrlr_name, self._right_rear_inv_circ) = self._get_rear_wheel_params("right")
 
         list_ctrlrs = rospy.ServiceProxy("controller_manager/list_controllers", ListControllers)
-        list_ctrlrs.wait_for_service()
+        list_ctrlrs.wait_for_service(None if deadline is None else max(deadline - time.time(), 0.001))
 
         # Shock absorbers
         shock_param_list = rospy.get_param("~shock_absorbers", [])
+        shock_eq_pos = []
         self._shock_pubs = []
 
         try:
@@ -52,8 +66,7 @@ class _AckermannCtrlr(object):
 
                 pub = rospy.Publisher(ctrlr_name + "/command", Float64,
                                       latch=True, queue_size=1)
-                _wait_for_ctrlr(list_ctrlrs, ctrlr_name)
-                pub.publish(eq_pos)
+                shock_eq_pos.append((ctrlr_name, eq_pos))
                 self._shock_pubs.append(pub)
         except:
             rospy.logwarn("The specified list of shock absorbers is invalid. "
@@ -79,12 +92,23 @@ class _AckermannCtrlr(object):
         # _last_cmd_time is the time at which the most recent Ackermann driving command was received.
         self._last_cmd_time = rospy.get_time()
 
-        # _ackermann_cmd_lock is used to control access to _steer_ang, _steer_ang_vel, _speed, and _accel.
+        # _ackermann_cmd_lock is used to control access to _steer_ang, _steer_ang_vel, _speed, _accel, and _trace.
         self._ackermann_cmd_lock = threading.Lock()
         self._steer_ang = 0.0      # Steering angle
         self._steer_ang_vel = 0.0  # Steering angle velocity
         self._speed = 0.0
         self._accel = 0.0          # Acceleration
+        self._trace = None         # Stamp of the scan the command originates from, and the time it was received
+
+        # The latencies of the joint commands are traced when the navigation parameters are loaded. Their
+        # percentiles are published every summary period, on the topic the navigation stages publish theirs to.
+        self._latency_pub = None
+        if rospy.has_param("/latency_trace"):
+            self._latency_period = float(rospy.get_param("/latency_trace/summary_period"))
+            self._latency_pub = rospy.Publisher("/ngeeann_av/latency", LatencySummary, queue_size=10)
+        self._latencies = {"age": [], "hop": []}
+        self._last_trace_stamp = None
+        self._last_latency_summary = None
 
         self._last_steer_ang = 0.0  # Last steering angle
         self._theta_left = 0.0      # Left steering joint angle
@@ -99,30 +123,75 @@ class _AckermannCtrlr(object):
         self._left_rear_ang_vel = 0.0
         self._right_rear_ang_vel = 0.0
 
+        # Wait for every controller at once, then publish the shock absorbers' equilibrium positions.
+        ctrlr_names = [left_steer_ctrlr_name, right_steer_ctrlr_name, left_front_axle_ctrlr_name,
+                       right_front_axle_ctrlr_name, left_rear_axle_ctrlr_name, right_rear_axle_ctrlr_name]
+        _wait_for_ctrlrs(list_ctrlrs, [name for name in ctrlr_names if name] + [name for name, _ in shock_eq_pos], deadline)
+        ctrlr_time = time.time() - startup_start
+
+        for pub, (_, eq_pos) in zip(self._shock_pubs, shock_eq_pos):
+            pub.publish(eq_pos)
+
         # _joint_dist_div_2 is the distance between the steering joints, divided by two.
-        tfl = tf.TransformListener()
-        ls_pos = self._get_link_pos(tfl, left_steer_link_name)
-        rs_pos = self._get_link_pos(tfl, right_steer_link_name)
-        self._joint_dist_div_2 = np.linalg.norm(ls_pos - rs_pos) / 2
-        lrw_pos = self._get_link_pos(tfl, left_rear_link_name)
+        ls_pos = self._get_link_pos(tfl, left_steer_link_name, deadline)
+        rs_pos = self._get_link_pos(tfl, right_steer_link_name, deadline)
+        self._joint_dist_div_2 = float(np.linalg.norm(ls_pos - rs_pos)) / 2
+        lrw_pos = self._get_link_pos(tfl, left_rear_link_name, deadline)
         rrw_pos = np.array([0.0] * 3)
         front_cent_pos = (ls_pos + rs_pos) / 2     # Front center position
         rear_cent_pos = (lrw_pos + rrw_pos) / 2    # Rear center position
-        self._wheelbase = np.linalg.norm(front_cent_pos - rear_cent_pos)
-        self._inv_wheelbase = 1 / self._wheelbase  # Inverse of _wheelbase
-        self._wheelbase_sqr = self._wheelbase ** 2
+        self._wheelbase = float(np.linalg.norm(front_cent_pos - rear_cent_pos))
+
+        # Steering lookup table
+        try:
+            self._table_limit = float(rospy.get_param("~steering_table_limit", self._DEF_TABLE_LIMIT))
+            self._table_size = int(rospy.get_param("~steering_table_size", self._DEF_TABLE_SIZE))
+            if self._table_limit <= 0.0 or self._table_limit >= math.pi / 2 or self._table_size < 2:
+                raise ValueError()
+        except:
+            rospy.logwarn("The specified steering table is invalid. The default steering table will be used instead.")
+            self._table_limit = self._DEF_TABLE_LIMIT
+            self._table_size = self._DEF_TABLE_SIZE
+
+        # The angular velocity of each axle per unit of vehicle speed is the wheel's speed ratio over its circumference.
+        self._inv_circs = (self._left_front_inv_circ, self._right_front_inv_circ,
+                           self._left_rear_inv_circ, self._right_rear_inv_circ)
+        self._table_step = 2 * self._table_limit / (self._table_size - 1)
+        self._inv_table_step = 1 / self._table_step
+        self._steer_table = [self._steering_geometry(-self._table_limit + i * self._table_step)
+                             for i in range(self._table_size)]
+        self._steer_geom = self._steering_geometry(0.0)
 
         # Publishers and subscribers
 
-        self._left_steer_cmd_pub = _create_cmd_pub(list_ctrlrs, left_steer_ctrlr_name)
-        self._right_steer_cmd_pub = _create_cmd_pub(list_ctrlrs, right_steer_ctrlr_name)
+        # With joint group commands, every joint command is published in a single JointState message.
+        self._joint_group_cmds = bool(rospy.get_param("~joint_group_commands", False))
+
+        if self._joint_group_cmds:
+            # Joints without an axle controller are left out of the message.
+            self._joint_cmd_indices = [i for i, name in enumerate(ctrlr_names) if name]
 
-        self._left_front_axle_cmd_pub = _create_axle_cmd_pub(list_ctrlrs, left_front_axle_ctrlr_name)
-        self._right_front_axle_cmd_pub = _create_axle_cmd_pub(list_ctrlrs, right_front_axle_ctrlr_name)
-        self._left_rear_axle_cmd_pub = _create_axle_cmd_pub(list_ctrlrs, left_rear_axle_ctrlr_name)
-        self._right_rear_axle_cmd_pub = _create_axle_cmd_pub(list_ctrlrs, right_rear_axle_ctrlr_name)
+            self._joint_cmd = JointState()
+            self._joint_cmd.name = [rospy.get_param(ctrlr_names[i] + "/joint", ctrlr_names[i])
+                                    for i in self._joint_cmd_indices]
+            self._joint_cmd_pub = rospy.Publisher(rospy.get_param("~joint_group_topic", self._DEF_JOINT_GROUP_TOPIC),
+                                                  JointState, queue_size=1)
 
-        self._ackermann_cmd_sub = rospy.Subscriber("ackermann_cmd", AckermannDrive, self.ackermann_cmd_cb, queue_size=1)
+        else:
+            self._left_steer_cmd_pub = _create_cmd_pub(left_steer_ctrlr_name)
+            self._right_steer_cmd_pub = _create_cmd_pub(right_steer_ctrlr_name)
+
+            self._left_front_axle_cmd_pub = _create_axle_cmd_pub(left_front_axle_ctrlr_name)
+            self._right_front_axle_cmd_pub = _create_axle_cmd_pub(right_front_axle_ctrlr_name)
+            self._left_rear_axle_cmd_pub = _create_axle_cmd_pub(left_rear_axle_ctrlr_name)
+            self._right_rear_axle_cmd_pub = _create_axle_cmd_pub(right_rear_axle_ctrlr_name)
+
+        self._ackermann_cmd_sub = rospy.Subscriber("ackermann_cmd", AckermannDriveStamped, self.ackermann_cmd_cb,
+                                                   queue_size=1)
+
+        startup_time = time.time() - startup_start
+        rospy.loginfo("Ackermann controller started in %.2f s (controllers %.2f s, transforms %.2f s).",
+                      startup_time, ctrlr_time, startup_time - ctrlr_time)
 
     def spin(self):
         """Control the vehicle."""
@@ -133,12 +202,13 @@ class _AckermannCtrlr(object):
             t = rospy.get_time()
             delta_t = t - last_time
             last_time = t
+            trace = None
 
             if (self._cmd_timeout > 0.0 and
                 t - self._last_cmd_time > self._cmd_timeout):
                 # Too much time has elapsed since the last command. Stop the vehicle.
-                steer_ang_changed, center_y = self._ctrl_steering(self._last_steer_ang, 0.0, 0.001)
-                self._ctrl_axles(0.0, 0.0, 0.0, steer_ang_changed, center_y)
+                steer_ang_changed = self._ctrl_steering(self._last_steer_ang, 0.0, 0.001)
+                self._ctrl_axles(0.0, 0.0, 0.0, steer_ang_changed)
 
             elif delta_t > 0.0:
                 with self._ackermann_cmd_lock:
@@ -146,10 +216,29 @@ class _AckermannCtrlr(object):
                     steer_ang_vel = self._steer_ang_vel
                     speed = self._speed
                     accel = self._accel
-                steer_ang_changed, center_y = self._ctrl_steering(steer_ang, steer_ang_vel, delta_t)
-                self._ctrl_axles(speed, accel, delta_t, steer_ang_changed, center_y)
+                    trace = self._trace
+                steer_ang_changed = self._ctrl_steering(steer_ang, steer_ang_vel, delta_t)
+                self._ctrl_axles(speed, accel, delta_t, steer_ang_changed)
+
+            self._publish_cmds(trace)
+            self._sleep_timer.sleep()
+
+    def _publish_cmds(self, trace):
+        # Publish the steering and axle joint commands. trace is the stamp of the scan the commands originate
+        # from and the time its Ackermann driving command was received, or None when they follow no command.
 
-            # Publish the steering and axle joint commands.
+        if self._joint_group_cmds:
+            # Steering joints are commanded by position and axle joints by velocity. The unused field is NaN.
+            nan = float("nan")
+            cmds = (self._theta_left, self._theta_right, self._left_front_ang_vel, self._right_front_ang_vel,
+                    self._left_rear_ang_vel, self._right_rear_ang_vel)
+
+            self._joint_cmd.header.stamp = trace[0] if trace is not None else rospy.Time.now()
+            self._joint_cmd.position = [cmds[i] if i < 2 else nan for i in self._joint_cmd_indices]
+            self._joint_cmd.velocity = [cmds[i] if i >= 2 else nan for i in self._joint_cmd_indices]
+            self._joint_cmd_pub.publish(self._joint_cmd)
+
+        else:
             self._left_steer_cmd_pub.publish(self._theta_left)
             self._right_steer_cmd_pub.publish(self._theta_right)
 
@@ -165,23 +254,61 @@ class _AckermannCtrlr(object):
             if self._right_rear_axle_cmd_pub:
                 self._right_rear_axle_cmd_pub.publish(self._right_rear_ang_vel)
 
-            self._sleep_timer.sleep()
+        if self._latency_pub is not None and trace is not None:
+            self._trace_latency(*trace)
+
+    def _trace_latency(self, stamp, received):
+        # Record the age of the joint commands since their scan and the hop since their Ackermann driving command
+        # was received. Each scan is recorded once, at its first joint commands, and the percentiles of the
+        # latencies since the previous summary are published every summary period.
+
+        if stamp == self._last_trace_stamp:
+            return
+
+        self._last_trace_stamp = stamp
+        now = rospy.get_time()
+        self._latencies["age"].append(now - stamp.to_sec())
+        self._latencies["hop"].append(now - received)
+
+        if self._last_latency_summary is None:
+            self._last_latency_summary = now
+            return
+
+        if now - self._last_latency_summary < self._latency_period:
+            return
+
+        self._last_latency_summary = now
+
+        for latency in ("age", "hop"):
+            samples = np.array(self._latencies[latency])
+            self._latencies[latency] = []
+
+            msg = LatencySummary()
+            msg.header.stamp = rospy.Time.now()
+            msg.stage = "ackermann_controller"
+            msg.latency = latency
+            msg.count = len(samples)
+            msg.mean = samples.mean()
+            msg.p50, msg.p90, msg.p99 = np.percentile(samples, [50, 90, 99])
+            msg.max = samples.max()
+            self._latency_pub.publish(msg)
 
     def ackermann_cmd_cb(self, ackermann_cmd):
         """Ackermann driving command callback
 
         :Parameters:
-          ackermann_cmd : ackermann_msgs.msg.AckermannDrive
-            Ackermann driving command.
+          ackermann_cmd : ngeeann_av_msgs.msg.AckermannDriveStamped
+            Ackermann driving command, stamped with the scan it originates from.
         """
 
         self._last_cmd_time = rospy.get_time()
 
         with self._ackermann_cmd_lock:
-            self._steer_ang = ackermann_cmd.steering_angle
-            self._steer_ang_vel = ackermann_cmd.steering_angle_velocity
-            self._speed = ackermann_cmd.speed
-            self._accel = ackermann_cmd.acceleration
+            self._steer_ang = ackermann_cmd.drive.steering_angle
+            self._steer_ang_vel = ackermann_cmd.drive.steering_angle_velocity
+            self._speed = ackermann_cmd.drive.speed
+            self._accel = ackermann_cmd.drive.acceleration
+            self._trace = (ackermann_cmd.header.stamp, self._last_cmd_time)
 
     def _get_front_wheel_params(self, side):
         # Get front wheel parameters. Return a tuple containing the steering link name, 
@@ -218,18 +345,27 @@ class _AckermannCtrlr(object):
             rospy.logwarn("The specified wheel diameter is invalid. The default diameter will be used instead.")
             dia = self._DEF_WHEEL_DIA
 
-        return axle_ctrlr_name, 1 / (np.pi * dia)
+        return axle_ctrlr_name, 1 / (math.pi * dia)
 
-    def _get_link_pos(self, tfl, link):
-        # Return the position of the specified link, relative to the right rear wheel link.
+    def _get_link_pos(self, tfl, link, deadline):
+        # Return the position of the specified link, relative to the right rear wheel link. Block until the
+        # transform is available, warning every _TF_WAIT_PERIOD seconds, or until the deadline (if not None) passes.
+
+        while not rospy.is_shutdown():
+            wait = self._TF_WAIT_PERIOD if deadline is None else min(self._TF_WAIT_PERIOD, max(deadline - time.time(), 0.001))
 
-        while True:
             try:
+                tfl.waitForTransform(self._right_rear_link_name, link, rospy.Time(0), rospy.Duration(wait))
                 trans, not_used = tfl.lookupTransform(self._right_rear_link_name, link, rospy.Time(0))
                 return np.array(trans)
 
-            except:
-                pass
+            except tf.Exception:
+                if deadline is not None and time.time() >= deadline:
+                    raise rospy.ROSException("Timed out waiting for the transform from " + link + " to " + self._right_rear_link_name + ".")
+
+                rospy.logwarn("Waiting for the transform from " + link + " to " + self._right_rear_link_name + ".")
+
+        raise rospy.ROSInterruptException("Shut down while waiting for the transform from " + link + ".")
 
     def _ctrl_steering(self, steer_ang, steer_ang_vel_limit, delta_t):
         # Control the steering joints.
@@ -244,17 +380,53 @@ class _AckermannCtrlr(object):
         else:
             theta = steer_ang
 
-        # Compute the desired steering angles for the left and right front wheels.
-        center_y = self._wheelbase * np.tan((np.pi / 2) - theta)
+        # Look up the desired steering angles for the left and right front wheels.
         steer_ang_changed = theta != self._last_steer_ang
         if steer_ang_changed:
             self._last_steer_ang = theta
-            self._theta_left = _get_steer_ang(np.arctan(self._inv_wheelbase * (center_y - self._joint_dist_div_2)))
-            self._theta_right = _get_steer_ang(np.arctan(self._inv_wheelbase * (center_y + self._joint_dist_div_2)))
+            self._steer_geom = self._lookup_steering(theta)
+            self._theta_left = self._steer_geom[0]
+            self._theta_right = self._steer_geom[1]
+
+        return steer_ang_changed
+
+    def _steering_geometry(self, theta):
+        # Return the left and right steering joint angles, followed by the angular velocity of the left front,
+        # right front, left rear, and right rear axles per unit of vehicle speed, for the virtual front wheel's
+        # steering angle theta.
+
+        center_y = self._wheelbase * math.tan((math.pi / 2) - theta)
+        left_dist = center_y - self._joint_dist_div_2
+        right_dist = center_y + self._joint_dist_div_2
+        wheelbase_sqr = self._wheelbase ** 2
 
-        return steer_ang_changed, center_y
+        theta_left = _get_steer_ang(math.atan(left_dist / self._wheelbase))
+        theta_right = _get_steer_ang(math.atan(right_dist / self._wheelbase))
 
-    def _ctrl_axles(self, speed, accel_limit, delta_t, steer_ang_changed, center_y):
+        ratios = (math.sqrt(left_dist ** 2 + wheelbase_sqr) / abs(center_y),
+                  math.sqrt(right_dist ** 2 + wheelbase_sqr) / abs(center_y),
+                  left_dist / center_y,
+                  right_dist / center_y)
+
+        return (theta_left, theta_right) + tuple((2 * math.pi) * ratio * inv_circ
+                                                 for ratio, inv_circ in zip(ratios, self._inv_circs))
+
+    def _lookup_steering(self, theta):
+        # Interpolate the steering geometry of theta from the steering table. Angles outside the table are computed exactly.
+
+        x = (theta + self._table_limit) * self._inv_table_step
+        if x < 0.0 or x > self._table_size - 1:
+            return self._steering_geometry(theta)
+
+        i = min(int(x), self._table_size - 2)
+        f = x - i
+        a = self._steer_table[i]
+        b = self._steer_table[i + 1]
+
+        return (a[0] + f * (b[0] - a[0]), a[1] + f * (b[1] - a[1]), a[2] + f * (b[2] - a[2]),
+                a[3] + f * (b[3] - a[3]), a[4] + f * (b[4] - a[4]), a[5] + f * (b[5] - a[5]))
+
+    def _ctrl_axles(self, speed, accel_limit, delta_t, steer_ang_changed):
         # Control the axle joints.
 
         # Compute veh_speed, the vehicle's desired speed.
@@ -272,62 +444,73 @@ class _AckermannCtrlr(object):
         # Compute the desired angular velocities of the wheels.
         if veh_speed != self._last_speed or steer_ang_changed:
             self._last_speed = veh_speed
-            left_dist = center_y - self._joint_dist_div_2
-            right_dist = center_y + self._joint_dist_div_2
-
-            # Front
-            gain = (2 * np.pi) * veh_speed / abs(center_y)
-            r = np.sqrt(left_dist ** 2 + self._wheelbase_sqr)
-            self._left_front_ang_vel = gain * r * self._left_front_inv_circ
-            r = np.sqrt(right_dist ** 2 + self._wheelbase_sqr)
-            self._right_front_ang_vel = gain * r * self._right_front_inv_circ
+            geom = self._steer_geom
 
-            # Rear
-            gain = (2 * np.pi) * veh_speed / center_y
-            self._left_rear_ang_vel = gain * left_dist * self._left_rear_inv_circ
-            self._right_rear_ang_vel = gain * right_dist * self._right_rear_inv_circ
+            self._left_front_ang_vel = veh_speed * geom[2]
+            self._right_front_ang_vel = veh_speed * geom[3]
+            self._left_rear_ang_vel = veh_speed * geom[4]
+            self._right_rear_ang_vel = veh_speed * geom[5]
 
     _DEF_WHEEL_DIA = 1.0    # Default wheel diameter. Unit: meter.
     _DEF_EQ_POS = 0.0       # Default equilibrium position. Unit: meter.
     _DEF_CMD_TIMEOUT = 0.5  # Default command timeout. Unit: second.
     _DEF_PUB_FREQ = 30.0    # Default publishing frequency. Unit: hertz.
+    _DEF_TABLE_LIMIT = 1.0  # Default largest steering angle in the steering table. Unit: radian.
+    _DEF_TABLE_SIZE = 2001  # Default number of steering angles in the steering table.
+    _DEF_JOINT_GROUP_TOPIC = "joint_commands"  # Default topic of the joint group commands.
+    _DEF_STARTUP_TIMEOUT = 0.0  # Default startup timeout, where zero waits indefinitely. Unit: second.
+    _TF_WAIT_PERIOD = 5.0       # Period between warnings while waiting for a transform. Unit: second.
 # end _AckermannCtrlr
 
 
-def _wait_for_ctrlr(list_ctrlrs, ctrlr_name):
-    # Wait for the specified controller to be in the "running" state.
+_MIN_POLL_INTERVAL = 0.05  # Initial interval between controller polls. Unit: second.
+_MAX_POLL_INTERVAL = 0.5   # Largest interval between controller polls. Unit: second.
+
+
+def _wait_for_ctrlrs(list_ctrlrs, ctrlr_names, deadline):
+    # Wait for all of the specified controllers to be in the "running" state.
     # Commands can be lost if they are published before their controller is
-    # running, even if a latched publisher is used.
+    # running, even if a latched publisher is used. Every poll checks all of
+    # the controllers against a single list_controllers response, and the
+    # interval between polls grows by half up to _MAX_POLL_INTERVAL. The sleeps use
+    # wall time, since the simulation clock may not run until Gazebo has loaded.
+
+    pending = set(ctrlr_names)
+    interval = _MIN_POLL_INTERVAL
 
-    while True:
+    while not rospy.is_shutdown():
         response = list_ctrlrs()
-        for ctrlr in response.controller:
-            if ctrlr.name == ctrlr_name:
-                if ctrlr.state == "running":
-                    return
-                rospy.sleep(0.1)
-                break
+        pending.difference_update(ctrlr.name for ctrlr in response.controller if ctrlr.state == "running")
+        if not pending:
+            return
+
+        if deadline is not None and time.time() + interval > deadline:
+            raise rospy.ROSException("Timed out waiting for the controllers: " + ", ".join(sorted(pending)) + ".")
+
+        time.sleep(interval)
+        interval = min(1.5 * interval, _MAX_POLL_INTERVAL)
+
+    raise rospy.ROSInterruptException("Shut down while waiting for the controllers.")
 
 
-def _create_axle_cmd_pub(list_ctrlrs, axle_ctrlr_name):
+def _create_axle_cmd_pub(axle_ctrlr_name):
     # Create an axle command publisher.
 
     if not axle_ctrlr_name:
         return None
-    return _create_cmd_pub(list_ctrlrs, axle_ctrlr_name)
+    return _create_cmd_pub(axle_ctrlr_name)
 
-def _create_cmd_pub(list_ctrlrs, ctrlr_name):
+def _create_cmd_pub(ctrlr_name):
     # Create a command publisher.
 
-    _wait_for_ctrlr(list_ctrlrs, ctrlr_name)
     return rospy.Publisher(ctrlr_name + "/command", Float64, queue_size=1)
 
 def _get_steer_ang(phi):
     # Return the desired steering angle for a front wheel.
 
     if phi >= 0.0:
-        return (np.pi / 2) - phi
-    return (-np.pi / 2) - phi
+        return (math.pi / 2) - phi
+    return (-math.pi / 2) - phi
 
 def main():
 
@@ -2,18 +2,32 @@
 
 import rospy
 import threading
+import time
 import numpy as np
 
 from geometry_msgs.msg import Pose, Point, Quaternion
 from ngeeann_av_msgs.msg import State2D
+from ngeeann_av_msgs.srv import ClearanceQuery, ClearanceQueryResponse
 from nav_msgs.msg import OccupancyGrid
-from sensor_msgs.msg import LaserScan
+from sensor_msgs.msg import LaserScan, PointCloud2
+from utils.clearance import ClearanceMap
+from utils.latency_trace import LatencyTracer
+from utils.point_cloud import cloud_array, height_band
+from utils.roadmap import roadmap_grid
+from utils.scan_preprocessor import ScanPreprocessor
+from utils.shared_map import SharedMapWriter
+from utils.timing_stats import TimingStats
 
 class Map:
 
-    def __init__(self, origin_x=0, origin_y=0, resolution=0.2, width=650, height=650):
+    def __init__(self, origin_x=0, origin_y=0, resolution=0.2, width=650, height=650, decay_time=0.0):
         ''' 
         Constructs an empty occupancy grid upon initialization
+
+        Evidence decays towards unknown by exp(-t / decay_time), where a decay_time of zero disables the decay.
+        Every cell decays at the same rate, so the grid stores the evidence divided by a global scale, which
+        is the decay since scale_start. Decaying the whole map then costs nothing, and the evidence is only
+        recovered when cells are updated or the map is published.
         '''
         self.origin_x = origin_x
         self.origin_y = origin_y
@@ -22,75 +36,25 @@ class Map:
         self.height = height 
         self.grid = np.zeros((height, width))
 
+        self.decay_time = decay_time
+        self.scale_start = None
+
         # Creates occupied roadmap
-        self.roadmap = np.zeros((height, width))
-
-        # Lane Overrun Region
-        for r in np.arange(97, 100, 0.05):
-            for theta in np.arange(0, 0.5 * np.pi, 0.001):
-                x = r * np.cos(theta)
-                y = r * np.sin(theta)
-
-                try:
-                    ix = int((x - self.origin_x) / self.resolution)
-                    iy = int((y - self.origin_y) / self.resolution)
-                    self.roadmap[iy, ix] = 0.4
-
-                except:
-                    pass
-
-        for r in np.arange(107.5, 110.5, 0.05):
-            for theta in np.arange(0, 0.5*np.pi, 0.001):
-                x = r * np.cos(theta)
-                y = r * np.sin(theta)
-
-                try:
-                    ix = int((x - self.origin_x) / self.resolution)
-                    iy = int((y - self.origin_y) / self.resolution)
-                    self.roadmap[iy, ix] = 0.4
-
-                except:
-                    pass
-
-        # Add barriers
-        for r in np.arange(110.5, 110.75, 0.05):
-            for theta in np.arange(0, 0.5*np.pi, 0.001):
-                x = r * np.cos(theta)
-                y = r * np.sin(theta)
-
-                try:
-                    ix = int((x - self.origin_x) / self.resolution)
-                    iy = int((y - self.origin_y) / self.resolution)
-                    self.roadmap[iy, ix] = 0.8
-
-                except:
-                    pass
-
-        for r in np.arange(96.75, 97, 0.05):
-            for theta in np.arange(0, 0.5*np.pi, 0.001):
-                x = r * np.cos(theta)
-                y = r * np.sin(theta)
-
-                try:
-                    ix = int((x - self.origin_x) / self.resolution)
-                    iy = int((y - self.origin_y) / self.resolution)
-                    self.roadmap[iy, ix] = 0.8
-
-                except:
-                    pass
+        self.roadmap = roadmap_grid(origin_x, origin_y, resolution, width, height)
 
         print('Road map initialised.')
         
         self.mask = self.roadmap
+        self.occupancy = np.round(self.mask * 100)
     
-    def to_message(self):
+    def to_message(self, stamp=None):
         '''
-        Returns nav_msgs/OccupancyGrid representation of the map
+        Returns nav_msgs/OccupancyGrid representation of the map, stamped with the given time or the current time
         '''
         grid_msg = OccupancyGrid()
 
         # Set up the header.
-        grid_msg.header.stamp = rospy.Time.now()
+        grid_msg.header.stamp = stamp if stamp is not None else rospy.Time.now()
         grid_msg.header.frame_id = "map"
 
         # .info is a nav_msgs/MapMetaData message. 
@@ -109,11 +73,39 @@ class Map:
         # entries are given a different interpretation (like
         # log-odds).
         
-        self.mask = np.clip((self.roadmap + self.grid), 0, 1)
-        flat_grid = self.mask.reshape((self.grid.size,)) * 100
-        grid_msg.data = list(np.round(flat_grid))
+        self.mask = np.clip((self.roadmap + self.evidence()), 0, 1)
+        self.occupancy = np.round(self.mask * 100)
+        grid_msg.data = list(self.occupancy.reshape((self.grid.size,)))
         return grid_msg
 
+    def evidence_scale(self):
+        '''
+        Returns the global scale of the grid, which is the decay of the evidence since scale_start. Once the
+        scale is small enough to cost precision, it is folded into the grid and restarted from one.
+        '''
+        if self.decay_time <= 0.0:
+            return 1.0
+
+        now = rospy.get_time()
+
+        if self.scale_start is None:
+            self.scale_start = now
+
+        scale = np.exp(-(now - self.scale_start) / self.decay_time)
+
+        if scale < 1e-6:
+            self.grid *= scale
+            self.scale_start = now
+            scale = 1.0
+
+        return scale
+
+    def evidence(self):
+        '''
+        Returns the decayed occupancy evidence of every cell
+        '''
+        return self.grid * self.evidence_scale()
+
     def set_cell(self, x, y, val):
         '''
         Set the value of a cell in the grid. 
@@ -130,8 +122,177 @@ class Map:
             pass    # indicates map too small
 
         else:
-            self.grid[iy, ix] = self.grid[iy, ix] + val
-            self.grid[iy, ix] = np.clip(self.grid[iy, ix], 0, 1)
+            # The value and the bounds of the evidence are divided by the global scale of the grid
+            scale = self.evidence_scale()
+            self.grid[iy, ix] = self.grid[iy, ix] + val / scale
+            self.grid[iy, ix] = np.clip(self.grid[iy, ix], 0, 1 / scale)
+
+    def set_cells(self, points, val):
+        '''
+        Adds a value to every cell of the grid which contains a point. A cell containing several points
+        is updated once per point, which matches repeated calls to set_cell for values of the same sign.
+        Points are counted per cell with a single bincount over the span of the cells they fall in.
+
+        Arguments:
+            points  - Array of shape (2, N) of points in the map coordinate frame
+            val     - This is the value that should be added to each grid cell.
+        '''
+        ix = ((points[0] - self.origin_x) / self.resolution).astype(int)
+        iy = ((points[1] - self.origin_y) / self.resolution).astype(int)
+
+        inside = (ix >= 0) & (iy >= 0) & (ix < self.width) & (iy < self.height)
+        cells = iy[inside] * self.width + ix[inside]
+
+        if len(cells) == 0:
+            return
+
+        first = np.min(cells)
+        counts = np.bincount(cells - first)
+        cells = np.flatnonzero(counts)
+
+        # The value and the bounds of the evidence are divided by the global scale of the grid
+        scale = self.evidence_scale()
+        flat = self.grid.reshape(-1)
+        flat[cells + first] = np.clip(flat[cells + first] + val / scale * counts[cells], 0, 1 / scale)
+
+class ScanGeometry:
+
+    def __init__(self, angle_min, angle_increment, count, extrinsic):
+        '''
+            Unit vectors of every beam of a scan in the vehicle frame, which faces the y-axis, where a beam angle
+            of zero faces the front of the lidar. The beam angles of a lidar never change, so these are computed
+            once and reused for every scan with the same angle_min, angle_increment and number of ranges.
+
+            Arguments:
+                angle_min, angle_increment  - Angle of the first beam and the angle between beams of the scan
+                count                       - Number of beams in the scan
+                extrinsic                   - Pose (x, y, yaw) of the lidar in the vehicle frame
+        '''
+        self.angles = angle_min + angle_increment * np.arange(0, count)
+        self.directions = np.vstack((-np.sin(self.angles + extrinsic[2]), np.cos(self.angles + extrinsic[2])))
+        self.offset = np.array(((extrinsic[0],), (extrinsic[1],)))
+
+        # Index of the beam nearest to the front of the lidar
+        self.forward = int(np.argmin(np.abs(self.angles)))
+
+    def points(self, ranges):
+        '''
+            Returns the points of a scan in the vehicle frame as an array of shape (2, N)
+
+            Arguments:
+                ranges  - Array of the ranges of every beam
+        '''
+        return self.directions * ranges + self.offset
+
+class RangeSensor(object):
+
+    def __init__(self, name, topic, extrinsic):
+        '''
+            A range sensor mounted on the vehicle, which keeps only the latest message of its topic and the time
+            it arrived. Sensors arriving at different rates never wait for each other, and each message is
+            integrated once.
+
+            Arguments:
+                name        - Label used when printing the statistics
+                topic       - Topic of the sensor
+                extrinsic   - Pose (x, y, yaw) of the sensor in the vehicle frame, which faces the y-axis
+        '''
+        self.name = name
+        self.topic = topic
+        self.extrinsic = [float(value) for value in extrinsic]
+
+        self.arrival = None
+        self.integrated = None
+        self.received = None
+        self.stats = TimingStats(name)
+
+    def callback(self, msg):
+
+        self.arrival = (msg, rospy.get_time())
+
+    def latest(self):
+
+        ''' Returns the latest message if it has not been integrated yet, otherwise None '''
+
+        if self.arrival is None or self.arrival[0] is self.integrated:
+            return None
+
+        self.integrated, self.received = self.arrival
+        return self.integrated
+
+class ScanSensor(RangeSensor):
+
+    msg_type = LaserScan
+
+    def __init__(self, name, topic, extrinsic, preprocessor):
+        '''
+            A planar lidar publishing sensor_msgs/LaserScan, whose scans are preprocessed before integration
+
+            Arguments:
+                preprocessor    - ScanPreprocessor of the scans of this lidar
+        '''
+        super(ScanSensor, self).__init__(name, topic, extrinsic)
+
+        self.preprocessor = preprocessor
+
+        # Scan geometries keyed by the angle_min, angle_increment and number of ranges of a scan
+        self.geometries = {}
+
+    def geometry(self, scan):
+
+        ''' Returns the cached geometry of a scan, which is only computed for scans of a new shape '''
+
+        key = (scan.angle_min, scan.angle_increment, len(scan.ranges))
+
+        try:
+            return self.geometries[key]
+
+        except KeyError:
+            geometry = ScanGeometry(scan.angle_min, scan.angle_increment, len(scan.ranges), self.extrinsic)
+            self.geometries[key] = geometry
+            return geometry
+
+    def points(self, scan):
+
+        ''' Inverse range sensor model, which returns the returns of a scan in the vehicle frame '''
+
+        geometry = self.geometry(scan)
+        index, ranges, hits = self.preprocessor.process(scan.ranges, scan.range_min, scan.range_max, geometry)
+
+        return geometry.directions[:, index[hits]] * ranges[hits] + geometry.offset
+
+class PointCloudSensor(RangeSensor):
+
+    msg_type = PointCloud2
+
+    def __init__(self, name, topic, extrinsic, sensor_height, min_height, max_height):
+        '''
+            A multi-layer lidar publishing sensor_msgs/PointCloud2, whose points within a height band are integrated
+
+            Arguments:
+                sensor_height   - Height of the frame of the cloud above the ground
+                min_height      - Lowest height above the ground of an integrated point, which removes the ground
+                max_height      - Highest height above the ground of an integrated point
+        '''
+        super(PointCloudSensor, self).__init__(name, topic, extrinsic)
+
+        self.sensor_height = sensor_height
+        self.min_height = min_height
+        self.max_height = max_height
+
+        # The cloud faces its x-axis, as in REP 103, so it is turned to face the y-axis before the extrinsic applies
+        c = np.cos(self.extrinsic[2])
+        s = np.sin(self.extrinsic[2])
+        self.rotation = np.array(((c, -s), (s, c))).dot(np.array(((0.0, -1.0), (1.0, 0.0))))
+        self.offset = np.array(((self.extrinsic[0],), (self.extrinsic[1],)))
+
+    def points(self, cloud):
+
+        ''' Returns the points of a cloud within the height band in the vehicle frame '''
+
+        points = height_band(cloud_array(cloud), self.sensor_height, self.min_height, self.max_height)
+
+        return self.rotation.dot(points) + self.offset
 
 class GridMapping(object):
     
@@ -139,37 +300,113 @@ class GridMapping(object):
 
         try:
             self.planner_params = rospy.get_param("/bayesian_occupancy_filter")
-            self.cg2lidar = self.planner_params["centreofgravity_to_lidar"]
+            self.sensor_params = self.planner_params["sensors"]
+            self.preprocessing_params = self.planner_params["preprocessing"]
+            self.decay_time = self.planner_params["decay_time"]
+            self.decay_publish_period = self.planner_params["decay_publish_period"]
+            self.shared_memory = self.planner_params["shared_memory"]
+            self.occupied_threshold = self.planner_params["clearance"]["occupied_threshold"]
+            self.max_clearance = self.planner_params["clearance"]["max_distance"]
 
         except:
             raise Exception("Missing ROS parameters. Check the configuration file.")
 
         self.lock = threading.Lock()
-        self.scan = None
         self.x = None
         self.y = None
         self.yaw = None
 
-        self.gmap = Map()
+        self.gmap = Map(decay_time=self.decay_time)
+
+        # Range sensors fused into the map
+        self.sensors = [self.create_sensor(params) for params in self.sensor_params]
+        self.integration_stats = TimingStats("Integration")
+        self.tracer = LatencyTracer("bof")
+
+        # Newest scan of the published map, as its stamp and arrival time, and the time the map was published
+        self.last_trace = None
+        self.last_publish = None
+
+        # Same-host readers map the grid from shared memory instead of deserialising /map
+        if self.shared_memory:
+            self.shared_map = SharedMapWriter(self.shared_memory, self.gmap.width, self.gmap.height,
+                                              self.gmap.resolution, self.gmap.origin_x, self.gmap.origin_y)
+
+        else:
+            self.shared_map = None
+
+        # Corridor queries are answered against the latest published grid
+        self.clearance = ClearanceMap(self.gmap.roadmap, self.gmap.resolution, self.gmap.origin_x, self.gmap.origin_y,
+                                      self.occupied_threshold, self.max_clearance)
         
         # Initialise publishers
         self.viz_map_pub = rospy.Publisher('/map', OccupancyGrid, latch=True, queue_size=30)
 
         # Initialise subscribers
         rospy.Subscriber('/ngeeann_av/state2D', State2D, self.vehicle_state_cb)
-        rospy.Subscriber('/laser/scan', LaserScan, self.scan_cb)
 
-    def publish_map(self, gmap):
+        for sensor in self.sensors:
+            rospy.Subscriber(sensor.topic, sensor.msg_type, sensor.callback, queue_size=1)
+
+        # Initialise services
+        rospy.Service('/ngeeann_av/clearance', ClearanceQuery, self.clearance_cb)
+
+    def create_sensor(self, params):
+        '''
+            Returns the range sensor described by its parameters in the configuration file
+
+            Arguments:
+                params  - Parameters of a single sensor, whose model is either scan or point_cloud
+        '''
+        try:
+            name = params["name"]
+            model = params["model"]
+            topic = params["topic"]
+            extrinsic = params["extrinsic"]
+
+            if model == "scan":
+                # A scan sensor may override any of the default preprocessing parameters
+                preprocessing = dict(self.preprocessing_params)
+                preprocessing.update(params.get("preprocessing", {}))
+
+                return ScanSensor(name, topic, extrinsic, ScanPreprocessor(self.gmap.resolution, **preprocessing))
+
+            elif model == "point_cloud":
+                return PointCloudSensor(name, topic, extrinsic, params["sensor_height"], params["min_height"],
+                                        params["max_height"])
+
+        except KeyError:
+            raise Exception("Missing ROS parameters of a sensor. Check the configuration file.")
+
+        raise Exception("Unknown sensor model '{}'. Use scan or point_cloud.".format(model))
+
+    def publish_map(self, gmap, stamp, received):
         '''
-        Publishes map 
+        Publishes map, stamped with the newest scan integrated into it, which traces the latency of the pipeline
         '''
-        msg = gmap.to_message()
+        msg = gmap.to_message(stamp)
         self.viz_map_pub.publish(msg)
+        self.tracer.record(stamp, received)
+
+        self.last_trace = (stamp, received)
+        self.last_publish = rospy.get_time()
+
+        if self.shared_map is not None:
+            self.shared_map.write(gmap.occupancy, msg.header.stamp.to_sec())
+
+        self.clearance.update(gmap.mask, msg.header.stamp)
+
         print('Sent Map')
 
-    def scan_cb(self, data):
+    def clearance_cb(self, req):
+
+        ''' Returns the occupancy and clearance of a batch of corridors, checked in a single lookup '''
 
-        self.scan = data
+        corridors = [(np.array([(pose.x, pose.y) for pose in corridor.poses]), corridor.width)
+                     for corridor in req.corridors]
+        occupancy, clearance, stamp = self.clearance.query(corridors)
+
+        return ClearanceQueryResponse(occupancy.tolist(), clearance.tolist(), stamp if stamp is not None else rospy.Time())
 
     def vehicle_state_cb(self, data):
 
@@ -181,106 +418,105 @@ class GridMapping(object):
         self.yaw = data.pose.theta
         #self.lock.release()
 
-    def raycasting(self):
+    def raycasting(self, sensor, scan):
 
         # Lidar Properties
-        angle_min = self.scan.angle_min
-        angle_max = self.scan.angle_max
-        range_min = self.scan.range_min
-        range_max = self.scan.range_max #self.scan.range_max
-        angle_increment = self.scan.angle_increment
+        range_min = scan.range_min
+        geometry = sensor.geometry(scan)
 
-        print('Distance forwards = {}'.format(self.scan.ranges[360]))
-        
-        for i in range(0, len(self.scan.ranges)):
-            theta = i * angle_increment
+        index, ranges, hits = sensor.preprocessor.process(scan.ranges, range_min, scan.range_max, geometry)
+        start = time.time()
+
+        for i in range(0, len(index)):
 
             # Draws an individual line representitive of a single line of measurement within the LIDAR
             # If the distance is greater than the range measured in this direction, the cell is assumed occupied
             # If the distance is lower than the range measured, the cell is considered empty
+            # Misses and capped ranges only clear the cells along their beam
 
-            if (theta < np.pi * 0.25) or (theta > np.pi * 0.75):
-                range_max = 10
-            else:
-                range_max = self.scan.range_max
+            # Every sample along the beam is projected into the world frame at once
+            d = np.arange(range_min, ranges[i] + self.gmap.resolution, self.gmap.resolution)
+            points = self.frame_transform(geometry.directions[:, index[i]:index[i] + 1] * d + geometry.offset)
 
-            look_range = min(range_max, self.scan.ranges[i])
+            for k in range(0, len(d)):
+                if (d[k] < ranges[i]) or not hits[i]:
+                    self.gmap.set_cell(points[0, k], points[1, k], -0.5)
+                else:
+                    self.gmap.set_cell(points[0, k], points[1, k], 0.5)
+                    break
 
+        self.integration_stats.add(time.time() - start)
 
-            for d in np.arange(range_min, look_range + self.gmap.resolution, self.gmap.resolution):
+    def update(self):
+
+        '''
+            Integrates the new messages of every sensor into the map in a single batch, then publishes the map once.
+            While the sensors deliver nothing new, a decaying map is still republished every decay publish period,
+            so that readers see its evidence fade.
+        '''
 
-                # Determines position of detected point in vehicle frame
-                point_x = d*np.cos(theta)  
-                point_y = d*np.sin(theta)
-                transform = self.frame_transform(point_x, point_y)
+        if self.x is None:
+            return
 
-                try: 
-                    if (d < self.scan.ranges[i]):
-                        self.gmap.set_cell(transform[0], transform[1], -0.5)
-                    else:
-                        self.gmap.set_cell(transform[0], transform[1], 0.5)
-                        break
-                except:
-                    pass
+        batch = []
+        newest = None
 
-        self.publish_map(self.gmap)
+        for sensor in self.sensors:
+            msg = sensor.latest()
 
-    def inverse_range_sensor_model(self):
+            if msg is not None:
+                start = time.time()
+                batch.append(sensor.points(msg))
+                sensor.stats.add(time.time() - start)
 
-        # Lidar Properties
-        angle_min = self.scan.angle_min
-        angle_max = self.scan.angle_max
-        range_min = self.scan.range_min
-        range_max = self.scan.range_max
-        angle_increment = self.scan.angle_increment
+                if newest is None or msg.header.stamp > newest[0]:
+                    newest = (msg.header.stamp, sensor.received)
 
-        print('Distance forwards = {}'.format(self.scan.ranges[360]))
-        
-        for i in range(0, len(self.scan.ranges)):
-            
-            theta = i * angle_increment
-
-            # Only accepts data within the valid range of the lidar
-            if (self.scan.ranges[i] > range_min) and (self.scan.ranges[i] < range_max):
-            
-                # Determines position of detected point in vehicle frame
-                point_x = self.scan.ranges[i]*np.cos(theta)  
-                point_y = self.scan.ranges[i]*np.sin(theta)
-
-                # Determines point to be updated in global frame
-                transform = self.frame_transform(point_x, point_y)
-                self.gmap.set_cell(transform[0], transform[1], 0.5)
-
-        self.publish_map(self.gmap)
-        
-    def frame_transform(self, point_x, point_y):
+        # Without new data, the map only changes through the decay of its evidence
+        if not batch:
+            if (self.decay_time > 0.0 and self.last_trace is not None and
+                    rospy.get_time() - self.last_publish >= self.decay_publish_period):
+                self.publish_map(self.gmap, *self.last_trace)
+
+            return
+
+        start = time.time()
+        self.gmap.set_cells(self.frame_transform(np.hstack(batch)), 0.5)
+        self.integration_stats.add(time.time() - start)
+
+        self.publish_map(self.gmap, *newest)
+
+    def print_stats(self):
+
+        for sensor in self.sensors:
+            print("Sensor {}: {} messages integrated".format(sensor.name, sensor.stats.count))
+            print("    " + str(sensor.stats))
+
+            if isinstance(sensor, ScanSensor):
+                print(sensor.preprocessor)
+
+        print(self.integration_stats)
+        print(self.clearance.field_stats)
+        print(self.clearance.query_stats)
+        print(self.tracer)
+
+    def frame_transform(self, points):
         ''' 
-            Recieves position of a point in the vehicle frame, and the position and orientation of the
-            vehicle in the global frame. Returns position of the point in global frame
+            Recieves points in the vehicle frame, and the position and orientation of the vehicle in the
+            global frame. Returns the points in the global frame
 
             Arguments:
-                point_x, point_y   - Coordinates (x,y) of point in the vehicle frame
+                points             - Array of shape (2, N) of points in the vehicle frame, relative to the centre of gravity
                 self.x, self.y     - Coordinates (x,y) of vehicle centre of gravity in the world frame
                 self.yaw           - Yaw angle of the vehicle respect to global frame
-                self.cg2lidar      - Distance between the centre of gravity of the vehicle and lidar module
         '''
-        # Lidar position in world frame
-        lidar_x = self.x + self.cg2lidar * -np.sin(self.yaw)
-        lidar_y = self.y + self.cg2lidar * np.cos(self.yaw)
-        lidar_vect = np.array(((lidar_x), (lidar_y)))
-
         # Creates rotation matrix given theta
         c = np.cos(self.yaw)
         s = np.sin(self.yaw)
-        R = np.array(((c, -s), (s, c)))  
-
-        # Vector of point in vehicle frame
-        vp = np.array(((point_x), (point_y)))
+        R = np.array(((c, -s), (s, c)))
 
-        rotate = R.dot(vp)                  # rotation to allign with global frame
-        transform = rotate + lidar_vect     # translates point to global frame
-
-        return transform 
+        # Rotation to allign with global frame, then translation to the vehicle's position
+        return R.dot(points) + np.array(((self.x,), (self.y,)))
 
 def main():
     '''
@@ -290,15 +526,24 @@ def main():
 
     rospy.init_node("bof")
 
-    r = rospy.Rate(10)
+    if gridmapping.shared_map is not None:
+        rospy.on_shutdown(gridmapping.shared_map.close)
 
-    rospy.wait_for_message('/laser/scan', LaserScan)
+    r = rospy.Rate(10)
+    n = 0
 
     while not rospy.is_shutdown():
         try:
-            gridmapping.inverse_range_sensor_model()
+            gridmapping.update()
             r.sleep()
 
+            if n == 50:
+                gridmapping.print_stats()
+                n = 0
+
+            else:
+                n += 1
+
         except KeyboardInterrupt:
             print("\n")
             print("Shutting down ROS node...")
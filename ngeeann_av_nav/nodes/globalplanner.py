@@ -2,10 +2,10 @@
 
 import rospy
 import numpy as np
-import pandas as pd
 
 from geometry_msgs.msg import Pose2D, Pose, PoseArray
 from ngeeann_av_msgs.msg import Path2D, State2D
+from utils.route_manager import RouteManager
 
 class GlobalPathPlanner:
 
@@ -26,35 +26,42 @@ class GlobalPathPlanner:
             self.frequency = self.global_planner_params["update_frequency"]
             self.wp_ahead = self.global_planner_params["waypoints_ahead"]
             self.wp_behind = self.global_planner_params["waypoints_behind"]
+            self.heartbeat_period = self.global_planner_params["heartbeat_period"]
             self.passed_threshold = self.global_planner_params["passed_threshold"]
+            self.search_ahead = self.global_planner_params["search_window_ahead"]
+            self.search_behind = self.global_planner_params["search_window_behind"]
+            self.lost_threshold = self.global_planner_params["match_lost_threshold"]
+            self.closed_loop = self.global_planner_params["closed_loop"]
 
-            self.tracker_params = rospy.get_param("/path_tracker")
-            self.cg2frontaxle = self.tracker_params["centreofgravity_to_frontaxle"]
+            self.vehicle_params = rospy.get_param("/vehicle")
+            self.cg2frontaxle = self.vehicle_params["centreofgravity_to_frontaxle"]
 
             dir_path = rospy.get_param("/waypoints")
 
         except:
             raise Exception("Missing ROS parameters. Check the configuration file.")
 
-        # Get path to waypoints.csv
-        
-        df = pd.read_csv(dir_path)
+        # A route may be a single waypoint file or an ordered list of segment files
+        if not isinstance(dir_path, list):
+            dir_path = [dir_path]
 
         print("Waypoint directory: {}".format(dir_path))
 
-        # Import waypoints.csv into class variables ax and ay
-        self.ax = df['X-axis'].values.tolist()
-        self.ay = df['Y-axis'].values.tolist()
-        
-        # Class constants
-        self.waypoints = min(len(self.ax), len(self.ay))
-        self.wp_published = self.wp_ahead + self.wp_behind
+        # Route segments are loaded lazily by the route manager
+        self.route = RouteManager(dir_path, self.closed_loop, self.wp_ahead, self.wp_behind,
+                                  self.search_ahead, self.search_behind, self.lost_threshold)
         
         # Class variables to use whenever within the class when necessary
         self.x = None
         self.y = None
         self.theta = None
 
+        # Goal window currently held by the Local Path Planner
+        self.window_id = 0
+        self.window_px = None
+        self.window_py = None
+        self.last_publish_time = None
+
     def vehicle_state_cb(self, msg):
         ''' 
             Callback function to update vehicle state 
@@ -78,64 +85,58 @@ class GlobalPathPlanner:
             3. Preserves fixed number of points ahead or behind
 
             Parameters:
-                self.wp_ahead           - Indicates number of waypoints to look ahead
-                self.wp_behind          - Indicates number of waypoints to preserve behind the vehicle
-                self.wp_published       - Indicates the total number of waypoints published
+                self.route              - Route manager holding the active route segment
                 self.passed_threshold   - Indicates the distance after which a waypoint is considered passed
-                self.waypoints          - Total number of waypoints
         '''
 
         # Identify position of vehicle front axle
         fx = self.x + self.cg2frontaxle * -np.sin(self.theta)
         fy = self.y + self.cg2frontaxle * np.cos(self.theta)
 
-        dx = [fx - icx for icx in self.ax] # Find the x-axis of the front axle relative to the path
-        dy = [fy - icy for icy in self.ay] # Find the y-axis of the front axle relative to the path
-
-        d = np.hypot(dx, dy)        # Find the distance from the front axle to the path
-        closest_id = np.argmin(d)   # Returns the index with the shortest distance in the array
-
-        transform = self.frame_transform(self.ax[closest_id], self.ay[closest_id], fx, fy, self.theta)
-
-        if closest_id < 2:
-            # If the vehicle is starting along the path
-            print('Closest Waypoint #{} (Starting Path)'.format(closest_id))
-            px = self.ax[0: self.wp_published]
-            py = self.ay[0: self.wp_published]
-
-        elif closest_id > (self.waypoints - self.wp_published):
-            # If the vehicle is finishing the given set of waypoints
-            print('Closest Waypoint #{} (Terminating Path)'.format(closest_id))
-            px = self.ax[-self.wp_published:]
-            py = self.ay[-self.wp_published:]    
-
-        elif transform[1] < (0.0 - self.passed_threshold):
-            # If the vehicle has passed, closest point is preserved as a point behind the car
-            print('Closest Waypoint #{} (Passed)'.format(closest_id))
-            px = self.ax[closest_id - (self.wp_behind - 1) : closest_id + (self.wp_ahead + 1)]
-            py = self.ay[closest_id - (self.wp_behind - 1) : closest_id + (self.wp_ahead + 1)]
-
-        else:
-            # If the vehicle has yet to pass, a point behind the closest is preserved as a point behind the car
-            print('Closest Waypoint #{} (Approaching)'.format(closest_id))
-            px = self.ax[(closest_id - self.wp_behind) : (closest_id + self.wp_ahead)]
-            py = self.ay[(closest_id - self.wp_behind) : (closest_id + self.wp_ahead)]
-        
-        self.publish_goals(px, py)
+        closest_id = self.route.find_closest(fx, fy)
 
-    def start_end_condition(self, closest_id):
+        transform = self.frame_transform(self.route.ax[closest_id], self.route.ay[closest_id], fx, fy, self.theta)
+        passed = transform[1] < (0.0 - self.passed_threshold)
 
-        ''' [NOT IN USE] Dictates the goals published when vehicle is near the start / end of the waypoints list '''
+        # If the vehicle has passed, closest point is preserved as a point behind the car
+        # If the vehicle has yet to pass, a point behind the closest is preserved as a point behind the car
+        # Windows at the start and end of an open route are clamped by the route manager
+        px, py = self.route.window(closest_id, passed)
 
-        if (closest_id < self.wp_behind):
-            px = self.ax[0 : self.wp_ahead]
-            py = self.ay[0 : self.wp_ahead]
-            return px, py
+        window_id = self.window_id
+        self.update_goals(px, py)
 
-        elif  (closest_id > self.waypoints - 1):
-            px = self.ax[(self.waypoints - self.wp_ahead - 1) : self.waypoints]
-            py = self.ay[(self.waypoints - self.wp_ahead - 1) : self.waypoints]
-            return px, py
+        # The closest waypoint is only reported when it selects a new window, rather than on every cycle
+        if self.window_id != window_id:
+            print('Closest Waypoint #{} of segment #{}, lap {} ({})'.format(closest_id - self.route.offset, self.route.segment_id,
+                                                                          self.route.lap, 'Passed' if passed else 'Approaching'))
+
+    def update_goals(self, px, py):
+        ''' 
+            Publishes the selected window of goals only if it differs from the previously published window, or
+            as a heartbeat once every heartbeat period. Every new window is assigned the next window id so that
+            downstream nodes can recognise and skip duplicate windows.
+
+            Arguments:
+                px, py                  - Coordinates (x,y) of the selected window of goals
+
+            Parameters:
+                self.window_id          - Monotonically increasing id of the current window
+                self.heartbeat_period   - Time in seconds after which an unchanged window is published again
+        '''
+
+        now = rospy.get_time()
+
+        if self.window_px is None or not (np.array_equal(px, self.window_px) and np.array_equal(py, self.window_py)):
+            self.window_id += 1
+            self.window_px = np.copy(px)
+            self.window_py = np.copy(py)
+
+        elif (now - self.last_publish_time) < self.heartbeat_period:
+            return
+
+        self.publish_goals(px, py)
+        self.last_publish_time = now
 
     def frame_transform(self, point_x, point_y, axle_x, axle_y, theta):
         ''' 
@@ -165,6 +166,9 @@ class GlobalPathPlanner:
 
         waypoints = min(len(px), len(py))
         goals = Path2D()
+        goals.header.frame_id = "map"
+        goals.header.stamp = rospy.Time.now()
+        goals.window_id = self.window_id
 
         viz_goals = PoseArray()
         viz_goals.header.frame_id = "map"
@@ -173,14 +177,14 @@ class GlobalPathPlanner:
         for i in range(0, waypoints):
             # Appending to Target Goals
             goal = Pose2D()
-            goal.x = px[i]
-            goal.y = py[i]
+            goal.x = float(px[i])
+            goal.y = float(py[i])
             goals.poses.append(goal)
             
             # Appending to Visualization Path
             vpose = Pose()
-            vpose.position.x = px[i]
-            vpose.position.y = py[i]
+            vpose.position.x = float(px[i])
+            vpose.position.y = float(py[i])
             vpose.position.z = 0.0
             vpose.orientation
             viz_goals.poses.append(vpose)
@@ -188,7 +192,7 @@ class GlobalPathPlanner:
         self.goals_pub.publish(goals)
         self.goals_viz_pub.publish(viz_goals)
 
-        print("Total goals published: {}\n".format(waypoints))
+        print("Total goals published: {} (window #{})\n".format(waypoints, self.window_id))
         
 def main():
     
@@ -2,38 +2,160 @@
 
 import rospy
 import tf
+import time
 import numpy as np
 
+from gazebo_msgs.msg import ModelState, ModelStates
 from gazebo_msgs.srv import GetModelState  
+from geometry_msgs.msg import Twist, Vector3
 from nav_msgs.msg import Odometry
 from ngeeann_av_msgs.msg import State2D
+from utils.timing_stats import TimingStats
 
 class Localisation:
 
     def __init__(self):
 
-        # Wait and initialise service
-        rospy.wait_for_service('/ngeeann_av/gazebo/get_model_state') 
-        self.get_model_srv = rospy.ServiceProxy('/ngeeann_av/gazebo/get_model_state', GetModelState)
-
-        # Initialise publishers
-        self.localisation_pub = rospy.Publisher('/ngeeann_av/state2D', State2D, queue_size=10)
-        self.odom_pub = rospy.Publisher('/ngeeann_av/odom', Odometry, queue_size=10)
-
-        # Publishes artificial map frame
-        self.map_broadcaster = tf.TransformBroadcaster()
-
         # Load parameters
         try:
             self.localisation_params = rospy.get_param("/localisation")
             self.frequency = self.localisation_params["update_frequency"]
             self.model = self.localisation_params["model_name"]
+            self.mode = self.localisation_params["mode"]
+            self.source = self.localisation_params["source"]
+            self.source_topic = self.localisation_params["source_topic"]
+            self.max_frequency = self.localisation_params["max_frequency"]
 
         except:
             raise Exception("Missing ROS parameters. Check the configuration file.")
 
+        # Initialise publishers
+        self.localisation_pub = rospy.Publisher('/ngeeann_av/state2D', State2D, queue_size=10)
+        self.odom_pub = rospy.Publisher('/ngeeann_av/odom', Odometry, queue_size=10)
+
+        # Publishes artificial map frame
+        self.map_broadcaster = tf.TransformBroadcaster()
+
         # Class constants
         self.state = None
+        self.model_id = None
+        self.last_publish = None
+
+        # Timing statistics
+        self.latency_stats = TimingStats("Polling latency" if self.mode == "polling" else "Source latency")
+        self.process_stats = TimingStats("Processing time")
+        self.period_stats = TimingStats("Publish period")
+
+        if self.mode == "polling":
+            # Wait and initialise service
+            rospy.wait_for_service('/ngeeann_av/gazebo/get_model_state') 
+            self.get_model_srv = rospy.ServiceProxy('/ngeeann_av/gazebo/get_model_state', GetModelState)
+
+        # Any pose source streams either the Gazebo model states or an odometry message
+        elif self.source == "model_states":
+            self.source_sub = rospy.Subscriber(self.source_topic, ModelStates, self.model_states_cb, queue_size=1)
+
+        elif self.source == "odometry":
+            # The node would otherwise feed its own odometry back to itself
+            if self.source_topic == '/ngeeann_av/odom':
+                raise Exception("The odometry source cannot be the topic this node publishes to.")
+
+            self.source_sub = rospy.Subscriber(self.source_topic, Odometry, self.odometry_cb, queue_size=1)
+
+        else:
+            raise Exception("Unknown localisation source: {}".format(self.source))
+
+    def poll_state(self):
+
+        ''' Requests the vehicle state from Gazebo, which blocks for a full service round trip '''
+
+        start = time.time()
+        self.state = self.get_model_srv(self.model, '')
+        self.latency_stats.add(time.time() - start)
+
+        self.publish_state()
+
+    def model_states_cb(self, msg):
+
+        ''' Publishes the vehicle state as soon as Gazebo streams the states of its models '''
+
+        # The index of the vehicle only changes when models are spawned or deleted
+        if self.model_id is None or self.model_id >= len(msg.name) or msg.name[self.model_id] != self.model:
+            if self.model not in msg.name:
+                return
+
+            self.model_id = msg.name.index(self.model)
+
+        self.stream_state(ModelState(self.model, msg.pose[self.model_id], msg.twist[self.model_id], ''), None)
+
+    def odometry_cb(self, msg):
+
+        '''
+            Publishes the vehicle state as soon as an odometry message arrives. The twist of nav_msgs/Odometry is
+            in the child frame of the vehicle, as in REP 105, so its linear velocity is rotated by the planar yaw
+            of the pose into the world frame. The yaw rate is the same in both frames.
+        '''
+
+        pose = msg.pose.pose
+        twist = msg.twist.twist
+        yaw = 2.0 * np.arctan2(pose.orientation.z, pose.orientation.w)
+        c = np.cos(yaw)
+        s = np.sin(yaw)
+
+        # The message may be shared with other subscribers, so the world frame twist is a new message
+        world_twist = Twist(Vector3(c * twist.linear.x - s * twist.linear.y, s * twist.linear.x + c * twist.linear.y,
+                                    twist.linear.z), twist.angular)
+
+        self.stream_state(ModelState(self.model, pose, world_twist, ''), msg.header.stamp)
+
+    def stream_state(self, state, stamp):
+
+        ''' 
+            Publishes a streamed state, dropping states which arrive faster than the maximum frequency
+
+            Arguments:
+                state           - Pose and world frame twist of the vehicle
+                stamp           - Time at which the state was measured, if the source provides one
+        '''
+
+        now = time.time()
+
+        if self.max_frequency > 0.0 and self.last_publish is not None and now - self.last_publish < 1.0 / self.max_frequency:
+            return
+
+        if stamp is not None and not stamp.is_zero():
+            self.latency_stats.add((rospy.Time.now() - stamp).to_sec())
+
+        self.state = state
+        self.publish_state()
+
+    def publish_state(self):
+
+        ''' Publishes the latest state, its odometry and transform, and records the achieved rate '''
+
+        start = time.time()
+
+        if self.last_publish is not None:
+            self.period_stats.add(start - self.last_publish)
+
+        self.last_publish = start
+
+        self.update_state()
+        self.update_odom()
+
+        self.process_stats.add(time.time() - start)
+
+        if self.period_stats.count and self.period_stats.count % 100 == 0:
+            self.print_stats()
+
+    def print_stats(self):
+
+        mean_period = self.period_stats.summary()[0]
+
+        print("\nLocalisation mode: {} | achieved rate: {:.1f} Hz".format(self.mode, 1.0 / mean_period if mean_period else 0.0))
+        print(self.latency_stats)
+        print(self.process_stats)
+        print(self.period_stats)
 
     # Gets vehicle position from Gazebo and publishes data
     def update_state(self):
@@ -97,14 +219,17 @@ def main():
     # Initialise the node
     rospy.init_node('localisation')
 
+    # States are published from the subscriber callbacks when streaming
+    if localisation.mode != "polling":
+        rospy.spin()
+        return
+
     # Set update rate
     r = rospy.Rate(localisation.frequency)
     
     while not rospy.is_shutdown():
         try:
-            localisation.state = localisation.get_model_srv(localisation.model, '')
-            localisation.update_state()
-            localisation.update_odom()
+            localisation.poll_state()
             r.sleep()
 
         except KeyboardInterrupt:
@@ -4,11 +4,13 @@ import rospy
 import numpy as np
 
 from geometry_msgs.msg import PoseStamped, Pose2D
-from ngeeann_av_nav.msg import Path2D, State2D
+from ngeeann_av_msgs.msg import Path2D, State2D
 from nav_msgs.msg import Path, OccupancyGrid
 from std_msgs.msg import Float64
 from utils.heading2quaternion import heading_to_quaternion
 from utils.cubic_spline_interpolator import generate_cubic_path
+from utils.latency_trace import LatencyTracer
+from utils.shared_map import SharedMapReader
 
 class LocalPathPlanner:
 
@@ -21,11 +23,6 @@ class LocalPathPlanner:
         self.path_viz_pub = rospy.Publisher('/nggeeann_av/viz_path', Path, queue_size=10)
         self.target_vel_pub = rospy.Publisher('/ngeeann_av/target_velocity', Float64, queue_size=10)
 
-        # Initialise subscribers
-        self.goals_sub = rospy.Subscriber('/ngeeann_av/goals', Path2D, self.goals_cb, queue_size=10)
-        self.localisation_sub = rospy.Subscriber('/ngeeann_av/state2D', State2D, self.vehicle_state_cb, queue_size=10)
-        self.gridmap_sub = rospy.Subscriber('/map', OccupancyGrid, self.gridmap_cb, queue_size=10)
-
         # Load parameters
         try:
             self.planner_params = rospy.get_param("/local_path_planner")
@@ -33,10 +30,23 @@ class LocalPathPlanner:
             self.frame_id = self.planner_params["frame_id"]
             self.target_vel_def = self.planner_params["target_velocity"]
             self.car_width = self.planner_params["car_width"]
+            self.shared_map_name = self.planner_params["shared_map"]
 
         except:
             raise Exception("Missing ROS parameters. Check the configuration file.")
 
+        # Initialise subscribers
+        self.goals_sub = rospy.Subscriber('/ngeeann_av/goals', Path2D, self.goals_cb, queue_size=10)
+        self.localisation_sub = rospy.Subscriber('/ngeeann_av/state2D', State2D, self.vehicle_state_cb, queue_size=10)
+
+        # The map is read from shared memory when the BOF runs on the same host, otherwise it is received on /map
+        if self.shared_map_name:
+            self.shared_map = SharedMapReader(self.shared_map_name)
+
+        else:
+            self.shared_map = None
+            self.gridmap_sub = rospy.Subscriber('/map', OccupancyGrid, self.gridmap_cb, queue_size=10)
+
         # Class constants
         self.halfpi = np.pi / 2
         self.ds = 0.1
@@ -47,12 +57,39 @@ class LocalPathPlanner:
         self.target_vel = self.target_vel_def
         self.ax = []
         self.ay = []
-        self.gmap = OccupancyGrid()
+
+        # Flattened occupancy of the latest map, indexed in the row-major order of nav_msgs/OccupancyGrid
+        self.map_data = None
+        self.map_width = None
+        self.map_height = None
+        self.map_resolution = None
+        self.map_version = None
+
+        # Stamp of the scan the map originates from, and the time the map arrived
+        self.map_stamp = None
+        self.map_received = None
+        self.tracer = LatencyTracer("local_planner")
+
+        # Buffer the next map is copied into from shared memory, which only replaces the map once the copy succeeds
+        self.map_spare = None
+
+        # Start time of the node, and the segment and version found at startup, which a crashed run may have left
+        self.start_time = None
+        self.startup_map = None
+
+        # Goal window the cached cubic path was generated from
+        self.window_id = None
+        self.path_window_id = None
+        self.path = None
 
     def goals_cb(self, msg):
 
         ''' Callback function to receive waypoint data from the Global Path Planner '''
 
+        # Heartbeats repeat the window id of goals that have already been received
+        if msg.window_id == self.window_id:
+            return
+
         self.ax = []
         self.ay = []
         
@@ -62,7 +99,9 @@ class LocalPathPlanner:
             self.ax.append(px)
             self.ay.append(py)
 
-        print("\nGoals received: {}".format(len(msg.poses)))
+        self.window_id = msg.window_id
+
+        print("\nGoals received: {} (window #{})".format(len(msg.poses), msg.window_id))
 
     def vehicle_state_cb(self, msg):
 
@@ -74,32 +113,97 @@ class LocalPathPlanner:
 
     def gridmap_cb(self, msg):
 
-        self.gmap = msg
+        self.map_data = msg.data
+        self.map_width = msg.info.width
+        self.map_height = msg.info.height
+        self.map_resolution = msg.info.resolution
+        self.map_stamp = msg.header.stamp
+        self.map_received = rospy.get_time()
+
+    def update_map(self):
+        '''
+            Copies the map out of shared memory whenever its version has changed, so that it stays consistent for a
+            whole planning cycle. Returns whether a map is available.
+
+            A segment left in shared memory by a crashed run is not a valid map, so a map is only accepted once it
+            has been written since the node started, and its stamp is not older than the start of the node. The
+            previous map is kept while the copy fails, as when the BOF dies during a write.
+        '''
+
+        if self.shared_map is None:
+            return self.map_data is not None
+
+        if self.start_time is None:
+            self.start_time = rospy.get_time()
+
+        version = self.shared_map.version()
+
+        # The segment does not exist yet, or the BOF has not written its first map
+        if not version:
+            return self.map_data is not None
+
+        if self.startup_map is None:
+            self.startup_map = (self.shared_map.inode, version)
+
+        if version == self.map_version or (self.shared_map.inode, version) == self.startup_map:
+            return self.map_data is not None
+
+        if self.shared_map.stamp() < self.start_time:
+            return self.map_data is not None
+
+        if self.map_spare is None or self.map_spare.size != self.shared_map.grid.size:
+            self.map_spare = np.empty(self.shared_map.grid.size, dtype=np.int8)
+
+        width = self.shared_map.width
+        height = self.shared_map.height
+        resolution = self.shared_map.resolution
+        result = self.shared_map.copy(self.map_spare.reshape((height, width)))
+
+        if result is None or result[1] < self.start_time:
+            return self.map_data is not None
+
+        self.map_data, self.map_spare = self.map_spare, self.map_data
+        self.map_width = width
+        self.map_height = height
+        self.map_resolution = resolution
+        self.map_version = result[0]
+        self.map_stamp = rospy.Time.from_sec(result[1])
+        self.map_received = rospy.get_time()
+
+        return True
+
+    def map_values(self, p):
+
+        ''' Returns the occupancy of the cells at an array of flat indices of the map '''
+
+        # A map copied out of shared memory is indexed at once, while a map received on /map is a tuple
+        if isinstance(self.map_data, np.ndarray):
+            return self.map_data[p]
+
+        return np.array([self.map_data[k] for k in p.ravel()]).reshape(p.shape)
 
     def determine_path(self, cx, cy, cyaw):
 
-        width = self.gmap.info.width
-        height = self.gmap.info.height
-        resolution = self.gmap.info.resolution
+        width = self.map_width
+        height = self.map_height
+        resolution = self.map_resolution
         origin_x = self.origin_x
         origin_y = self.origin_y
-        collisions = []
         collide_id = None
 
         # Checks points along path
-        for n in range(150, len(cyaw) - 150):
+        n = np.arange(150, len(cyaw) - 150)
+        normal = np.asarray(cyaw)[n] - 0.5 * np.pi
 
-            # Draws swath of the vehicle
-            for i in np.arange(-0.5 * self.car_width, 0.5 * self.car_width, resolution):
+        # Draws swath of the vehicle, with a row of cells for every point along the path
+        i = np.arange(-0.5 * self.car_width, 0.5 * self.car_width, resolution)
+        ix = ((np.asarray(cx)[n, None] + i * np.cos(normal)[:, None] - origin_x) / resolution).astype(int)
+        iy = ((np.asarray(cy)[n, None] + i * np.sin(normal)[:, None] - origin_y) / resolution).astype(int)
+        p = iy * width + ix
 
-                ix = int((cx[n] + i*np.cos(cyaw[n] - 0.5 * np.pi) - origin_x) / resolution)
-                iy = int((cy[n] + i*np.sin(cyaw[n] - 0.5 * np.pi) - origin_y) / resolution)
-                p = iy * width + ix
+        # A point is listed once for every cell of its swath which is occupied
+        collisions = list(n[np.nonzero(self.map_values(p) != 0)[0]])
 
-                if (self.gmap.data[p] != 0):
-                    collisions.append(n)
-                    #print('\nPotential collision at ({}, {})'.format(cx[n], cy[n]))
-        
         if len(collisions) != 0:
             cx, cy, cyaw = self.collision_avoidance(collisions, cx, cy, cyaw)
 
@@ -134,7 +238,7 @@ class LocalPathPlanner:
         reroute_x = [dev_x1, dev_x2, avoid_x1, avoid_x2, intersect_x1, intersect_x2]
         reroute_y = [dev_y1, dev_y2, avoid_y1, avoid_y2, intersect_y1, intersect_y2]
         
-        rcx, rcy, rcyaw = generate_cubic_path(reroute_x, reroute_y, self.ds)
+        rcx, rcy, rcyaw, _ = generate_cubic_path(reroute_x, reroute_y, self.ds)
 
         # stiching to form new path
         cx   = np.concatenate(( cx[0 : collide_id - 151], rcx, cx[(collide_id_end + 151) : ] ))
@@ -151,9 +255,9 @@ class LocalPathPlanner:
         opening_dist = 0
         collide_view = []
 
-        resolution = self.gmap.info.resolution
-        width = self.gmap.info.width
-        height = self.gmap.info.height
+        resolution = self.map_resolution
+        width = self.map_width
+        height = self.map_height
         origin_x = self.origin_x
         origin_y = self.origin_y
 
@@ -163,7 +267,7 @@ class LocalPathPlanner:
             ix = int((cx[collide_id] + i*np.cos(cyaw[collide_id] - 0.5 * np.pi) - origin_x) / resolution)
             iy = int((cy[collide_id] + i*np.sin(cyaw[collide_id] - 0.5 * np.pi) - origin_y) / resolution)
             p = iy * width + ix
-            collide_view.append(self.gmap.data[p])
+            collide_view.append(self.map_data[p])
         
         print('\nCollision window constructed.')
         opening_width, opening_id = self.find_opening(collide_view)
@@ -216,12 +320,25 @@ class LocalPathPlanner:
 
         ''' Uses the cubic_spline_planner library to interpolate a cubic spline path over the given waypoints '''
 
-        cx, cy, cyaw, _ = generate_cubic_path(self.ax, self.ay, self.ds)
-        cx, cy, cyaw = self.determine_path(cx, cy, cyaw)
+        # The cubic path only has to be regenerated when a new window of goals has been received
+        if self.path_window_id != self.window_id:
+            self.path = generate_cubic_path(self.ax, self.ay, self.ds)
+            self.path_window_id = self.window_id
+
+        cx, cy, cyaw, _ = self.path
+
+        has_map = self.update_map()
+
+        if has_map:
+            cx, cy, cyaw = self.determine_path(cx, cy, cyaw)
 
         cells = min(len(cx), len(cy), len(cyaw))
 
+        # The path is stamped with the scan of the map it was checked against, which traces the latency of the pipeline
         target_path = Path2D()
+        target_path.header.frame_id = "map"
+        target_path.header.stamp = self.map_stamp if has_map else rospy.Time.now()
+        target_path.window_id = self.path_window_id
         
         viz_path = Path()
         viz_path.header.frame_id = "map"
@@ -249,6 +366,9 @@ class LocalPathPlanner:
         self.local_planner_pub.publish(target_path)
         self.path_viz_pub.publish(viz_path)
 
+        if has_map:
+            self.tracer.record(self.map_stamp, self.map_received)
+
 def main():
 
     ''' Main function to initialise the class and node. '''
@@ -264,7 +384,15 @@ def main():
 
     # Wait for messages
     rospy.wait_for_message('/ngeeann_av/goals', Path2D)
-    rospy.wait_for_message('/map', OccupancyGrid)
+
+    if local_planner.shared_map is None:
+        rospy.wait_for_message('/map', OccupancyGrid)
+
+    else:
+        print("Waiting for the map in shared memory segment {}...".format(local_planner.shared_map.path))
+
+        while not local_planner.update_map() and not rospy.is_shutdown():
+            rospy.sleep(0.1)
 
     while not rospy.is_shutdown():
         try:
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import threading
+import importlib
+import rospy
+
+from utils.composition import CompositionRospy
+
+def main():
+
+    ''' Runs the main function of every navigation node as a component of a single process '''
+
+    # Initialise the node
+    rospy.init_node('nav_container')
+
+    try:
+        composition_params = rospy.get_param("/composition")
+        components = composition_params["components"]
+
+    except:
+        raise Exception("Missing ROS parameters. Check the configuration file.")
+
+    # The state estimator and scan matcher replace the ground truth localisation, as they do without composition
+    if rospy.get_param("~state_estimator", False):
+        components = [name for name in components if name != "localisation"] + ["state_estimator", "scan_matcher"]
+
+    # The components must be imported after the shim is installed, so that they pick it up as rospy
+    shim = CompositionRospy(rospy)
+    shim.install()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    for name in components:
+        module = importlib.import_module(name)
+        thread = threading.Thread(target=module.main, name=name)
+        thread.daemon = True
+        thread.start()
+
+        print("Started component: {}".format(name))
+
+    rospy.on_shutdown(shim.report)
+
+    # The shared executor delivers the messages of every component, and is only ever run here
+    shim.bus.spin(rospy.is_shutdown)
+
+if __name__ == "__main__":
+    main()
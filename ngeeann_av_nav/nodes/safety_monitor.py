@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+import rospy
+import time
+import numpy as np
+
+from ngeeann_av_msgs.msg import State2D, AckermannDriveStamped
+from sensor_msgs.msg import LaserScan
+from std_msgs.msg import Float64
+from utils.latency_trace import LatencyTracer
+from utils.sensor_params import find_sensor
+from utils.time_to_collision import arc_distances
+from utils.timing_stats import TimingStats
+
+class SafetyMonitor:
+
+    def __init__(self):
+
+        ''' Class constructor to initialise the class '''
+
+        # Load parameters
+        try:
+            self.monitor_params = rospy.get_param("/safety_monitor")
+            self.vehicle_params = rospy.get_param("/vehicle")
+            self.wheelbase = self.vehicle_params["wheelbase"]
+            self.cg2rearaxle = self.wheelbase - self.vehicle_params["centreofgravity_to_frontaxle"]
+            self.width, self.front, self.rear = self.vehicle_params["footprint"]
+            self.brake_deceleration = self.vehicle_params["brake_deceleration"]
+            self.sensors = rospy.get_param("/bayesian_occupancy_filter/sensors")
+            self.sensor_name = self.monitor_params["sensor"]
+            self.margin = self.monitor_params["margin"]
+            self.slowdown_time = self.monitor_params["slowdown_time"]
+            self.brake_time = self.monitor_params["brake_time"]
+
+        except:
+            raise Exception("Missing ROS parameters. Check the configuration file.")
+
+        # The topic and pose of the lidar are those the Bayesian occupancy filter uses for the same sensor
+        sensor = find_sensor(self.sensors, self.sensor_name)
+        self.scan_topic = sensor["topic"]
+        self.extrinsic = [float(value) for value in sensor["extrinsic"]]
+
+        # Initialise publishers
+        self.ackermann_pub = rospy.Publisher('/ngeeann_av/ackermann_cmd', AckermannDriveStamped, queue_size=1)
+        self.speed_limit_pub = rospy.Publisher('/ngeeann_av/speed_limit', Float64, queue_size=1)
+        self.ttc_pub = rospy.Publisher('/ngeeann_av/time_to_collision', Float64, queue_size=1)
+        self.latency_pub = rospy.Publisher('/ngeeann_av/safety_latency', Float64, queue_size=1)
+
+        # Initialise subscribers
+        self.localisation_sub = rospy.Subscriber('/ngeeann_av/state2D', State2D, self.vehicle_state_cb, queue_size=1)
+        self.target_vel_sub = rospy.Subscriber('/ngeeann_av/target_velocity', Float64, self.target_vel_cb, queue_size=1)
+        self.ackermann_sub = rospy.Subscriber('/ngeeann_av/ackermann_cmd', AckermannDriveStamped, self.ackermann_cb, queue_size=1)
+        self.scan_sub = rospy.Subscriber(self.scan_topic, LaserScan, self.scan_cb, queue_size=1)
+
+        # Footprint inflated by the margin
+        self.half_width = 0.5 * self.width + self.margin
+        self.front_extent = self.front + self.margin
+        self.rear_extent = self.rear + self.margin
+
+        # Latest state of the vehicle, from the callbacks
+        self.vel = 0.0
+        self.target_vel = 0.0
+        self.steering_angle = 0.0
+
+        # Directions of the beams, cached for the angles of the latest scan
+        self.scan_key = None
+        self.directions = None
+
+        # Decision state
+        self.braking = False
+        self.ttc = np.inf
+        self.brakes = 0
+
+        # Timing statistics
+        self.decision_stats = TimingStats("Safety decision time")
+        self.latency_stats = TimingStats("Scan to decision latency")
+        self.tracer = LatencyTracer("safety_monitor")
+
+    def vehicle_state_cb(self, msg):
+
+        self.vel = np.sqrt(msg.twist.x**2 + msg.twist.y**2)
+
+    def target_vel_cb(self, msg):
+
+        self.target_vel = msg.data
+
+    def ackermann_cb(self, msg):
+
+        self.steering_angle = msg.drive.steering_angle
+
+    def scan_cb(self, msg):
+
+        ''' Decides on every scan, as soon as it arrives, whether the vehicle has to slow down or brake '''
+
+        start = time.time()
+        received = rospy.get_time()
+
+        distance = self.swath_distance(msg)
+
+        # The planned speed keeps an obstacle ahead of a stopped vehicle blocking, so braking does not release
+        speed = max(self.vel, self.target_vel)
+
+        if distance <= 0.0:
+            self.ttc = 0.0
+
+        elif speed > 0.0:
+            self.ttc = distance / speed
+
+        else:
+            self.ttc = np.inf
+
+        # Braking starts below the brake time and only releases once the time to collision recovers past the slowdown time
+        was_braking = self.braking
+        self.braking = self.ttc < (self.slowdown_time if was_braking else self.brake_time)
+
+        if self.braking:
+            speed_limit = 0.0
+
+        elif self.ttc < self.slowdown_time:
+            speed_limit = distance / self.slowdown_time
+
+        else:
+            speed_limit = np.inf
+
+        # The brake is commanded at once, rather than through the next cycle of the path tracker
+        if self.braking and not was_braking:
+            self.brakes += 1
+            self.stop(msg.header.stamp)
+            self.tracer.record(msg.header.stamp, received)
+
+        self.speed_limit_pub.publish(speed_limit)
+        self.ttc_pub.publish(self.ttc)
+
+        self.decision_stats.add(time.time() - start)
+
+        latency = (rospy.Time.now() - msg.header.stamp).to_sec()
+        self.latency_stats.add(latency)
+        self.latency_pub.publish(latency)
+
+    def swath_distance(self, scan):
+
+        ''' Returns the shortest distance along the current arc of the vehicle before its footprint meets a return of the scan '''
+
+        ranges = np.asarray(scan.ranges)
+        key = (scan.angle_min, scan.angle_increment, len(ranges))
+
+        if key != self.scan_key:
+            angles = scan.angle_min + scan.angle_increment * np.arange(0, len(ranges)) + self.extrinsic[2]
+            self.directions = np.vstack((-np.sin(angles), np.cos(angles)))
+            self.scan_key = key
+
+        valid = np.isfinite(ranges) & (ranges >= scan.range_min) & (ranges < scan.range_max)
+
+        if not np.any(valid):
+            return np.inf
+
+        points = self.directions[:, valid] * ranges[valid]
+        points[0] += self.extrinsic[0]
+        points[1] += self.extrinsic[1]
+
+        curvature = np.tan(self.steering_angle) / self.wheelbase
+        distance = arc_distances(points, curvature, self.half_width, self.front_extent, self.rear_extent, self.cg2rearaxle)
+
+        return np.min(distance)
+
+    def stop(self, stamp):
+        '''
+            Commands the vehicle to brake on its current steering angle
+
+            Arguments:
+                stamp   - Stamp of the scan which triggered the brake
+        '''
+
+        cmd = AckermannDriveStamped()
+        cmd.header.stamp = stamp
+        cmd.drive.speed = 0.0
+        cmd.drive.acceleration = self.brake_deceleration
+        cmd.drive.steering_angle = self.steering_angle
+        cmd.drive.steering_angle_velocity = 0.0
+        self.ackermann_pub.publish(cmd)
+
+        print("\nEmergency brake: time to collision {:.2f} s".format(self.ttc))
+
+def main():
+
+    # Initialise the node
+    rospy.init_node('safety_monitor')
+
+    # Initialise the class
+    safety_monitor = SafetyMonitor()
+
+    # Decisions are made in the scan callback, so the loop only reports the statistics
+    r = rospy.Rate(0.2)
+
+    while not rospy.is_shutdown():
+        try:
+            r.sleep()
+
+            print("\nEmergency brakes: {} | time to collision: {:.2f} s".format(safety_monitor.brakes, safety_monitor.ttc))
+            print(safety_monitor.decision_stats)
+            print(safety_monitor.latency_stats)
+            print(safety_monitor.tracer)
+
+        except KeyboardInterrupt:
+            print("Shutting down ROS node...")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+import rospy
+import time
+import numpy as np
+
+from geometry_msgs.msg import PoseWithCovarianceStamped
+from ngeeann_av_msgs.msg import State2D
+from sensor_msgs.msg import LaserScan
+from utils.roadmap import roadmap_grid
+from utils.scan_matcher import ScanMatcher
+from utils.sensor_params import find_sensor
+from utils.timing_stats import TimingStats
+
+class ScanMatching:
+
+    def __init__(self):
+
+        ''' Class constructor to initialise the class '''
+
+        # Initialise publisher(s)
+        self.scan_match_pub = rospy.Publisher('/ngeeann_av/scan_match_pose', PoseWithCovarianceStamped, queue_size=10)
+
+        # Load parameters
+        try:
+            self.matcher_params = rospy.get_param("/scan_matcher")
+            self.frequency = self.matcher_params["update_frequency"]
+            self.resolution = self.matcher_params["resolution"]
+            self.occupied_threshold = self.matcher_params["occupied_threshold"]
+            self.sigma = self.matcher_params["sigma"]
+            self.max_distance = self.matcher_params["max_distance"]
+            self.depth = self.matcher_params["pyramid_depth"]
+            self.linear_window = self.matcher_params["linear_window"]
+            self.angular_window = self.matcher_params["angular_window"]
+            self.covariance_scale = self.matcher_params["covariance_scale"]
+            self.min_score = self.matcher_params["min_score"]
+            self.sensors = rospy.get_param("/bayesian_occupancy_filter/sensors")
+            self.sensor_name = self.matcher_params["sensor"]
+
+        except:
+            raise Exception("Missing ROS parameters. Check the configuration file.")
+
+        # The topic and pose of the lidar are those the Bayesian occupancy filter uses for the same sensor
+        sensor = find_sensor(self.sensors, self.sensor_name)
+        self.scan_topic = sensor["topic"]
+        self.extrinsic = [float(value) for value in sensor["extrinsic"]]
+
+        # Initialise subscriber(s)
+        self.scan_sub = rospy.Subscriber(self.scan_topic, LaserScan, self.scan_cb, queue_size=1)
+        self.localisation_sub = rospy.Subscriber('/ngeeann_av/state2D', State2D, self.vehicle_state_cb, queue_size=1)
+
+        # The likelihood field is built once from the static roadmap of the Bayesian occupancy filter
+        roadmap = roadmap_grid(resolution=self.resolution)
+        self.matcher = ScanMatcher(roadmap >= self.occupied_threshold, self.resolution, 0.0, 0.0, self.sigma,
+                                   self.max_distance, self.depth, self.linear_window, self.angular_window,
+                                   self.covariance_scale)
+
+        # Snapshots written by the callbacks
+        self.scan = None
+        self.state = None
+        self.matched_scan = None
+
+        # Timing statistics
+        self.match_stats = TimingStats("Scan match time")
+        self.matches = 0
+        self.rejected = 0
+
+    def scan_cb(self, msg):
+
+        self.scan = msg
+
+    def vehicle_state_cb(self, msg):
+
+        self.state = (msg.pose.x, msg.pose.y, msg.pose.theta)
+
+    def scan_points(self, scan):
+
+        ''' Returns the valid returns of a scan as points in the vehicle frame, which faces the y-axis '''
+
+        ranges = np.asarray(scan.ranges)
+        angles = scan.angle_min + scan.angle_increment * np.arange(0, len(ranges)) + self.extrinsic[2]
+        valid = np.isfinite(ranges) & (ranges > scan.range_min) & (ranges < scan.range_max)
+
+        return np.vstack((-ranges[valid] * np.sin(angles[valid]) + self.extrinsic[0],
+                          ranges[valid] * np.cos(angles[valid]) + self.extrinsic[1]))
+
+    def update(self):
+
+        ''' Registers the latest scan against the roadmap around the latest state and publishes the pose '''
+
+        scan = self.scan
+        state = self.state
+
+        if scan is None or state is None or scan is self.matched_scan:
+            return
+
+        self.matched_scan = scan
+
+        start = time.time()
+        result = self.matcher.match(self.scan_points(scan), *state)
+        self.match_stats.add(time.time() - start)
+
+        if result is None or result[1] < self.min_score:
+            self.rejected += 1
+            return
+
+        pose, score, covariance = result
+        self.matches += 1
+
+        msg = PoseWithCovarianceStamped()
+        msg.header.stamp = scan.header.stamp
+        msg.header.frame_id = "map"
+        msg.pose.pose.position.x = pose[0]
+        msg.pose.pose.position.y = pose[1]
+        msg.pose.pose.orientation.z = np.sin(0.5 * pose[2])
+        msg.pose.pose.orientation.w = np.cos(0.5 * pose[2])
+
+        # Row-major 6x6 covariance over (x, y, z, roll, pitch, yaw)
+        cov = [0.0] * 36
+
+        for i, row in enumerate((0, 1, 5)):
+            for j, col in enumerate((0, 1, 5)):
+                cov[6 * row + col] = covariance[i, j]
+
+        msg.pose.covariance = cov
+        self.scan_match_pub.publish(msg)
+
+def main():
+
+    # Initialise the node
+    rospy.init_node('scan_matcher')
+
+    # Initialise the class
+    scan_matching = ScanMatching()
+
+    # Set update rate
+    r = rospy.Rate(scan_matching.frequency)
+    n = 0
+
+    while not rospy.is_shutdown():
+        try:
+            scan_matching.update()
+            r.sleep()
+
+            if n == 50:
+                print("\nScan matches published: {} | rejected: {}".format(scan_matching.matches, scan_matching.rejected))
+                print(scan_matching.match_stats)
+                n = 0
+
+            else:
+                n += 1
+
+        except KeyboardInterrupt:
+            print("Shutting down ROS node...")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+import rospy
+import time
+import numpy as np
+
+from geometry_msgs.msg import PoseWithCovarianceStamped
+from ngeeann_av_msgs.msg import State2D
+from sensor_msgs.msg import Imu, JointState
+from utils.ekf import ExtendedKalmanFilter
+from utils.timing_stats import TimingStats
+
+class StateEstimator:
+
+    def __init__(self):
+
+        ''' Class constructor to initialise the class '''
+
+        # Initialise publisher(s)
+        self.localisation_pub = rospy.Publisher('/ngeeann_av/state2D', State2D, queue_size=10)
+
+        # Initialise subscriber(s)
+        self.joint_states_sub = rospy.Subscriber('/ngeeann_av/joint_states', JointState, self.joint_states_cb, queue_size=1)
+        self.imu_sub = rospy.Subscriber('/ngeeann_av/imu', Imu, self.imu_cb, queue_size=1)
+        self.scan_match_sub = rospy.Subscriber('/ngeeann_av/scan_match_pose', PoseWithCovarianceStamped, self.scan_match_cb,
+                                               queue_size=1)
+
+        # Load parameters
+        try:
+            self.estimator_params = rospy.get_param("/state_estimator")
+            self.frequency = self.estimator_params["update_frequency"]
+            self.initial_pose = self.estimator_params["initial_pose"]
+            self.wheel_radius = self.estimator_params["wheel_radius"]
+            self.rear_joints = self.estimator_params["rear_axle_joints"]
+            self.steer_joints = self.estimator_params["steering_joints"]
+            self.speed_var = self.estimator_params["odometry_speed_variance"]
+            self.yawrate_var = self.estimator_params["odometry_yawrate_variance"]
+            self.gyro_var = self.estimator_params["gyro_variance"]
+            self.process_noise = self.estimator_params["process_noise"]
+            self.wheelbase = rospy.get_param("/vehicle")["wheelbase"]
+
+        except:
+            raise Exception("Missing ROS parameters. Check the configuration file.")
+
+        x0 = [self.initial_pose[0], self.initial_pose[1], self.initial_pose[2], 0.0, 0.0]
+        self.ekf = ExtendedKalmanFilter(x0, [1.0, 1.0, 0.1, 1.0, 0.1], self.process_noise)
+
+        # Measurement snapshots written by the callbacks. Each snapshot is a new tuple, so the update loop
+        # fuses it exactly once by comparing it against the snapshot it fused last.
+        self.odometry = None
+        self.gyro = None
+        self.scan_match = None
+        self.fused = (None, None, None)
+        self.joint_ids = None
+        self.last_update = None
+
+        # Timing statistics
+        self.compute_stats = TimingStats("Estimator compute time")
+
+    def joint_states_cb(self, msg):
+
+        ''' Converts the rear axle and steering joint states into a speed and yaw rate measurement '''
+
+        # The joint order only changes if the controllers are respawned
+        if self.joint_ids is None or len(msg.name) <= max(self.joint_ids) or \
+           [msg.name[i] for i in self.joint_ids] != self.rear_joints + self.steer_joints:
+            try:
+                self.joint_ids = [msg.name.index(name) for name in self.rear_joints + self.steer_joints]
+
+            except ValueError:
+                return
+
+        bl, br, sl, sr = [self.joint_ids[i] for i in range(0, 4)]
+
+        vel = 0.5 * (msg.velocity[bl] + msg.velocity[br]) * self.wheel_radius
+
+        # The virtual front wheel steers about the mean of the turning radii of the two front wheels
+        tl = np.tan(msg.position[sl])
+        tr = np.tan(msg.position[sr])
+        tan_steer = 2.0 * tl * tr / (tl + tr) if abs(tl + tr) > 1e-9 else 0.0
+
+        self.odometry = (vel, vel * tan_steer / self.wheelbase)
+
+    def imu_cb(self, msg):
+
+        self.gyro = (msg.angular_velocity.z,)
+
+    def scan_match_cb(self, msg):
+
+        pose = msg.pose.pose
+        yaw = 2.0 * np.arctan2(pose.orientation.z, pose.orientation.w)
+        cov = np.reshape(msg.pose.covariance, (6, 6))
+
+        # The x, y and yaw block of the covariance, whose correlations are kept
+        self.scan_match = (np.array((pose.position.x, pose.position.y, yaw)), cov[np.ix_((0, 1, 5), (0, 1, 5))])
+
+    def update(self):
+
+        ''' Predicts up to the current time, fuses any new measurements and publishes the estimate '''
+
+        now = rospy.get_time()
+
+        if self.last_update is None:
+            self.last_update = now
+            return
+
+        start = time.time()
+        ekf = self.ekf
+        ekf.predict(now - self.last_update)
+        self.last_update = now
+
+        odometry = self.odometry
+        gyro = self.gyro
+        scan_match = self.scan_match
+        fused_odometry, fused_gyro, fused_scan_match = self.fused
+        self.fused = (odometry, gyro, scan_match)
+
+        if odometry is not None and odometry is not fused_odometry:
+            ekf.update(3, odometry[0], self.speed_var)
+            ekf.update(4, odometry[1], self.yawrate_var)
+
+        if gyro is not None and gyro is not fused_gyro:
+            ekf.update(4, gyro[0], self.gyro_var)
+
+        if scan_match is not None and scan_match is not fused_scan_match:
+            ekf.update_pose(*scan_match)
+
+        self.compute_stats.add(time.time() - start)
+        self.publish_state()
+
+    def publish_state(self):
+
+        x, y, yaw, vel, yawrate = self.ekf.x
+
+        state2d = State2D()
+        state2d.pose.x = x
+        state2d.pose.y = y
+        state2d.pose.theta = yaw
+        state2d.twist.x = vel * -np.sin(yaw)
+        state2d.twist.y = vel * np.cos(yaw)
+        state2d.twist.w = -yawrate
+
+        self.localisation_pub.publish(state2d)
+
+def main():
+
+    # Initialise the node
+    rospy.init_node('state_estimator')
+
+    # Initialise the class
+    state_estimator = StateEstimator()
+
+    # Set update rate
+    r = rospy.Rate(state_estimator.frequency)
+    n = 0
+
+    while not rospy.is_shutdown():
+        try:
+            state_estimator.update()
+            r.sleep()
+
+            if n == 100:
+                print(state_estimator.compute_stats)
+                n = 0
+
+            else:
+                n += 1
+
+        except KeyboardInterrupt:
+            print("Shutting down ROS node...")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,34 @@
 #!/usr/bin/env python
 
 import rospy
+import time
 import datetime
-import threading
 import numpy as np
 
-from ngeeann_av_msgs.msg import State2D, Path2D, AckermannDrive
+from ngeeann_av_msgs.msg import State2D, Path2D, AckermannDriveStamped
 from geometry_msgs.msg import PoseStamped
-from std_msgs.msg import Float6
+from std_msgs.msg import Float64
 from utils.normalise_angle import normalise_angle
 from utils.heading2quaternion import heading_to_quaternion
+from utils.latency_trace import LatencyTracer
+from utils.timing_stats import TimingStats
+from utils.mpc_controller import MPCController
+from utils.gain_schedule import GainSchedule
+from utils.path_curvature import path_curvature
 
 class PathTracker:
 
     def __init__(self):
         
         # Initialise publishers
-        self.tracker_pub = rospy.Publisher('/ngeeann_av/ackermann_cmd', AckermannDrive, queue_size=10)
+        self.tracker_pub = rospy.Publisher('/ngeeann_av/ackermann_cmd', AckermannDriveStamped, queue_size=10)
         self.lateral_ref_pub = rospy.Publisher('/ngeeann_av/lateral_ref', PoseStamped, queue_size=10)
 
         # Initialise subscribers
         self.localisation_sub = rospy.Subscriber('/ngeeann_av/state2D', State2D, self.vehicle_state_cb)
         self.path_sub = rospy.Subscriber('/ngeeann_av/path', Path2D, self.path_cb, queue_size=10)
         self.target_vel_sub = rospy.Subscriber('/ngeeann_av/target_velocity', Float64, self.target_vel_cb, queue_size=10)
+        self.speed_limit_sub = rospy.Subscriber('/ngeeann_av/speed_limit', Float64, self.speed_limit_cb, queue_size=1)
 
         # Load parameters
         try:
@@ -32,7 +38,20 @@ class PathTracker:
             self.ksoft = self.tracker_params["softening_gain"]
             self.kyaw = self.tracker_params["yawrate_gain"]
             self.max_steer = self.tracker_params["steering_limits"]
-            self.cg2frontaxle = self.tracker_params["centreofgravity_to_frontaxle"]
+            self.search_ahead = self.tracker_params["search_window_ahead"]
+            self.search_behind = self.tracker_params["search_window_behind"]
+            self.controller = self.tracker_params["controller"]
+            self.mpc_params = self.tracker_params["mpc"]
+            self.pursuit_params = self.tracker_params["pure_pursuit"]
+            self.gain_scheduling = self.tracker_params["gain_scheduling"]
+
+            self.vehicle_params = rospy.get_param("/vehicle")
+            self.cg2frontaxle = self.vehicle_params["centreofgravity_to_frontaxle"]
+            self.wheelbase = self.vehicle_params["wheelbase"]
+            self.brake_deceleration = self.vehicle_params["brake_deceleration"]
+
+            # Speed and curvature dependent Stanley gains, generated by scripts/gain_tuning.py
+            self.gain_schedule = GainSchedule.from_param(rospy.get_param("/gain_schedule")) if self.gain_scheduling else None
         
         except:
             raise Exception("Missing ROS parameters. Check the configuration file.")
@@ -41,54 +60,73 @@ class PathTracker:
         self.x = None
         self.y = None
         self.yaw = None
+        self.vel = 0.0
+        self.yawrate = 0.0
         self.target_vel = 0.0
-
-        self.points = 1
-        self.lock = threading.Lock()
-
-        self.cx = []
-        self.cy = []
-        self.cyaw = []
+        self.speed_limit = np.inf
+        self.steering_angle = 0.0
+
+        # Model predictive controller, used when the controller parameter is set to mpc
+        self.mpc = MPCController(self.wheelbase, self.max_steer, self.mpc_params["horizon"], self.mpc_params["timestep"],
+                                 self.mpc_params["crosstrack_weight"], self.mpc_params["heading_weight"],
+                                 self.mpc_params["steering_weight"], self.mpc_params["steering_rate_weight"])
+        self.mpc_min_vel = self.mpc_params["min_velocity"]
+
+        # Adaptive lookahead of the pure pursuit controller
+        self.lookahead_gain = self.pursuit_params["lookahead_gain"]
+        self.min_lookahead = self.pursuit_params["min_lookahead"]
+        self.max_lookahead = self.pursuit_params["max_lookahead"]
+
+        # Snapshots written by the callbacks. Each callback builds a new tuple and swaps the reference,
+        # which is atomic, so the control loop always reads a consistent state and path without a lock.
+        self.state = None
+        self.path = None
+        self.active_path = None
+        self.tracer = LatencyTracer("path_tracker")
+
+        self.cx = np.empty(0)
+        self.cy = np.empty(0)
+        self.cyaw = np.empty(0)
+        self.cs = np.empty(0)
+        self.ck = np.empty(0)
 
         self.target_idx = None
         self.heading_error = 0.0
         self.crosstrack_error = 0.0
         self.yawrate_error = 0.0
 
-    def vehicle_state_cb(self, msg):
-
-        self.lock.acquire()
-        self.x = msg.pose.x
-        self.y = msg.pose.y
-        self.yaw = msg.pose.theta
-        self.vel = np.sqrt((msg.twist.x**2.0) + (msg.twist.y**2.0))
-        self.yawrate = msg.twist.w
+        # Timing statistics
+        self.callback_stats = TimingStats("Callback hold time")
+        self.compute_stats = TimingStats("Control compute time")
+        self.jitter_stats = TimingStats("Control period jitter")
+        self.last_update = None
 
-        if self.cyaw:
-            self.target_index_calculator()
+    def vehicle_state_cb(self, msg):
 
-        self.lock.release()
+        start = time.time()
+        vel = np.sqrt((msg.twist.x**2.0) + (msg.twist.y**2.0))
+        self.state = (msg.pose.x, msg.pose.y, msg.pose.theta, vel, msg.twist.w)
+        self.callback_stats.add(time.time() - start)
 
     def path_cb(self, msg):
 
-        self.lock.acquire()
-        self.cx = []
-        self.cy = []
-        self.cyaw = []
+        start = time.time()
+        cx = np.array([pose.x for pose in msg.poses])
+        cy = np.array([pose.y for pose in msg.poses])
+        cyaw = np.array([pose.theta for pose in msg.poses])
 
-        for i in range(0, len(msg.poses)):
-            px = msg.poses[i].x
-            py = msg.poses[i].y
-            ptheta = msg.poses[i].theta
-            self.cx.append(px)
-            self.cy.append(py)
-            self.cyaw.append(ptheta) 
-        self.lock.release()
+        # The path carries the stamp of the scan it originates from, and the time it arrived
+        self.path = (cx, cy, cyaw, msg.header.stamp, rospy.get_time())
+        self.callback_stats.add(time.time() - start)
 
     def target_vel_cb(self, msg):
 
         self.target_vel = msg.data
 
+    def speed_limit_cb(self, msg):
+
+        self.speed_limit = msg.data
+
     def target_index_calculator(self):  
 
         ''' Calculates the target index and each corresponding error '''
@@ -97,26 +135,21 @@ class PathTracker:
         fx = self.x + self.cg2frontaxle * -np.sin(self.yaw)
         fy = self.y + self.cg2frontaxle * np.cos(self.yaw)
 
-        dx = [fx - icx for icx in self.cx] # Find the x-axis of the front axle relative to the path
-        dy = [fy - icy for icy in self.cy] # Find the y-axis of the front axle relative to the path
+        target_idx = self.search_target_index(fx, fy)
 
-        d = np.hypot(dx, dy) # Find the distance from the front axle to the path
-        target_idx = np.argmin(d) # Find the shortest distance in the array
+        dx = fx - self.cx[target_idx] # Find the x-axis of the front axle relative to the target point
+        dy = fy - self.cy[target_idx] # Find the y-axis of the front axle relative to the target point
 
         # Cross track error, project RMS error onto the front axle vector
         front_axle_vec = [-np.cos(self.yaw + np.pi), -np.sin(self.yaw + np.pi)]
-        self.crosstrack_error = np.dot([dx[target_idx], dy[target_idx]], front_axle_vec)
+        self.crosstrack_error = np.dot([dx, dy], front_axle_vec)
 
         # Heading error
         self.heading_error = normalise_angle(self.cyaw[target_idx] - self.yaw - np.pi * 0.5)
         self.target_idx = target_idx
 
         # Yaw rate discrepancy
-        try:
-            self.yawrate_error = self.trajectory_yawrate_calc() - self.yawrate
-
-        except:
-            self.yawrate_error = 0.0
+        self.yawrate_error = self.trajectory_yawrate_calc() - self.yawrate
     
         pose = PoseStamped()
         pose.header.frame_id = "map"
@@ -127,41 +160,99 @@ class PathTracker:
         pose.pose.orientation = heading_to_quaternion(self.cyaw[target_idx])
         self.lateral_ref_pub.publish(pose)
     
+    def search_target_index(self, fx, fy):
+
+        ''' 
+            Finds the path point closest to the front axle. The search continues from the previous target index
+            within a bounded window, which slides forward while the closest point lies on its leading edge. The
+            whole path is only searched when no previous target index exists for the current path.
+
+            Arguments:
+                fx, fy              - Coordinates (x,y) of the vehicle front axle in the world frame
+
+            Parameters:
+                self.target_idx     - Target index of the previous update, reset whenever a new path arrives
+                self.search_ahead   - Number of path points searched ahead of the previous target index
+                self.search_behind  - Number of path points searched behind the previous target index
+        '''
+
+        if self.target_idx is None:
+            d = np.hypot(fx - self.cx, fy - self.cy)
+            return int(np.argmin(d))
+
+        points = len(self.cx)
+        target_idx = min(self.target_idx, points - 1)
+        start = max(target_idx - self.search_behind, 0)
+
+        while True:
+            end = min(target_idx + self.search_ahead + 1, points)
+            d = np.hypot(fx - self.cx[start:end], fy - self.cy[start:end])
+            target_idx = start + int(np.argmin(d))
+
+            # Stop once the closest point is inside the window or the end of the path is reached
+            if target_idx < end - 1 or end == points:
+                return target_idx
+
+            start = target_idx
+
     # Calculates the desired yawrate of the vehicle
     def trajectory_yawrate_calc(self):
 
-        target_range = 2    # number of points to look ahead and behind
-        delta_theta = 0.0
-        delta_s = 0.0
-        w = 0.0
+        ''' Returns the yaw rate needed to follow the path curvature at the target index, in the State2D convention '''
+
+        return -self.ck[self.target_idx] * self.vel
+
+    def update(self):
+
+        '''
+            Runs a single control cycle on a snapshot of the latest vehicle state and path. Only this method
+            writes the tracker's working variables, so no lock is held anywhere in the control path.
+        '''
+
+        start = time.time()
+
+        if self.last_update is not None:
+            self.jitter_stats.add(abs((start - self.last_update) - 1.0 / self.frequency))
+
+        self.last_update = start
 
-        start = self.target_idx - target_range
-        end = self.target_idx + target_range
+        state = self.state
+        path = self.path
 
-        for n in range(start, end + 1):
-            if (n >= 0) and ((n + 1) < len(self.cyaw)):
+        if state is None or path is None or not len(path[2]):
+            return
 
-                x1 = self.cx[n]
-                y1 = self.cy[n]
-                x2 = self.cx[n+1]
-                y2 = self.cy[n+1]
+        self.x, self.y, self.yaw, self.vel, self.yawrate = state
 
-                delta_s += np.hypot(x2 - x1, y2 - y1)
-                delta_theta += self.cyaw[n + 1] - self.cyaw[n]
+        if path is not self.active_path:
+            # The previous target index is meaningless on a new path
+            self.cx, self.cy, self.cyaw, self.path_stamp, self.path_received = path
+            self.cs, self.ck = path_curvature(self.cx, self.cy, self.cyaw)
+            self.active_path = path
+            self.target_idx = None
 
-            # Angular velocity calculation
-            w = -(delta_theta / delta_s) * self.vel
+        self.target_index_calculator()
 
-        return w
+        if self.controller == "mpc":
+            self.mpc_control()
+
+        elif self.controller == "pure_pursuit":
+            self.pure_pursuit_control()
+
+        else:
+            self.stanley_control()
+
+        self.compute_stats.add(time.time() - start)
 
     # Stanley controller determines the appropriate steering angle
     def stanley_control(self):
 
-        self.lock.acquire()
+        if self.gain_schedule is not None:
+            self.k, self.ksoft = self.gain_schedule.lookup(self.vel, self.ck[self.target_idx])
+
         crosstrack_term = np.arctan2((self.k * self.crosstrack_error), (self.ksoft + self.target_vel))
         heading_term = normalise_angle(self.heading_error)
-        yawrate_term = 0.0
-        # yawrate_term = -self.kyaw * self.yawrate_error
+        yawrate_term = -self.kyaw * self.yawrate_error
         
         sigma_t = crosstrack_term + heading_term + yawrate_term
 
@@ -173,19 +264,76 @@ class PathTracker:
             sigma_t = -self.max_steer
 
         self.set_vehicle_command(self.target_vel, sigma_t)
-        self.lock.release()
+
+    # Pure pursuit controller determines the appropriate steering angle
+    def pure_pursuit_control(self):
+
+        ''' Steers the rear axle towards the path point one lookahead distance away, which grows with speed '''
+
+        lookahead = np.clip(self.lookahead_gain * self.vel, self.min_lookahead, self.max_lookahead)
+
+        # Position of the rear axle
+        cg2rearaxle = self.wheelbase - self.cg2frontaxle
+        rx = self.x - cg2rearaxle * -np.sin(self.yaw)
+        ry = self.y - cg2rearaxle * np.cos(self.yaw)
+
+        # Only the path points within twice the lookahead distance of the target index are searched
+        start = self.target_idx
+        end = max(int(np.searchsorted(self.cs, self.cs[start] + 2.0 * lookahead)), start + 1)
+
+        d = np.hypot(self.cx[start:end] - rx, self.cy[start:end] - ry)
+        reached = d >= lookahead
+        ahead = int(np.argmax(reached)) if np.any(reached) else len(d) - 1
+
+        # Angle between the vehicle heading and the lookahead point
+        alpha = normalise_angle(np.arctan2(self.cy[start + ahead] - ry, self.cx[start + ahead] - rx) - (self.yaw + 0.5 * np.pi))
+        sigma_t = np.arctan2(2.0 * self.wheelbase * np.sin(alpha), max(d[ahead], 1e-3))
+        sigma_t = np.clip(sigma_t, -self.max_steer, self.max_steer)
+
+        self.set_vehicle_command(self.target_vel, sigma_t)
+
+    # Model predictive controller determines the appropriate steering angle
+    def mpc_control(self):
+
+        # The model degenerates at standstill, so it is linearised about a minimum speed
+        vel = max(self.vel, self.mpc_min_vel)
+        curvature = self.curvature_preview(vel)
+
+        sigma_t = self.mpc.solve(self.crosstrack_error, normalise_angle(self.heading_error), vel, curvature, self.steering_angle)
+
+        self.set_vehicle_command(self.target_vel, sigma_t)
+
+    def curvature_preview(self, vel):
+
+        ''' Returns the path curvature at each MPC prediction step ahead of the target index '''
+
+        steps = vel * self.mpc.dt * np.arange(1, self.mpc.horizon + 1)
+
+        return np.interp(self.cs[self.target_idx] + steps, self.cs, self.ck)
 
     # Publishes to vehicle state
     def set_vehicle_command(self, velocity, steering_angle):
 
-        ''' Publishes the calculated steering angle  '''
+        ''' Publishes the calculated steering angle, stamped with the scan of the path it tracks  '''
+
+        # The speed limit of the safety monitor overrides the target velocity
+        if velocity > self.speed_limit:
+            velocity = self.speed_limit
+            acceleration = self.brake_deceleration
+
+        else:
+            acceleration = 1.0
         
-        drive = AckermannDrive()
-        drive.speed = velocity
-        drive.acceleration = 1.0
-        drive.steering_angle = steering_angle
-        drive.steering_angle_velocity = 0.0
-        self.tracker_pub.publish(drive)
+        cmd = AckermannDriveStamped()
+        cmd.header.stamp = self.path_stamp
+        cmd.drive.speed = velocity
+        cmd.drive.acceleration = acceleration
+        cmd.drive.steering_angle = steering_angle
+        cmd.drive.steering_angle_velocity = 0.0
+        self.tracker_pub.publish(cmd)
+        self.tracer.record(self.path_stamp, self.path_received)
+
+        self.steering_angle = steering_angle
 
 def main():
     
@@ -209,14 +357,17 @@ def main():
 
     while not rospy.is_shutdown():
         try:
-            if path_tracker.cyaw:
-                path_tracker.stanley_control()
+            path_tracker.update()
 
             r.sleep()
 
             if n == 100:
                 print("\nCurrent Tracking Error: {} m".format(path_tracker.crosstrack_error))
                 print("Point {} of {} in current path".format(path_tracker.target_idx, len(path_tracker.cyaw)))
+                print(path_tracker.callback_stats)
+                print(path_tracker.compute_stats)
+                print(path_tracker.jitter_stats)
+                print(path_tracker.tracer)
                 track_error.append(path_tracker.crosstrack_error)
                 n = 0
                 
@@ -0,0 +1,225 @@
+import threading
+import time
+import numpy as np
+
+from utils.timing_stats import TimingStats
+
+def distance_field(occupied, resolution, max_distance):
+    '''
+        Returns the Euclidean distance from every cell to the nearest occupied cell, which is exact up to
+        max_distance and capped at max_distance beyond it. The transform is separable, so the distance along each
+        column is found with running extrema, and every row then takes the minimum over the columns within reach.
+
+        Arguments:
+            occupied        - Boolean grid of the occupied cells
+            resolution      - Size of a grid cell
+            max_distance    - Largest distance searched
+    '''
+
+    reach = int(np.ceil(max_distance / resolution))
+    height, width = occupied.shape
+    far = np.float32(reach + 1)
+    rows = np.arange(0, height, dtype=np.float32)[:, None]
+
+    # Rows of the nearest occupied cells above and below every cell within its column
+    above = np.maximum.accumulate(np.where(occupied, rows, -np.inf), axis=0)
+    below = np.minimum.accumulate(np.where(occupied, rows, np.inf)[::-1], axis=0)[::-1]
+    column = np.minimum(np.minimum(rows - above, below - rows), far).astype(np.float32) ** 2
+
+    padded = np.pad(column, ((0, 0), (reach, reach)), 'constant', constant_values=far ** 2)
+    squared = column.copy()
+    shifted = np.empty_like(squared)
+
+    for dx in range(1, reach + 1):
+        for start in (reach - dx, reach + dx):
+            np.add(padded[:, start : start + width], dx * dx, out=shifted)
+            np.minimum(squared, shifted, out=squared)
+
+    return np.minimum(np.sqrt(squared) * resolution, max_distance)
+
+def rectangle(x, y, heading, length, width):
+    '''
+        Returns an oriented rectangle as a corridor, which is the polyline along its length swept by its width
+
+        Arguments:
+            x, y        - Coordinates of the centre of the rectangle in the map frame
+            heading     - Direction of the length of the rectangle, anticlockwise from the x-axis
+            length      - Length of the rectangle
+            width       - Width of the rectangle
+    '''
+
+    dx = 0.5 * length * np.cos(heading)
+    dy = 0.5 * length * np.sin(heading)
+
+    return np.array(((x - dx, y - dy), (x + dx, y + dy))), width
+
+class ClearanceMap:
+
+    def __init__(self, static, resolution, origin_x, origin_y, occupied_threshold=0.5, max_distance=5.0):
+        '''
+            Answers occupancy and clearance queries for batches of corridors against the latest occupancy grid.
+            A corridor is a polyline swept by a width, and every corridor of a batch is sampled and looked up at
+            once. The distance field of the static map is computed once, and after an update only the window
+            around the cells occupied beyond the static map is transformed again, when the next query needs it.
+
+            Cells outside the grid are treated as free, as the grid treats cells it has not observed.
+
+            Arguments:
+                static                  - Occupancy, from 0 to 1, of the static map, which every grid contains
+                resolution              - Size of a grid cell
+                origin_x, origin_y      - Coordinates of the corner of the grid in the map frame
+                occupied_threshold      - Lowest occupancy of a cell which limits the clearance
+                max_distance            - Largest clearance searched
+        '''
+
+        self.resolution = resolution
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.height, self.width = static.shape
+        self.occupied_threshold = occupied_threshold
+        self.max_distance = max_distance
+        self.reach = int(np.ceil(max_distance / resolution))
+
+        self.static_occupied = static >= occupied_threshold
+        self.static_distance = distance_field(self.static_occupied, resolution, max_distance)
+
+        # Latest grid, and its distance field once a query has needed it
+        self.lock = threading.Lock()
+        self.occupancy = static
+        self.stamp = None
+        self.distance = self.static_distance
+        self.stale = False
+
+        self.field_stats = TimingStats("Distance field")
+        self.query_stats = TimingStats("Clearance query")
+
+    def update(self, occupancy, stamp):
+        '''
+            Replaces the grid the queries are answered against
+
+            Arguments:
+                occupancy   - Occupancy grid, from 0 to 1, which is not modified afterwards
+                stamp       - Time of the grid
+        '''
+
+        with self.lock:
+            self.occupancy = occupancy
+            self.stamp = stamp
+            self.stale = True
+
+    def distances(self):
+
+        ''' Returns the distance field of the latest grid, which is only computed again after an update '''
+
+        if not self.stale:
+            return self.distance
+
+        start = time.time()
+        dynamic = (self.occupancy >= self.occupied_threshold) & ~self.static_occupied
+        rows = np.flatnonzero(dynamic.any(axis=1))
+        cols = np.flatnonzero(dynamic.any(axis=0))
+        self.distance = self.static_distance
+
+        # Cells further than the reach from every dynamic cell keep the distance of the static map
+        if len(rows) > 0:
+            r0 = max(rows[0] - self.reach, 0)
+            r1 = min(rows[-1] + self.reach + 1, self.height)
+            c0 = max(cols[0] - self.reach, 0)
+            c1 = min(cols[-1] + self.reach + 1, self.width)
+
+            self.distance = self.static_distance.copy()
+            window = self.distance[r0:r1, c0:c1]
+            np.minimum(window, distance_field(dynamic[r0:r1, c0:c1], self.resolution, self.max_distance), out=window)
+
+        self.stale = False
+        self.field_stats.add(time.time() - start)
+
+        return self.distance
+
+    def query(self, corridors):
+        '''
+            Returns the highest occupancy of the cells swept by every corridor, the clearance of every corridor,
+            which is the distance from its edges to the nearest occupied cell to the resolution of the grid, and
+            the stamp of the grid they were checked against. The clearance is negative when an occupied cell lies
+            within the corridor.
+
+            Arguments:
+                corridors   - List of (points, width), where points is an array of shape (N, 2) of at least
+                              two points of a polyline in the map frame
+        '''
+
+        start_time = time.time()
+
+        with self.lock:
+            occupancy = self.occupancy
+            stamp = self.stamp
+            distance = self.distances()
+
+        if len(corridors) == 0:
+            return np.zeros(0), np.zeros(0), stamp
+
+        starts = []
+        ends = []
+        widths = []
+        owners = []
+
+        for k, (points, width) in enumerate(corridors):
+            points = np.asarray(points, dtype=float).reshape((-1, 2))
+
+            if len(points) < 2:
+                raise Exception("A corridor needs at least two points.")
+
+            starts.append(points[:-1])
+            ends.append(points[1:])
+            widths.append(np.full(len(points) - 1, float(width)))
+            owners.append(np.full(len(points) - 1, k))
+
+        start = np.vstack(starts)
+        delta = np.vstack(ends) - start
+        width = np.concatenate(widths)
+        owner = np.concatenate(owners)
+
+        # Every segment is sampled every half cell along its length, including both of its ends
+        step = 0.5 * self.resolution
+        length = np.hypot(delta[:, 0], delta[:, 1])
+        counts = np.ceil(length / step).astype(int) + 1
+        segment = np.repeat(np.arange(0, len(start)), counts)
+        first = np.cumsum(counts) - counts
+        t = (np.arange(0, counts.sum()) - first[segment]) / np.maximum(counts - 1, 1)[segment].astype(float)
+        centre = start[segment] + t[:, None] * delta[segment]
+
+        # Rows of samples across the width of each sample, along the normal of its segment
+        with np.errstate(invalid='ignore', divide='ignore'):
+            normal = np.where(length[:, None] > 0.0, np.vstack((-delta[:, 1], delta[:, 0])).T / length[:, None], 0.0)
+
+        across = np.linspace(-0.5, 0.5, int(np.ceil(width.max() / step)) + 1)
+        offset = across[None, :] * width[segment][:, None]
+        swath = centre[:, None, :] + offset[:, :, None] * normal[segment][:, None, :]
+
+        swath_occupancy = self.lookup(occupancy, swath.reshape((-1, 2)), 0.0).reshape(offset.shape).max(axis=1)
+        centre_clearance = self.lookup(distance, centre, self.max_distance) - 0.5 * width[segment]
+
+        # Samples are ordered by corridor, so every corridor is reduced over a contiguous run of samples
+        corridor_first = first[np.searchsorted(owner, np.arange(0, len(corridors)))]
+        result = (np.maximum.reduceat(swath_occupancy, corridor_first),
+                  np.minimum.reduceat(centre_clearance, corridor_first), stamp)
+
+        self.query_stats.add(time.time() - start_time)
+
+        return result
+
+    def lookup(self, grid, points, outside):
+        '''
+            Returns the values of the cells of a grid which contain an array of points
+
+            Arguments:
+                grid        - Grid of the same size as the occupancy grid
+                points      - Array of shape (N, 2) of points in the map frame
+                outside     - Value of the points which lie outside the grid
+        '''
+
+        ix = np.floor((points[:, 0] - self.origin_x) / self.resolution).astype(int)
+        iy = np.floor((points[:, 1] - self.origin_y) / self.resolution).astype(int)
+        inside = (ix >= 0) & (iy >= 0) & (ix < self.width) & (iy < self.height)
+
+        return np.where(inside, grid[np.clip(iy, 0, self.height - 1), np.clip(ix, 0, self.width - 1)], outside)
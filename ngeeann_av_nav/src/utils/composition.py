@@ -0,0 +1,183 @@
+import sys
+import time
+import threading
+
+from utils.inprocess_rospy import TopicBus, subscriber_callback
+from utils.timing_stats import TimingStats
+
+class CompositionRospy(object):
+
+    def __init__(self, rospy, bus=None):
+        '''
+            Stand-in for the rospy module which lets several node classes run as components of one process.
+            Messages between components are passed by reference through a TopicBus and delivered by a single
+            shared executor, so they are never serialised. Every component publisher is also registered with
+            ROS and only serialises a message when an external node, such as RViz, is subscribed to it. Topics
+            which are subscribed to but not published within the process are bridged in from ROS.
+
+            Anything which is not overridden here, such as parameters, time and services, is taken from rospy.
+            Since messages are shared, subscribers must not modify the messages they receive.
+
+            Arguments:
+                rospy       - The real rospy module, initialised as the container node
+                bus         - Topic bus carrying the messages between components
+        '''
+
+        self.real = rospy
+        self.bus = bus or TopicBus()
+        self.lock = threading.Lock()
+
+        # Topics published within the process, and bridges of topics which are only published outside of it
+        self.published = set()
+        self.bridges = {}
+
+        # Period of the main loop of each component, recorded per thread
+        self.cycle_stats = {}
+
+        shim = self
+
+        class Publisher(object):
+
+            def __init__(self, name, data_class, subscriber_listener=None, tcp_nodelay=False, latch=False,
+                         headers=None, queue_size=None):
+                self.name = rospy.names.resolve_name(name)
+                self.data_class = data_class
+                self.latch = latch
+                self.external = rospy.Publisher(name, data_class, subscriber_listener=subscriber_listener,
+                                                tcp_nodelay=tcp_nodelay, latch=latch, headers=headers,
+                                                queue_size=queue_size)
+                shim.add_publisher(self.name)
+
+            def publish(self, *args, **kwds):
+
+                # Mirrors rospy, which also accepts the fields of the message instead of the message itself
+                if len(args) == 1 and isinstance(args[0], self.data_class):
+                    msg = args[0]
+
+                else:
+                    msg = self.data_class(*args, **kwds)
+
+                shim.bus.publish(self.name, msg, self.latch)
+
+                # Messages are only serialised for external subscribers. Those which connect to a latched topic
+                # receive it on its next publish, rather than immediately.
+                if self.external.get_num_connections() > 0:
+                    self.external.publish(msg)
+
+            def get_num_connections(self):
+                return len(shim.bus.subscribers[self.name]) + self.external.get_num_connections()
+
+            def unregister(self):
+                self.external.unregister()
+
+        class Subscriber(object):
+
+            def __init__(self, name, data_class, callback=None, callback_args=None, queue_size=None, buff_size=65536,
+                         tcp_nodelay=False):
+                self.name = rospy.names.resolve_name(name)
+                self.callback = subscriber_callback(callback, callback_args)
+
+                if callback is not None:
+                    shim.bus.subscribe(self.name, self.callback)
+
+                shim.add_subscriber(self.name, data_class)
+
+            def unregister(self):
+                shim.bus.unsubscribe(self.name, self.callback)
+
+        class Rate(rospy.Rate):
+
+            def sleep(self):
+
+                # The time spent between two sleeps is the compute time of one cycle of the calling component
+                now = time.time()
+                name = threading.current_thread().name
+                last = getattr(self, 'last_wake', None)
+
+                if last is not None:
+                    if name not in shim.cycle_stats:
+                        shim.cycle_stats[name] = TimingStats("{} cycle".format(name))
+
+                    shim.cycle_stats[name].add(now - last)
+
+                super(Rate, self).sleep()
+                self.last_wake = time.time()
+
+        self.Publisher = Publisher
+        self.Subscriber = Subscriber
+        self.Rate = Rate
+
+    def __getattr__(self, name):
+
+        return getattr(self.real, name)
+
+    def install(self):
+
+        ''' Replaces the rospy module for every module imported from now on '''
+
+        sys.modules['rospy'] = self
+
+    def add_publisher(self, topic):
+
+        with self.lock:
+            self.published.add(topic)
+
+            # The topic is now served within the process, so its bridge would only deliver duplicates
+            if topic in self.bridges:
+                self.bridges.pop(topic).unregister()
+
+    def add_subscriber(self, topic, data_class):
+
+        with self.lock:
+            if topic in self.published or topic in self.bridges:
+                return
+
+            self.bridges[topic] = self.real.Subscriber(topic, data_class, self.bridge_cb, callback_args=topic,
+                                                       queue_size=10)
+
+    def bridge_cb(self, msg, topic):
+
+        self.bus.publish(topic, msg)
+
+    def init_node(self, name, *args, **kwds):
+
+        ''' The container is the only ROS node, so the components' own node names are ignored '''
+
+        pass
+
+    def wait_for_message(self, topic, topic_type, timeout=None):
+
+        deadline = None if timeout is None else time.time() + timeout
+        topic = self.real.names.resolve_name(topic)
+
+        while not self.real.is_shutdown():
+            remaining = 0.5 if deadline is None else min(deadline - time.time(), 0.5)
+
+            if remaining <= 0.0:
+                raise self.real.ROSException("timeout exceeded while waiting for message on topic {}".format(topic))
+
+            msg = self.bus.wait_for(topic, remaining)
+
+            if msg is not None:
+                return msg
+
+        raise self.real.ROSInterruptException("rospy shutdown")
+
+    def spin(self):
+        '''
+            Blocks until shutdown, as rospy.spin() does. Messages are only delivered by the shared executor, which
+            the container runs, so a component which spins never runs callbacks on its own thread.
+        '''
+
+        while not self.real.is_shutdown():
+            time.sleep(0.5)
+
+    def report(self):
+
+        print("\nComponent timing")
+
+        for name in sorted(self.cycle_stats):
+            print("    {}".format(self.cycle_stats[name]))
+
+        for name in sorted(self.bus.callback_stats):
+            print("    {}".format(self.bus.callback_stats[name]))
@@ -170,13 +170,13 @@ def generate_cubic_path(x, y, ds=0.05):
 
 def main():
     
-    import pandas as pd
     import matplotlib.pyplot as plt
+    from waypoint_loader import load_waypoints
 
     dir_path = 'waypoints.csv'
-    df = pd.read_csv(dir_path)
-    x = df['X-axis'].values.tolist()
-    y = df['Y-axis'].values.tolist()
+    ax, ay = load_waypoints(dir_path)
+    x = ax.tolist()
+    y = ay.tolist()
 
     px, py, pyaw, pk = generate_cubic_path(x, y)
 
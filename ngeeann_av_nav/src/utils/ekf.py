@@ -0,0 +1,116 @@
+import numpy as np
+
+from utils.normalise_angle import normalise_angle
+
+class ExtendedKalmanFilter:
+
+    def __init__(self, x0, p0, process_noise):
+        '''
+            Extended Kalman filter over the fixed state [x, y, yaw, speed, yaw rate] of a vehicle which, like
+            State2D, faces the y-axis at zero yaw. The yaw rate is counter-clockwise positive.
+
+            Every measurement is fused one scalar at a time, which is exact for independent measurement noise
+            and needs no matrix inverse. All matrices are allocated once here and updated in place.
+
+            Arguments:
+                x0              - Initial state
+                p0              - Initial variance of each state
+                process_noise   - Variance rate of each state, per second
+        '''
+
+        self.x = np.array(x0, dtype=float)
+        self.P = np.diag(np.asarray(p0, dtype=float))
+        self.q = np.asarray(process_noise, dtype=float)
+
+        # Preallocated working matrices
+        self.F = np.eye(5)
+        self.FP = np.zeros((5, 5))
+        self.KPh = np.zeros((5, 5))
+        self.ph = np.zeros(5)
+        self.k = np.zeros(5)
+        self.dx = np.zeros(5)
+
+        # Measurements of a single state use a row of the identity as their row of H
+        self.H = np.eye(5)
+        self.h = np.zeros(5)
+        self.innovation = np.zeros(3)
+
+    def predict(self, dt):
+
+        ''' Propagates the state with a constant speed and yaw rate model over dt seconds '''
+
+        yaw = self.x[2]
+        vel = self.x[3]
+        s = np.sin(yaw)
+        c = np.cos(yaw)
+
+        # Jacobian of the motion model, where only the yaw and speed dependent entries change
+        F = self.F
+        F[0, 2] = -vel * c * dt
+        F[0, 3] = -s * dt
+        F[1, 2] = -vel * s * dt
+        F[1, 3] = c * dt
+        F[2, 4] = dt
+
+        self.x[0] -= vel * s * dt
+        self.x[1] += vel * c * dt
+        self.x[2] = (yaw + self.x[4] * dt) % (2.0 * np.pi)
+
+        np.dot(F, self.P, out=self.FP)
+        np.dot(self.FP, F.T, out=self.P)
+
+        for i in range(0, 5):
+            self.P[i, i] += self.q[i] * dt
+
+    def update(self, index, z, r):
+        '''
+            Fuses a scalar measurement of a single state
+
+            Arguments:
+                index   - Index of the measured state
+                z       - Measured value
+                r       - Variance of the measurement
+        '''
+
+        if index == 2:
+            innovation = normalise_angle(z - self.x[2])
+
+        else:
+            innovation = z - self.x[index]
+
+        self.update_row(self.H[index], innovation, r)
+
+    def update_pose(self, z, R):
+        '''
+            Fuses a pose measurement with a full covariance. The measurement is rotated onto the eigenvectors of
+            its covariance, where its components are independent and can be fused one at a time.
+
+            Arguments:
+                z       - Measured pose (x, y, yaw)
+                R       - Covariance of the measured pose
+        '''
+
+        variances, vectors = np.linalg.eigh(R)
+
+        for i in range(0, 3):
+            self.innovation[0] = z[0] - self.x[0]
+            self.innovation[1] = z[1] - self.x[1]
+            self.innovation[2] = normalise_angle(z[2] - self.x[2])
+
+            self.h[0:3] = vectors[:, i]
+            self.update_row(self.h, self.h[0:3].dot(self.innovation), variances[i])
+
+    def update_row(self, h, innovation, r):
+
+        ''' Fuses a scalar measurement with the given row of H, innovation and variance '''
+
+        np.dot(self.P, h, out=self.ph)
+        s = h.dot(self.ph) + r
+
+        np.divide(self.ph, s, out=self.k)
+        np.multiply(self.k, innovation, out=self.dx)
+        self.x += self.dx
+        self.x[2] %= 2.0 * np.pi
+
+        np.outer(self.k, self.ph, out=self.KPh)
+        self.P -= self.KPh
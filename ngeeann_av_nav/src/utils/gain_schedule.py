@@ -0,0 +1,70 @@
+import numpy as np
+
+class GainSchedule:
+
+    def __init__(self, speeds, curvatures, control_gain, softening_gain):
+        '''
+            Looks up Stanley controller gains from a table indexed by speed and path curvature, using bilinear
+            interpolation between the table entries. Queries outside the table are clamped to its edges.
+
+            Arguments:
+                speeds              - Ascending speeds of the table rows
+                curvatures          - Ascending absolute path curvatures of the table columns
+                control_gain        - Table of crosstrack control gains, one row per speed
+                softening_gain      - Table of softening gains, one row per speed
+        '''
+
+        self.speeds = np.asarray(speeds, dtype=float)
+        self.curvatures = np.asarray(curvatures, dtype=float)
+        self.control_gain = np.asarray(control_gain, dtype=float)
+        self.softening_gain = np.asarray(softening_gain, dtype=float)
+
+        shape = (len(self.speeds), len(self.curvatures))
+
+        if self.control_gain.shape != shape or self.softening_gain.shape != shape:
+            raise ValueError("Gain tables must have one row per speed and one column per curvature")
+
+    @classmethod
+    def from_param(cls, params):
+
+        ''' Creates the schedule from the dictionary stored on the parameter server '''
+
+        return cls(params["speeds"], params["curvatures"], params["control_gain"], params["softening_gain"])
+
+    def interpolation_weights(self, axis, value):
+
+        ''' Returns the lower index and the weight of the upper index for a value along a table axis '''
+
+        if len(axis) == 1 or value <= axis[0]:
+            return 0, 0.0
+
+        if value >= axis[-1]:
+            return len(axis) - 2, 1.0
+
+        i = int(np.searchsorted(axis, value)) - 1
+
+        return i, (value - axis[i]) / (axis[i + 1] - axis[i])
+
+    def lookup(self, speed, curvature):
+        '''
+            Returns the interpolated (control_gain, softening_gain) for the given speed and path curvature
+
+            Arguments:
+                speed               - Vehicle speed
+                curvature           - Path curvature at the target point, of either sign
+        '''
+
+        i, wi = self.interpolation_weights(self.speeds, speed)
+        j, wj = self.interpolation_weights(self.curvatures, abs(curvature))
+
+        i1 = min(i + 1, len(self.speeds) - 1)
+        j1 = min(j + 1, len(self.curvatures) - 1)
+
+        gains = []
+
+        for table in (self.control_gain, self.softening_gain):
+            low = (1.0 - wj) * table[i, j] + wj * table[i, j1]
+            high = (1.0 - wj) * table[i1, j] + wj * table[i1, j1]
+            gains.append((1.0 - wi) * low + wi * high)
+
+        return gains[0], gains[1]
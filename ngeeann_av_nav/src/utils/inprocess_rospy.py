@@ -0,0 +1,364 @@
+import sys
+import time
+import threading
+import collections
+
+from utils.timing_stats import TimingStats
+
+# CPU time of the calling thread, which Python 2 only offers for the whole process
+thread_cpu_time = getattr(time, 'thread_time', None) or time.clock
+
+try:
+    import genpy
+    _TimeBase = genpy.Time
+    _DurationBase = genpy.Duration
+
+except ImportError:
+    _TimeBase = object
+    _DurationBase = object
+
+class TopicBus:
+
+    def __init__(self):
+        '''
+            In-process stand-in for ROS topics. Published messages are queued by reference, without being
+            serialised or copied, and handed to every subscriber of the topic when the bus is spun. The time
+            spent in each callback is recorded against the node which owns the callback.
+
+            The bus may be published to from any thread. Callbacks only ever run on the thread spinning the bus.
+        '''
+
+        self.subscribers = collections.defaultdict(list)
+        self.latched = {}
+        self.last_message = {}
+        self.queue = collections.deque()
+        self.callback_stats = {}
+        self.callback_cpu_time = collections.defaultdict(float)
+        self.ready = threading.Condition()
+
+    def subscribe(self, topic, callback):
+
+        with self.ready:
+            self.subscribers[topic].append(callback)
+
+            # Late subscribers of a latched topic receive its last message
+            if topic in self.latched:
+                self.queue.append((callback, self.latched[topic]))
+                self.ready.notify_all()
+
+    def unsubscribe(self, topic, callback):
+
+        with self.ready:
+            if callback in self.subscribers[topic]:
+                self.subscribers[topic].remove(callback)
+
+    def publish(self, topic, msg, latch=False):
+
+        with self.ready:
+            self.last_message[topic] = msg
+
+            if latch:
+                self.latched[topic] = msg
+
+            for callback in self.subscribers[topic]:
+                self.queue.append((callback, msg))
+
+            self.ready.notify_all()
+
+    def spin_once(self):
+
+        ''' Delivers every queued message, including messages published by the callbacks themselves '''
+
+        while True:
+            with self.ready:
+                if not self.queue:
+                    return
+
+                callback, msg = self.queue.popleft()
+
+            owner = callback_owner(callback)
+
+            if owner not in self.callback_stats:
+                self.callback_stats[owner] = TimingStats("{} callbacks".format(owner))
+
+            start = time.time()
+            start_cpu = thread_cpu_time()
+            callback(msg)
+            self.callback_cpu_time[owner] += thread_cpu_time() - start_cpu
+            self.callback_stats[owner].add(time.time() - start)
+
+    def spin(self, is_shutdown, poll_period=0.1):
+
+        ''' Delivers messages on the calling thread as soon as they are published, until is_shutdown() is true '''
+
+        while not is_shutdown():
+            with self.ready:
+                if not self.queue:
+                    self.ready.wait(poll_period)
+
+            self.spin_once()
+
+    def wait_for(self, topic, timeout=None):
+
+        ''' Blocks until a message has been published on the topic and returns the latest one, or None on timeout '''
+
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self.ready:
+            while topic not in self.last_message:
+                remaining = 0.1 if deadline is None else min(deadline - time.time(), 0.1)
+
+                if remaining <= 0.0:
+                    return None
+
+                self.ready.wait(remaining)
+
+            return self.last_message[topic]
+
+class ArgsCallback(object):
+
+    def __init__(self, callback, callback_args):
+        '''
+            Calls a subscriber callback with the callback_args of its subscription, as rospy does
+
+            Arguments:
+                callback        - Callback of the subscription
+                callback_args   - Second argument of every call
+        '''
+
+        self.func = callback
+        self.callback_args = callback_args
+
+    def __call__(self, msg):
+
+        return self.func(msg, self.callback_args)
+
+def subscriber_callback(callback, callback_args):
+
+    ''' Returns the callable delivering messages to a subscription, which passes the callback_args if there are any '''
+
+    return callback if callback_args is None else ArgsCallback(callback, callback_args)
+
+def callback_owner(callback):
+
+    ''' Returns the name of the class owning a bound method callback, or the function name otherwise '''
+
+    callback = getattr(callback, 'func', callback)
+    owner = getattr(callback, '__self__', None)
+
+    return type(owner).__name__ if owner is not None else getattr(callback, '__name__', 'callback')
+
+class SimClock:
+
+    def __init__(self, start=0.0):
+
+        ''' Simulated clock, advanced explicitly by the simulation loop '''
+
+        self.t = start
+
+    def now(self):
+
+        return self.t
+
+    def advance(self, dt):
+
+        self.t += dt
+
+class InProcessRospy:
+
+    def __init__(self, bus=None, params=None, clock=None):
+        '''
+            Minimal stand-in for the rospy module, backed by a TopicBus, a dictionary parameter server and a
+            simulated clock. Installing it lets the unmodified node classes run inside a single process.
+
+            Arguments:
+                bus         - Topic bus carrying the messages
+                params      - Nested dictionary of parameters, keyed by namespace
+                clock       - Clock supplying the current time, in seconds
+        '''
+
+        self.bus = bus or TopicBus()
+        self.params = params or {}
+        self.clock = clock or SimClock()
+        self.shutdown = False
+        self.services = {}
+
+        rospy = self
+
+        class Time(_TimeBase):
+
+            @classmethod
+            def now(cls):
+                return cls.from_sec(rospy.clock.now())
+
+        class Duration(_DurationBase):
+            pass
+
+        class Rate(object):
+
+            def __init__(self, hz):
+                self.period = 1.0 / hz
+
+            def sleep(self):
+                pass
+
+        class Publisher(object):
+
+            def __init__(self, name, data_class, subscriber_listener=None, tcp_nodelay=False, latch=False,
+                         headers=None, queue_size=None):
+                self.name = name
+                self.data_class = data_class
+                self.latch = latch
+
+            def publish(self, *args, **kwds):
+
+                # Mirrors rospy, which also accepts the fields of the message instead of the message itself
+                if len(args) == 1 and isinstance(args[0], self.data_class):
+                    msg = args[0]
+
+                else:
+                    msg = self.data_class(*args, **kwds)
+
+                rospy.bus.publish(self.name, msg, self.latch)
+
+            def get_num_connections(self):
+                return len(rospy.bus.subscribers[self.name])
+
+            def unregister(self):
+                pass
+
+        class Subscriber(object):
+
+            def __init__(self, name, data_class, callback=None, callback_args=None, queue_size=None, buff_size=65536,
+                         tcp_nodelay=False):
+                self.name = name
+                self.callback = subscriber_callback(callback, callback_args)
+
+                if callback is not None:
+                    rospy.bus.subscribe(name, self.callback)
+
+            def unregister(self):
+                rospy.bus.unsubscribe(self.name, self.callback)
+
+        class Service(object):
+
+            def __init__(self, name, service_class, handler, buff_size=65536, error_handler=None):
+                self.name = name
+                self.service_class = service_class
+                rospy.services[name] = handler
+
+            def shutdown(self, reason=''):
+                rospy.services.pop(self.name, None)
+
+        class ServiceProxy(object):
+
+            def __init__(self, name, service_class, persistent=False, headers=None):
+                self.name = name
+                self.service_class = service_class
+
+            def __call__(self, *args, **kwds):
+
+                # Mirrors rospy, which also accepts the fields of the request instead of the request itself
+                request_class = self.service_class._request_class
+
+                if len(args) == 1 and isinstance(args[0], request_class):
+                    request = args[0]
+
+                else:
+                    request = request_class(*args, **kwds)
+
+                if self.name not in rospy.services:
+                    raise ROSException("Service {} is not available".format(self.name))
+
+                return rospy.services[self.name](request)
+
+            def close(self):
+                pass
+
+        class ROSException(Exception):
+            pass
+
+        self.Time = Time
+        self.Duration = Duration
+        self.Rate = Rate
+        self.Publisher = Publisher
+        self.Subscriber = Subscriber
+        self.Service = Service
+        self.ServiceProxy = ServiceProxy
+        self.ROSException = ROSException
+        self.ROSInterruptException = ROSException
+
+    def install(self):
+
+        ''' Replaces the rospy module for every module imported from now on '''
+
+        sys.modules['rospy'] = self
+
+    def init_node(self, name, *args, **kwds):
+        pass
+
+    def is_shutdown(self):
+        return self.shutdown
+
+    def signal_shutdown(self, reason=''):
+        self.shutdown = True
+
+    def get_time(self):
+        return self.clock.now()
+
+    def sleep(self, duration):
+        pass
+
+    def get_param(self, name, default=KeyError):
+
+        value = self.params
+
+        try:
+            for key in name.strip('/').split('/'):
+                value = value[key]
+
+        except (KeyError, TypeError):
+            if default is KeyError:
+                raise KeyError(name)
+
+            return default
+
+        return value
+
+    def set_param(self, name, value):
+
+        keys = name.strip('/').split('/')
+        params = self.params
+
+        for key in keys[:-1]:
+            params = params.setdefault(key, {})
+
+        params[keys[-1]] = value
+
+    def has_param(self, name):
+
+        try:
+            self.get_param(name)
+            return True
+
+        except KeyError:
+            return False
+
+    def wait_for_message(self, topic, topic_type, timeout=None):
+
+        if topic not in self.bus.last_message:
+            raise self.ROSException("No message has been published on {}".format(topic))
+
+        return self.bus.last_message[topic]
+
+    def wait_for_service(self, service, timeout=None):
+        pass
+
+    def loginfo(self, msg, *args):
+        print(msg % args if args else msg)
+
+    def logwarn(self, msg, *args):
+        print(msg % args if args else msg)
+
+    def logerr(self, msg, *args):
+        print(msg % args if args else msg)
@@ -0,0 +1,150 @@
+import rospy
+import numpy as np
+
+from ngeeann_av_msgs.msg import LatencySummary
+
+class LatencyHistogram:
+
+    def __init__(self, min_latency=1e-4, max_latency=10.0, bins_per_decade=20):
+        '''
+            Counts latencies in logarithmic bins, so every sample costs a single increment and the percentiles keep
+            the same relative resolution from sub-millisecond hops to stalls of seconds. Latencies below or above
+            the range are counted in the first or last bin.
+
+            Arguments:
+                min_latency         - Upper edge of the first bin, in seconds
+                max_latency         - Upper edge of the last bin, in seconds
+                bins_per_decade     - Number of bins per factor of ten of latency
+        '''
+
+        bins = int(np.ceil(np.log10(max_latency / min_latency) * bins_per_decade)) + 1
+        self.edges = min_latency * 10.0 ** (np.arange(0, bins) / float(bins_per_decade))
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+
+        ''' Records a single latency, in seconds '''
+
+        self.counts[min(int(np.searchsorted(self.edges, seconds)), len(self.edges) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+
+        ''' Returns the upper edge of the bin of the q-th percentile, in seconds, which is at most the largest latency '''
+
+        if self.count == 0:
+            return 0.0
+
+        rank = max(int(np.ceil(q / 100.0 * self.count)), 1)
+
+        return min(self.edges[np.searchsorted(np.cumsum(self.counts), rank)], self.max)
+
+    def summary(self):
+
+        ''' Returns the mean, median, 90th and 99th percentiles and maximum of the recorded latencies, in seconds '''
+
+        if self.count == 0:
+            return 0.0, 0.0, 0.0, 0.0, 0.0
+
+        return self.total / self.count, self.percentile(50), self.percentile(90), self.percentile(99), self.max
+
+    def reset(self):
+
+        ''' Discards the recorded latencies '''
+
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+class LatencyTracer:
+
+    def __init__(self, stage):
+        '''
+            Records the latencies of a stage of the sensor to actuation pipeline. Every message of the pipeline is
+            stamped with the LiDAR scan it originates from, so the age of an output is the latency from the scan to
+            the stage, and the hop is the time since the input arrived at the stage. Every scan is recorded once,
+            at the first output of the stage which carries it, so outputs repeated from the same input do not
+            inflate the latencies. Percentile summaries of both are published on /ngeeann_av/latency every summary
+            period, over the latencies since the previous summary, and the histograms of every latency are kept for
+            the reports of the node.
+
+            Arguments:
+                stage   - Name of the stage in the summaries
+        '''
+
+        try:
+            self.summary_period = rospy.get_param("/latency_trace")["summary_period"]
+
+        except:
+            raise Exception("Missing ROS parameters. Check the configuration file.")
+
+        self.stage = stage
+        self.latencies = ('age', 'hop')
+        self.window = dict((latency, LatencyHistogram()) for latency in self.latencies)
+        self.totals = dict((latency, LatencyHistogram()) for latency in self.latencies)
+        self.last_stamp = None
+        self.last_summary = None
+
+        self.summary_pub = rospy.Publisher('/ngeeann_av/latency', LatencySummary, queue_size=10)
+
+    def record(self, stamp, received):
+        '''
+            Records the latencies of an output of the stage as it is published, unless its scan has already been
+            recorded
+
+            Arguments:
+                stamp       - Stamp of the LiDAR scan the output originates from
+                received    - Time at which the input of the output arrived at the stage, in seconds
+        '''
+
+        if stamp == self.last_stamp:
+            return
+
+        self.last_stamp = stamp
+        now = rospy.get_time()
+        samples = (('age', now - stamp.to_sec()), ('hop', now - received))
+
+        for latency, seconds in samples:
+            self.window[latency].add(seconds)
+            self.totals[latency].add(seconds)
+
+        if self.last_summary is None:
+            self.last_summary = now
+
+        elif now - self.last_summary >= self.summary_period:
+            self.publish_summary()
+            self.last_summary = now
+
+    def publish_summary(self):
+
+        ''' Publishes the percentiles of the latencies since the previous summary '''
+
+        for latency in self.latencies:
+            histogram = self.window[latency]
+
+            msg = LatencySummary()
+            msg.header.stamp = rospy.Time.now()
+            msg.stage = self.stage
+            msg.latency = latency
+            msg.count = histogram.count
+            msg.mean, msg.p50, msg.p90, msg.p99, msg.max = histogram.summary()
+            self.summary_pub.publish(msg)
+
+            histogram.reset()
+
+    def __str__(self):
+
+        lines = []
+
+        for latency in self.latencies:
+            mean, p50, p90, p99, peak = self.totals[latency].summary()
+            lines.append("{} {}: mean {:.1f} ms | p50 {:.1f} ms | p90 {:.1f} ms | p99 {:.1f} ms | max {:.1f} ms".format(
+                         self.stage, latency, mean * 1e3, p50 * 1e3, p90 * 1e3, p99 * 1e3, peak * 1e3))
+
+        return "\n".join(lines)
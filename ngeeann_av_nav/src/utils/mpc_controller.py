@@ -0,0 +1,136 @@
+import numpy as np
+
+class MPCController:
+
+    def __init__(self, wheelbase, max_steer, horizon=15, timestep=0.1, q_crosstrack=1.0, q_heading=2.0, r_steer=0.1,
+                 r_steer_rate=100.0, max_iter=50, tolerance=1e-6):
+        '''
+            Model predictive path tracking controller using a kinematic bicycle model linearised about the path.
+            The error state x = [crosstrack error, heading error] at the front axle evolves as
+
+                crosstrack' = v * (heading - steer)
+                heading'    = v * curvature - (v / wheelbase) * steer
+
+            The steering sequence over the horizon is found by solving a small box-constrained QP. The
+            unconstrained optimum is used whenever it respects the steering limits, otherwise an accelerated
+            projected gradient method is run, warm started from the previous solution.
+
+            Arguments:
+                wheelbase               - Distance between the front and rear axles
+                max_steer               - Steering limit of the virtual front wheel, in radians
+                horizon                 - Number of prediction steps
+                timestep                - Duration of each prediction step, in seconds
+                q_crosstrack, q_heading - Weights on the crosstrack and heading errors
+                r_steer, r_steer_rate   - Weights on the steering angle and on its change between steps
+                max_iter, tolerance     - Iteration limit and convergence tolerance of the QP solver
+        '''
+
+        self.wheelbase = wheelbase
+        self.max_steer = max_steer
+        self.horizon = horizon
+        self.dt = timestep
+        self.max_iter = max_iter
+        self.tolerance = tolerance
+
+        n = horizon
+
+        # Stacked state weights [e_1, psi_1, ..., e_N, psi_N]
+        self.q = np.tile((q_crosstrack, q_heading), n)
+
+        # Steering rate differences U[k] - U[k-1], where U[-1] is the last applied steering angle
+        D = np.eye(n) - np.eye(n, k=-1)
+        self.R = r_steer * np.eye(n) + r_steer_rate * D.T.dot(D)
+        self.r_steer_rate = r_steer_rate
+
+        # Prediction matrices, refilled in place every solve
+        self.Phi = np.zeros((2 * n, 2))
+        self.Gamma = np.zeros((2 * n, n))
+        self.Omega = np.zeros((2 * n, n))
+
+        self.solution = np.zeros(n)
+        self.iterations = 0
+
+    def build_prediction(self, velocity):
+
+        ''' Fills the condensed prediction matrices X = Phi x0 + Gamma U + Omega curvature for a given speed '''
+
+        n = self.horizon
+        vdt = velocity * self.dt
+
+        A = np.array(((1.0, vdt), (0.0, 1.0)))
+        B = np.array((-vdt, -vdt / self.wheelbase))
+        E = np.array((0.0, vdt))
+
+        self.Gamma.fill(0.0)
+        self.Omega.fill(0.0)
+
+        Ak = np.eye(2)
+        powers = [Ak]
+
+        for k in range(0, n):
+            Ak = A.dot(Ak)
+            powers.append(Ak)
+            self.Phi[2 * k : 2 * k + 2, :] = Ak
+
+        for k in range(0, n):
+            for j in range(0, k + 1):
+                self.Gamma[2 * k : 2 * k + 2, j] = powers[k - j].dot(B)
+                self.Omega[2 * k : 2 * k + 2, j] = powers[k - j].dot(E)
+
+    def solve(self, crosstrack_error, heading_error, velocity, curvature, last_steer):
+        '''
+            Returns the steering angle to apply now
+
+            Arguments:
+                crosstrack_error    - Crosstrack error at the front axle, positive to the right of the path
+                heading_error       - Path heading minus vehicle heading, in radians
+                velocity            - Vehicle speed used to linearise the model
+                curvature           - Path curvature at each of the prediction steps
+                last_steer          - Steering angle applied in the previous cycle
+        '''
+
+        self.build_prediction(velocity)
+
+        x0 = np.array((crosstrack_error, heading_error))
+        free = self.Phi.dot(x0) + self.Omega.dot(curvature)
+
+        QGamma = self.Gamma.T * self.q
+        H = QGamma.dot(self.Gamma) + self.R
+        f = QGamma.dot(free)
+        f[0] -= self.r_steer_rate * last_steer
+
+        # Unconstrained optimum, which is the solution whenever it lies within the steering limits
+        U = np.linalg.solve(H, -f)
+        self.iterations = 0
+
+        if np.max(np.abs(U)) > self.max_steer:
+            U = self.projected_gradient(H, f, self.solution)
+
+        self.solution = U
+
+        return U[0]
+
+    def projected_gradient(self, H, f, U):
+
+        ''' Solves the box-constrained QP min 0.5 U'HU + f'U using accelerated projected gradient descent '''
+
+        step = 1.0 / np.linalg.eigvalsh(H)[-1]
+        U = np.clip(U, -self.max_steer, self.max_steer)
+        Y = U.copy()
+        t = 1.0
+
+        for i in range(0, self.max_iter):
+            U_next = np.clip(Y - step * (H.dot(Y) + f), -self.max_steer, self.max_steer)
+            t_next = 0.5 * (1.0 + np.sqrt(1.0 + 4.0 * t * t))
+            Y = U_next + ((t - 1.0) / t_next) * (U_next - U)
+
+            converged = np.max(np.abs(U_next - U)) < self.tolerance
+            U = U_next
+            t = t_next
+
+            if converged:
+                break
+
+        self.iterations = i + 1
+
+        return U
@@ -0,0 +1,23 @@
+import numpy as np
+
+def path_curvature(cx, cy, cyaw):
+    '''
+        Computes the arc length and curvature at every point of a path in a single vectorised pass. The headings
+        are unwrapped first so that the +/- pi discontinuity does not appear as a curvature spike.
+
+        Arguments:
+            cx, cy      - Coordinates (x,y) of the path points
+            cyaw        - Heading of the path at each point
+    '''
+
+    if len(cx) < 2:
+        return np.zeros(len(cx)), np.zeros(len(cx))
+
+    s = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(cx), np.diff(cy)))))
+    yaw = np.unwrap(cyaw)
+
+    # Repeated points would otherwise divide by a zero arc length
+    ds = np.maximum(np.gradient(s), 1e-6)
+    k = np.gradient(yaw) / ds
+
+    return s, k
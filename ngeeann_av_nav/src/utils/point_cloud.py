@@ -0,0 +1,54 @@
+import numpy as np
+
+# NumPy types of the datatypes of sensor_msgs/PointField
+point_field_types = {1: 'i1', 2: 'u1', 3: 'i2', 4: 'u2', 5: 'i4', 6: 'u4', 7: 'f4', 8: 'f8'}
+
+def cloud_array(cloud):
+    '''
+        Returns a structured array of shape (height, width) which views the data of a point cloud without copying
+        it, with a field for every field of the cloud. Padding between fields and between rows is skipped by the
+        offsets and strides of the array.
+
+        Arguments:
+            cloud   - sensor_msgs/PointCloud2 message
+    '''
+
+    order = '>' if cloud.is_bigendian else '<'
+    names = []
+    formats = []
+    offsets = []
+
+    for field in cloud.fields:
+        if field.datatype not in point_field_types:
+            raise Exception("Unknown PointField datatype {} of field '{}'.".format(field.datatype, field.name))
+
+        names.append(field.name)
+        offsets.append(field.offset)
+
+        if field.count > 1:
+            formats.append((order + point_field_types[field.datatype], field.count))
+
+        else:
+            formats.append(order + point_field_types[field.datatype])
+
+    dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': cloud.point_step})
+
+    return np.ndarray((cloud.height, cloud.width), dtype, cloud.data, 0, (cloud.row_step, cloud.point_step))
+
+def height_band(points, sensor_height, min_height, max_height):
+    '''
+        Returns the x and y coordinates, as an array of shape (2, N), of the points of a cloud whose height above
+        the ground lies within a band. Points below min_height, such as the ground, and invalid NaN points are
+        removed. The coordinates stay in the frame of the cloud.
+
+        Arguments:
+            points          - Structured array of a cloud with the fields x, y and z
+            sensor_height   - Height of the frame of the cloud above the ground
+            min_height      - Lowest height above the ground of a kept point
+            max_height      - Highest height above the ground of a kept point
+    '''
+
+    z = points['z'].ravel()
+    band = (z >= min_height - sensor_height) & (z <= max_height - sensor_height)
+
+    return np.vstack((points['x'].ravel()[band], points['y'].ravel()[band]))
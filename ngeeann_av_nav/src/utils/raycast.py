@@ -0,0 +1,35 @@
+import numpy as np
+
+def raycast_circles(ox, oy, directions, circles, range_min):
+    '''
+        Returns the distance along every ray to the nearest circle it hits, or infinity if it hits none. A ray
+        starting inside a circle hits its far side, so rings can be modelled by their inner and outer walls.
+
+        Arguments:
+            ox, oy          - Coordinates (x,y) of the origin of the rays
+            directions      - Direction of every ray, in radians from the x-axis
+            circles         - Array of (x, y, radius) of every circle
+            range_min       - Hits closer than this distance are ignored
+    '''
+
+    # Rays (N, 1) against circles (1, M)
+    dx = np.cos(directions)[:, None]
+    dy = np.sin(directions)[:, None]
+    cx = ox - circles[:, 0][None, :]
+    cy = oy - circles[:, 1][None, :]
+
+    b = dx * cx + dy * cy
+    c = cx ** 2 + cy ** 2 - circles[:, 2][None, :] ** 2
+    disc = b ** 2 - c
+
+    with np.errstate(invalid='ignore'):
+        root = np.sqrt(disc)
+
+    near = -b - root
+    far = -b + root
+
+    # The nearest positive intersection of each ray, where the far root applies when inside a circle
+    t = np.where(near > range_min, near, far)
+    t = np.where((disc >= 0.0) & (t > range_min), t, np.inf)
+
+    return np.min(t, axis=1)
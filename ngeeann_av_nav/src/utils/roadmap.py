@@ -0,0 +1,33 @@
+import numpy as np
+
+# Lane overrun regions of the circular road, as (inner radius, outer radius, value)
+lane_overrun_rings = [(97.0, 100.0, 0.4), (107.5, 110.5, 0.4)]
+
+# Barriers on either side of the road, as (inner radius, outer radius, value)
+barrier_rings = [(110.5, 110.75, 0.8), (96.75, 97.0, 0.8)]
+
+def roadmap_grid(origin_x=0, origin_y=0, resolution=0.2, width=650, height=650):
+    '''
+        Rasterises the lane overrun regions and barriers of the first quadrant of the circular road, by sampling
+        every ring radially every 0.05 m and angularly every 0.001 rad. Barriers are drawn last, over the
+        lane overrun regions.
+
+        Arguments:
+            origin_x, origin_y  - Coordinates (x,y) of the grid origin in the map frame
+            resolution          - Size of a grid cell
+            width, height       - Size of the grid in cells
+    '''
+
+    roadmap = np.zeros((height, width))
+    theta = np.arange(0, 0.5 * np.pi, 0.001)
+
+    for r_min, r_max, value in lane_overrun_rings + barrier_rings:
+        r = np.arange(r_min, r_max, 0.05)[:, None]
+
+        ix = ((r * np.cos(theta) - origin_x) / resolution).astype(int).ravel()
+        iy = ((r * np.sin(theta) - origin_y) / resolution).astype(int).ravel()
+
+        inside = (ix >= 0) & (iy >= 0) & (ix < width) & (iy < height)
+        roadmap[iy[inside], ix[inside]] = value
+
+    return roadmap
@@ -0,0 +1,216 @@
+import numpy as np
+
+from utils.waypoint_loader import load_waypoints
+
+class RouteManager:
+
+    def __init__(self, segment_paths, closed_loop, wp_ahead, wp_behind, search_ahead, search_behind, lost_threshold):
+        '''
+            Manages a route made up of one or more waypoint segments which are loaded lazily from disk. Only the
+            active segment and its neighbours are held in memory, together with a buffer of the active segment
+            padded with the tail of the previous segment and the head of the next one. On a closed-loop route the
+            last segment is followed by the first, so the buffer wraps around the seam and the goal windows stay
+            continuous over any number of laps.
+
+            Arguments:
+                segment_paths           - Ordered list of paths to the waypoint files of each segment
+                closed_loop             - Indicates that the route continues from the last segment to the first
+                wp_ahead, wp_behind     - Number of waypoints published ahead and behind the vehicle
+                search_ahead            - Number of waypoints searched ahead of the previous match
+                search_behind           - Number of waypoints searched behind the previous match
+                lost_threshold          - Distance beyond which the windowed match is considered lost
+        '''
+
+        self.segment_paths = list(segment_paths)
+        self.closed_loop = closed_loop
+        self.wp_ahead = wp_ahead
+        self.wp_behind = wp_behind
+        self.wp_published = wp_ahead + wp_behind
+        self.search_ahead = search_ahead
+        self.search_behind = search_behind
+        self.lost_threshold = lost_threshold
+
+        # Number of points padded onto each side of the active segment
+        self.pad_behind = self.wp_behind + self.search_behind
+        self.pad_ahead = self.wp_ahead + 1 + self.search_ahead
+
+        self.segments = {}
+        self.segment_id = 0
+        self.lap = 0
+        self.closest_id = None
+
+        self.build_buffer(self.segment_id)
+
+    def get_segment(self, segment_id):
+
+        ''' Returns the waypoints of a segment, loading them from disk if they are not already in memory '''
+
+        if segment_id not in self.segments:
+            self.segments[segment_id] = load_waypoints(self.segment_paths[segment_id])
+
+        return self.segments[segment_id]
+
+    def neighbour_id(self, segment_id, step):
+
+        ''' Returns the id of the segment step segments away, or None if the route does not continue '''
+
+        neighbour = segment_id + step
+
+        if 0 <= neighbour < len(self.segment_paths):
+            return neighbour
+
+        elif self.closed_loop:
+            return neighbour % len(self.segment_paths)
+
+        return None
+
+    def build_buffer(self, segment_id):
+        '''
+            Builds the padded waypoint buffer of a segment and precomputes the start of the goal window for
+            every index of the buffer. A waypoint shared by the end of a segment and the start of the next is
+            only kept once.
+        '''
+
+        prev_id = self.neighbour_id(segment_id, -1)
+        next_id = self.neighbour_id(segment_id, 1)
+
+        cx, cy = self.get_segment(segment_id)
+        count = len(cx)
+
+        px, py = np.empty(0), np.empty(0)
+        nx, ny = np.empty(0), np.empty(0)
+
+        if next_id is not None:
+            nx, ny = self.get_segment(next_id)
+
+            if self.coincident(cx, cy, -1, nx, ny, 0):
+                count -= 1
+
+            nx, ny = nx[:self.pad_ahead], ny[:self.pad_ahead]
+
+        if prev_id is not None:
+            px, py = self.get_segment(prev_id)
+            end = len(px) - 1 if self.coincident(px, py, -1, cx, cy, 0) else len(px)
+            px, py = px[max(end - self.pad_behind, 0):end], py[max(end - self.pad_behind, 0):end]
+
+        # Only the active segment and its neighbours are kept in memory
+        for cached_id in list(self.segments.keys()):
+            if cached_id not in (prev_id, segment_id, next_id):
+                del self.segments[cached_id]
+
+        self.segment_id = segment_id
+        self.offset = len(px)
+        self.count = count
+        self.ax = np.concatenate((px, cx[:count], nx))
+        self.ay = np.concatenate((py, cy[:count], ny))
+
+        # Precomputed window slices, indexed by the closest waypoint in the buffer
+        ids = np.arange(len(self.ax))
+        last_start = max(len(self.ax) - self.wp_published, 0)
+        self.approaching_starts = np.clip(ids - self.wp_behind, 0, last_start)
+        self.passed_starts = np.clip(ids - (self.wp_behind - 1), 0, last_start)
+
+    def coincident(self, ax, ay, i, bx, by, j):
+
+        ''' Checks if waypoint i of the first set and waypoint j of the second set are the same point '''
+
+        return len(ax) > 0 and len(bx) > 0 and np.hypot(ax[i] - bx[j], ay[i] - by[j]) < 1e-6
+
+    def find_closest(self, fx, fy):
+        '''
+            Finds the index of the buffer waypoint closest to the front axle. Only a bounded window around the
+            previously matched waypoint is searched, so the per-cycle cost is independent of the route length
+            and the match cannot jump to a distant part of the route which happens to pass close by. The active
+            segment is advanced when the match moves into the padding of a neighbouring segment. A search over
+            the whole buffer, and then over every segment, is only performed when the match is lost.
+
+            Arguments:
+                fx, fy                  - Coordinates (x,y) of the vehicle front axle in the world frame
+        '''
+
+        if self.closest_id is not None:
+            start = max(self.closest_id - self.search_behind, 0)
+            end = min(self.closest_id + self.search_ahead + 1, len(self.ax))
+
+            d = np.hypot(fx - self.ax[start:end], fy - self.ay[start:end])
+            window_id = np.argmin(d)
+
+            if d[window_id] <= self.lost_threshold:
+                return self.set_closest(int(start + window_id))
+
+            print('Waypoint match lost, searching all waypoints')
+
+        d = np.hypot(fx - self.ax, fy - self.ay)
+        closest_id = int(np.argmin(d))
+
+        if d[closest_id] > self.lost_threshold and len(self.segment_paths) > 1:
+            self.relocalise(fx, fy)
+            d = np.hypot(fx - self.ax, fy - self.ay)
+            closest_id = int(np.argmin(d))
+
+        return self.set_closest(closest_id)
+
+    def set_closest(self, closest_id):
+
+        ''' Stores the matched waypoint, moving onto a neighbouring segment if the match lies in its padding '''
+
+        if closest_id >= self.offset + self.count:
+            next_id = self.neighbour_id(self.segment_id, 1)
+            closest_id -= self.offset + self.count
+
+            if next_id == 0:
+                self.lap += 1
+
+            self.build_buffer(next_id)
+            closest_id += self.offset
+
+        elif closest_id < self.offset:
+            prev_id = self.neighbour_id(self.segment_id, -1)
+            closest_id -= self.offset
+
+            if self.segment_id == 0:
+                self.lap -= 1
+
+            self.build_buffer(prev_id)
+            closest_id += self.offset + self.count
+
+        self.closest_id = closest_id
+
+        return closest_id
+
+    def relocalise(self, fx, fy):
+
+        ''' Scans every segment, one at a time, for the segment closest to the front axle '''
+
+        best_id = self.segment_id
+        best_d = np.inf
+
+        for segment_id in range(0, len(self.segment_paths)):
+            if segment_id in self.segments:
+                sx, sy = self.segments[segment_id]
+
+            else:
+                sx, sy = load_waypoints(self.segment_paths[segment_id])
+
+            d = np.min(np.hypot(fx - sx, fy - sy))
+
+            if d < best_d:
+                best_id = segment_id
+                best_d = d
+
+        if best_id != self.segment_id:
+            print('Relocalised onto route segment #{}'.format(best_id))
+            self.build_buffer(best_id)
+
+    def window(self, closest_id, passed):
+        '''
+            Returns the goal window around the closest waypoint as views into the buffer
+
+            Arguments:
+                closest_id              - Index of the closest waypoint in the buffer
+                passed                  - Indicates that the vehicle has passed the closest waypoint
+        '''
+
+        start = self.passed_starts[closest_id] if passed else self.approaching_starts[closest_id]
+
+        return self.ax[start : start + self.wp_published], self.ay[start : start + self.wp_published]
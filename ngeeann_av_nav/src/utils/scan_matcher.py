@@ -0,0 +1,219 @@
+import numpy as np
+
+def likelihood_field(occupied, resolution, sigma, max_distance):
+    '''
+        Returns the likelihood exp(-d^2 / 2 sigma^2) of every cell, where d is the distance to the nearest
+        occupied cell. Distances are only searched up to max_distance, beyond which the likelihood is zero.
+
+        Arguments:
+            occupied        - Boolean grid of the occupied cells
+            resolution      - Size of a grid cell
+            sigma           - Standard deviation of the range measurements
+            max_distance    - Distance beyond which a point is considered unexplained
+    '''
+
+    reach = int(np.ceil(max_distance / resolution))
+    height, width = occupied.shape
+    padded = np.pad(occupied, reach, 'constant')
+    distance = np.full(occupied.shape, np.inf)
+
+    # Exact Euclidean distances within the reach, one shifted copy of the grid per offset
+    for dy in range(-reach, reach + 1):
+        for dx in range(-reach, reach + 1):
+            d = np.hypot(dx, dy) * resolution
+
+            if d > max_distance:
+                continue
+
+            shifted = padded[reach + dy : reach + dy + height, reach + dx : reach + dx + width]
+            distance[shifted] = np.minimum(distance[shifted], d)
+
+    return np.exp(-0.5 * (distance / sigma) ** 2)
+
+class ScanMatcher:
+
+    def __init__(self, occupied, resolution, origin_x, origin_y, sigma=0.2, max_distance=1.0, depth=3,
+                 linear_window=1.0, angular_window=0.1, covariance_scale=1.0, covariance_stride=2):
+        '''
+            Correlative scan-to-map matcher which scores a scan against a likelihood field of a static map.
+            Every pose within a window around a prior is searched, at the resolution of the map for translations
+            and at the angle which moves the furthest point by one cell for rotations.
+
+            The search is branch and bound over a pyramid of the likelihood field, where level h holds the
+            maximum likelihood over every 2^h x 2^h block of cells. The score of a block of translations at level h
+            is therefore an upper bound on the score of every translation within it, so whole blocks are pruned
+            as soon as their bound falls below the best score found so far.
+
+            Arguments:
+                occupied                - Boolean grid of the occupied cells of the map
+                resolution              - Size of a grid cell
+                origin_x, origin_y      - Coordinates (x,y) of the grid origin
+                sigma, max_distance     - Parameters of the likelihood field
+                depth                   - Number of coarse levels of the pyramid
+                linear_window           - Largest translation searched from the prior, in metres
+                angular_window          - Largest rotation searched from the prior, in radians
+                covariance_scale        - Inflates the covariance for the correlation between neighbouring beams
+                covariance_stride       - Spacing, in cells and rotation steps, of the scores sampled for the covariance
+        '''
+
+        self.resolution = resolution
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.depth = depth
+        self.window = int(np.ceil(linear_window / resolution))
+        self.angular_window = angular_window
+        self.covariance_scale = covariance_scale
+        self.covariance_stride = covariance_stride
+
+        # The padding keeps every lookup inside the grid, and points clipped into it score zero
+        self.margin = self.window + 2 ** depth
+        self.pad = 2 * self.margin + 2 ** depth
+        self.field = np.pad(likelihood_field(occupied, resolution, sigma, max_distance), self.pad, 'constant')
+
+        self.pyramid = [self.field]
+
+        for h in range(1, depth + 1):
+            s = 2 ** (h - 1)
+            prev = self.pyramid[-1]
+
+            rows = prev.copy()
+            rows[:-s, :] = np.maximum(prev[:-s, :], prev[s:, :])
+
+            level = rows.copy()
+            level[:, :-s] = np.maximum(rows[:, :-s], rows[:, s:])
+            self.pyramid.append(level)
+
+        self.angular_step = 0.0
+        self.evaluations = 0
+        self.search_evaluations = 0
+        self.exhaustive = 0
+
+    def match(self, points, x, y, yaw):
+        '''
+            Returns the best pose (x, y, yaw), its score and its covariance, or None if no pose scores above zero
+
+            Arguments:
+                points      - Array of shape (2, N) of scan points in the vehicle frame, which faces the y-axis
+                x, y, yaw   - Prior pose of the vehicle
+        '''
+
+        if points.shape[1] == 0:
+            return None
+
+        # The rotation step moves the furthest point by one cell
+        furthest = max(np.max(np.hypot(points[0], points[1])), self.resolution)
+        self.angular_step = np.arccos(1.0 - 0.5 * (self.resolution / furthest) ** 2)
+        steps = int(np.ceil(self.angular_window / self.angular_step))
+        yaws = yaw + self.angular_step * np.arange(-steps, steps + 1)
+
+        # Cell of every point, for every rotation, with the prior translation
+        lo = self.margin
+        hi = self.field.shape[0] - 1 - self.margin, self.field.shape[1] - 1 - self.margin
+        cells = []
+
+        for theta in yaws:
+            c = np.cos(theta)
+            s = np.sin(theta)
+            wx = c * points[0] - s * points[1] + x
+            wy = s * points[0] + c * points[1] + y
+
+            cx = np.floor((wx - self.origin_x) / self.resolution).astype(int) + self.pad
+            cy = np.floor((wy - self.origin_y) / self.resolution).astype(int) + self.pad
+            cells.append((np.clip(cx, lo, hi[1]), np.clip(cy, lo, hi[0])))
+
+        self.cells = cells
+        self.evaluations = 0
+        self.best_score = 0.0
+        self.best = None
+
+        # Root candidates tile the translation window with blocks of the coarsest level
+        offsets = np.arange(-self.window, self.window + 1, 2 ** self.depth)
+        tx, ty = np.meshgrid(offsets, offsets)
+        tx = tx.ravel()
+        ty = ty.ravel()
+
+        roots = []
+
+        for k in range(0, len(yaws)):
+            scores = self.score(self.depth, k, tx, ty)
+            roots.extend(zip(scores, [k] * len(tx), tx, ty))
+
+        roots.sort(key=lambda candidate: -candidate[0])
+        self.branch(roots, self.depth)
+
+        # Candidates an exhaustive search would score, for comparison with those branch and bound scored
+        self.exhaustive = len(yaws) * (2 * self.window + 1) ** 2
+        self.search_evaluations = self.evaluations
+
+        if self.best is None:
+            return None
+
+        k, tx, ty = self.best
+        pose = np.array((x + tx * self.resolution, y + ty * self.resolution, yaws[k]))
+
+        return pose, self.best_score, self.covariance(yaws, x, y)
+
+    def score(self, h, k, tx, ty):
+
+        ''' Returns the mean likelihood of the scan at level h, for rotation k and each translation in cells '''
+
+        cx, cy = self.cells[k]
+        self.evaluations += len(tx)
+
+        return np.mean(self.pyramid[h][cy[None, :] + ty[:, None], cx[None, :] + tx[:, None]], axis=1)
+
+    def branch(self, candidates, h):
+
+        ''' Depth-first search through candidates sorted by decreasing score, pruning on the best score '''
+
+        for score, k, tx, ty in candidates:
+            if score <= self.best_score:
+                return
+
+            if h == 0:
+                self.best_score = score
+                self.best = (k, tx, ty)
+                continue
+
+            s = 2 ** (h - 1)
+            ctx = tx + np.array((0, s, 0, s))
+            cty = ty + np.array((0, 0, s, s))
+            inside = (ctx <= self.window) & (cty <= self.window)
+            ctx = ctx[inside]
+            cty = cty[inside]
+
+            scores = self.score(h - 1, k, ctx, cty)
+            order = np.argsort(-scores)
+            self.branch(zip(scores[order], [k] * len(order), ctx[order], cty[order]), h - 1)
+
+    def covariance(self, yaws, prior_x, prior_y):
+        '''
+            Returns the covariance of the best pose from the scores over the whole search window, sampled every
+            few cells and rotations. Each score is treated as a log likelihood of every point, so that poses which
+            score nearly as well as the best, such as those sliding along a circular road, widen the covariance.
+        '''
+
+        offsets = np.arange(-self.window, self.window + 1, self.covariance_stride)
+        tx, ty = np.meshgrid(offsets, offsets)
+        tx = tx.ravel()
+        ty = ty.ravel()
+
+        rotations = np.arange(0, len(yaws), self.covariance_stride)
+        scores = np.array([self.score(0, k, tx, ty) for k in rotations])
+        points = len(self.cells[0][0])
+
+        weights = np.exp((scores - self.best_score) * points / self.covariance_scale)
+        weights /= np.sum(weights)
+
+        samples = np.vstack((np.tile(prior_x + tx * self.resolution, len(rotations)),
+                             np.tile(prior_y + ty * self.resolution, len(rotations)),
+                             np.repeat(yaws[rotations], len(tx))))
+
+        mean = samples.dot(weights.ravel())
+        deviation = samples - mean[:, None]
+        covariance = (deviation * weights.ravel()).dot(deviation.T)
+
+        # Every sample stands for a cell of the search grid, whose own spread is added
+        spacing = np.array((self.resolution, self.resolution, self.angular_step)) * self.covariance_stride
+
+        return covariance + np.diag(spacing ** 2 / 12.0)
@@ -0,0 +1,146 @@
+import time
+import numpy as np
+
+from utils.timing_stats import TimingStats
+
+class ScanPreprocessor:
+
+    def __init__(self, resolution, downsampling='angular', median_window=3, median_threshold=1.0, shadow_min_angle=0.1,
+                 range_caps=()):
+        '''
+            Filters the beams of a scan before they are integrated into an occupancy grid. Every stage is an array
+            operation over the whole scan, and they are applied in this order:
+
+                1. NaN and returns closer than range_min are removed, while inf and returns at or beyond
+                   range_max become misses at range_max, which still clear the cells along their beam
+                2. Returns which differ from the median of their neighbouring beams are removed
+                3. Shadow returns, which lie on a line nearly parallel to their beam behind an edge, are removed
+                4. Returns beyond the range cap of their sector are shortened to the cap and become misses
+                5. Beams are downsampled so that neighbouring returns are about a grid cell apart
+
+            Arguments:
+                resolution          - Size of a grid cell, which sets the spacing of the downsampled returns
+                downsampling        - 'angular' keeps a beam for every cell of arc, 'voxel' keeps a return for every
+                                      cell of the vehicle frame, and 'none' keeps every beam
+                median_window       - Number of beams in the median filter, or 0 to disable it
+                median_threshold    - Largest difference from the median, in metres, of a kept return
+                shadow_min_angle    - Smallest angle, in radians, between a beam and the line to the return of its
+                                      neighbour, or 0 to disable the shadow filter
+                range_caps          - List of (angle_min, angle_max, range) sectors, in radians from the front of the lidar
+        '''
+
+        if downsampling not in ('angular', 'voxel', 'none'):
+            raise Exception("Unknown scan downsampling '{}'. Use angular, voxel or none.".format(downsampling))
+
+        self.resolution = resolution
+        self.downsampling = downsampling
+        self.median_window = median_window
+        self.median_threshold = median_threshold
+        self.shadow_min_angle = shadow_min_angle
+        self.range_caps = [tuple(cap) for cap in range_caps]
+
+        self.stats = [TimingStats("Range masking"), TimingStats("Median filter"), TimingStats("Shadow filter"),
+                      TimingStats("Range caps"), TimingStats("Downsampling")]
+        self.beams_in = 0
+        self.beams_out = 0
+
+    def process(self, ranges, range_min, range_max, geometry):
+        '''
+            Returns the indices of the kept beams, their ranges and whether each range ends on a return
+
+            Arguments:
+                ranges                  - Ranges of every beam of the scan
+                range_min, range_max    - Valid range of the lidar
+                geometry                - ScanGeometry of the scan
+        '''
+
+        stamps = [time.time()]
+
+        # 1. Invalid range masking
+        ranges = np.array(ranges, dtype=float)
+
+        # An empty scan keeps no beams, and the median filter cannot pad it
+        if len(ranges) == 0:
+            return np.zeros(0, dtype=int), ranges, np.zeros(0, dtype=bool)
+
+        keep = ~np.isnan(ranges) & (ranges >= range_min)
+        hits = keep & (ranges < range_max)
+        ranges[keep & ~hits] = range_max
+        stamps.append(time.time())
+
+        # 2. Median filter, where misses count as returns at range_max
+        if self.median_window > 1:
+            half = self.median_window // 2
+            padded = np.pad(np.where(keep, ranges, range_max), half, 'edge')
+            windows = np.vstack([padded[k : k + len(ranges)] for k in range(0, 2 * half + 1)])
+            outliers = hits & (np.abs(ranges - np.median(windows, axis=0)) > self.median_threshold)
+            keep &= ~outliers
+            hits &= ~outliers
+
+        stamps.append(time.time())
+
+        # 3. Shadow filter on neighbouring returns, which removes the further return of each pair
+        if self.shadow_min_angle > 0.0 and len(ranges) > 1:
+            r1 = ranges[:-1]
+            r2 = ranges[1:]
+            increment = np.abs(geometry.angles[1] - geometry.angles[0])
+            angle = np.arctan2(r2 * np.sin(increment), r1 - r2 * np.cos(increment))
+            pair = hits[:-1] & hits[1:] & ((angle < self.shadow_min_angle) | (angle > np.pi - self.shadow_min_angle))
+
+            shadows = np.zeros(len(ranges), dtype=bool)
+            shadows[:-1] |= pair & (r1 > r2)
+            shadows[1:] |= pair & (r2 >= r1)
+            keep &= ~shadows
+            hits &= ~shadows
+
+        stamps.append(time.time())
+
+        # 4. Sector dependent range caps
+        for angle_min, angle_max, cap in self.range_caps:
+            capped = keep & (geometry.angles >= angle_min) & (geometry.angles <= angle_max) & (ranges > cap)
+            ranges[capped] = cap
+            hits &= ~capped
+
+        stamps.append(time.time())
+
+        # 5. Downsampling to the grid resolution, where returns and misses are downsampled separately
+        index = np.flatnonzero(keep)
+        kept_ranges = ranges[index]
+        kept_hits = hits[index]
+
+        if self.downsampling == 'angular' and len(index) > 0:
+            increment = np.abs(geometry.angles[1] - geometry.angles[0]) if len(geometry.angles) > 1 else 0.0
+            arc = kept_ranges * increment * np.diff(np.concatenate(([index[0]], index)))
+            cells = np.floor(np.cumsum(arc) / self.resolution).astype(int)
+            _, first = np.unique(cells * 2 + kept_hits, return_index=True)
+            first.sort()
+
+        elif self.downsampling == 'voxel' and len(index) > 0:
+            points = geometry.points(ranges)[:, index]
+            cells = np.floor(points / self.resolution).astype(int)
+
+            # Every miss is kept, since it clears the whole of its beam
+            returns = np.flatnonzero(kept_hits)
+            _, unique = np.unique(cells[0, returns] * 1000003 + cells[1, returns], return_index=True)
+            first = np.sort(np.concatenate((returns[unique], np.flatnonzero(~kept_hits))))
+
+        else:
+            first = np.arange(0, len(index))
+
+        index = index[first]
+        stamps.append(time.time())
+
+        for stats, start, end in zip(self.stats, stamps[:-1], stamps[1:]):
+            stats.add(end - start)
+
+        self.beams_in += len(ranges)
+        self.beams_out += len(index)
+
+        return index, ranges[index], hits[index]
+
+    def __str__(self):
+
+        reduction = float(self.beams_out) / self.beams_in if self.beams_in else 0.0
+
+        return "\n".join(["Scan preprocessing kept {:.1%} of {} beams".format(reduction, self.beams_in)] +
+                         ["    " + str(stats) for stats in self.stats])
@@ -0,0 +1,15 @@
+def find_sensor(sensors, name):
+    '''
+        Returns the parameters of a range sensor of the Bayesian occupancy filter, so that every node which reads
+        the same sensor takes its topic and extrinsic from a single place in the configuration file
+
+        Arguments:
+            sensors     - Sensor list of the bayesian_occupancy_filter parameters
+            name        - Name of the sensor
+    '''
+
+    for params in sensors:
+        if params.get("name") == name:
+            return params
+
+    raise Exception("Unknown sensor '{}'. Check the sensors of bayesian_occupancy_filter.".format(name))
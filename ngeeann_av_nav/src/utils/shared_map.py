@@ -0,0 +1,232 @@
+import os
+import mmap
+import time
+import tempfile
+import numpy as np
+
+# Segments are files in the shared memory filesystem, which readers on the same host map into their memory
+default_directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# Header of a segment, followed by the occupancy of every cell as an int8 from 0 to 100, in the row-major order
+# of nav_msgs/OccupancyGrid. The sequence is odd while the grid is being written.
+header_dtype = np.dtype([('magic', 'S4'), ('layout', '<u4'), ('sequence', '<u8'), ('width', '<u4'), ('height', '<u4'),
+                         ('resolution', '<f8'), ('origin_x', '<f8'), ('origin_y', '<f8'), ('stamp', '<f8'),
+                         ('reserved', 'V8')])
+magic = b'BOFM'
+layout = 1
+
+def segment_path(name, directory=default_directory):
+
+    ''' Returns the path of the file backing a named segment '''
+
+    return os.path.join(directory, name)
+
+class SharedMapWriter:
+
+    def __init__(self, name, width, height, resolution, origin_x, origin_y, directory=default_directory):
+        '''
+            Writes an occupancy grid to a named shared memory segment, guarded by a sequence lock. The sequence is
+            incremented before and after every write, so it is odd while the grid is being written and readers
+            detect a new map by its sequence alone. The segment is built under a temporary name and renamed into
+            place, so readers never see it half initialised, and a restarted writer replaces the segment of the
+            previous one.
+
+            The sequence lock relies on stores being seen in program order, which holds on x86.
+
+            Arguments:
+                name                    - Name of the segment
+                width, height           - Size of the grid, in cells
+                resolution              - Size of a grid cell
+                origin_x, origin_y      - Coordinates of the corner of the grid in the map frame
+                directory               - Directory of the shared memory filesystem
+        '''
+
+        self.path = segment_path(name, directory)
+        size = header_dtype.itemsize + width * height
+        temporary = '{}.{}'.format(self.path, os.getpid())
+
+        with open(temporary, 'w+b') as f:
+            f.truncate(size)
+            self.segment = mmap.mmap(f.fileno(), size)
+            self.inode = os.fstat(f.fileno()).st_ino
+
+        self.header = np.ndarray((), header_dtype, self.segment, 0)
+        self.header['magic'] = magic
+        self.header['layout'] = layout
+        self.header['sequence'] = 0
+        self.header['width'] = width
+        self.header['height'] = height
+        self.header['resolution'] = resolution
+        self.header['origin_x'] = origin_x
+        self.header['origin_y'] = origin_y
+
+        # Zero-copy view of the grid of the segment
+        self.grid = np.ndarray((height, width), np.int8, self.segment, header_dtype.itemsize)
+
+        os.rename(temporary, self.path)
+
+    def write(self, occupancy, stamp):
+        '''
+            Copies a grid into the segment and publishes it under the next even sequence
+
+            Arguments:
+                occupancy   - Array of shape (height, width) of the occupancy of each cell, from 0 to 100
+                stamp       - Time of the grid, in seconds
+        '''
+
+        sequence = int(self.header['sequence'])
+
+        self.header['sequence'] = sequence + 1
+        self.grid[...] = occupancy
+        self.header['stamp'] = stamp
+        self.header['sequence'] = sequence + 2
+
+    def close(self):
+
+        '''
+            Removes the segment, unless a restarted writer has replaced it with its own. Readers which have already
+            mapped it keep their mapping.
+        '''
+
+        try:
+            if os.stat(self.path).st_ino == self.inode:
+                os.remove(self.path)
+
+        except OSError:
+            pass
+
+class SharedMapReader:
+
+    def __init__(self, name, directory=default_directory):
+        '''
+            Maps an occupancy grid written by a SharedMapWriter on the same host. The grid is a zero-copy view of
+            the segment, so reading it does no deserialisation. A reader either copies it out with copy(), or reads
+            the view directly between begin() and validate(), and reads it again if validate() fails. Both give up
+            after a timeout, since a writer which dies during a write leaves the sequence odd until it is restarted.
+
+            version() maps the segment once it exists, and maps it again whenever the writer replaces it, so it is
+            called before the grid is read.
+
+            Arguments:
+                name        - Name of the segment
+                directory   - Directory of the shared memory filesystem
+        '''
+
+        self.path = segment_path(name, directory)
+        self.inode = None
+        self.segment = None
+        self.header = None
+        self.grid = None
+
+        self.width = None
+        self.height = None
+        self.resolution = None
+        self.origin_x = None
+        self.origin_y = None
+
+    def attach(self):
+
+        ''' Maps the segment if it exists and has not been mapped yet, or has been replaced. Returns whether it is mapped. '''
+
+        try:
+            inode = os.stat(self.path).st_ino
+
+        except OSError:
+            return self.segment is not None
+
+        if inode == self.inode:
+            return True
+
+        with open(self.path, 'rb') as f:
+            segment = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = np.ndarray((), header_dtype, segment, 0)
+
+        if header['magic'] != magic or header['layout'] != layout:
+            raise Exception("Shared memory segment {} is not an occupancy grid of layout {}.".format(self.path, layout))
+
+        self.inode = inode
+        self.segment = segment
+        self.header = header
+        self.width = int(header['width'])
+        self.height = int(header['height'])
+        self.resolution = float(header['resolution'])
+        self.origin_x = float(header['origin_x'])
+        self.origin_y = float(header['origin_y'])
+        self.grid = np.ndarray((self.height, self.width), np.int8, segment, header_dtype.itemsize)
+
+        return True
+
+    def version(self):
+
+        ''' Returns the sequence of the latest grid, which is 0 until the first grid is written, or None if there is no segment '''
+
+        if not self.attach():
+            return None
+
+        return int(self.header['sequence'])
+
+    def stamp(self):
+
+        ''' Returns the time of the latest grid, in seconds '''
+
+        return float(self.header['stamp'])
+
+    def begin(self, timeout=0.1):
+        '''
+            Waits until no write is in progress and returns the sequence, which validate() checks after a read, or
+            None if a write is still in progress after the timeout. The segment is mapped again whenever the
+            writer replaces it, so a restarted writer is picked up while waiting.
+
+            Arguments:
+                timeout     - Longest wait, in seconds
+        '''
+
+        deadline = time.time() + timeout
+
+        while True:
+            self.attach()
+            sequence = int(self.header['sequence'])
+
+            if not sequence & 1:
+                return sequence
+
+            if time.time() >= deadline:
+                return None
+
+            # Yields to the writer rather than spinning on the sequence
+            time.sleep(1e-4)
+
+    def validate(self, sequence):
+
+        ''' Returns whether the grid was not written since begin() returned the given sequence '''
+
+        return int(self.header['sequence']) == sequence
+
+    def copy(self, out, timeout=0.1):
+        '''
+            Copies a consistent grid into an array, retrying whenever a write overlaps the copy, and returns its
+            sequence and its time, in seconds. Returns None if no consistent grid could be copied within the
+            timeout, or if the segment was replaced by a grid of another size.
+
+            Arguments:
+                out         - Array of shape (height, width) and dtype int8
+                timeout     - Longest time spent retrying, in seconds
+        '''
+
+        deadline = time.time() + timeout
+
+        while True:
+            sequence = self.begin(max(deadline - time.time(), 0.0))
+
+            if sequence is None or self.grid.shape != out.shape:
+                return None
+
+            out[...] = self.grid
+            stamp = float(self.header['stamp'])
+
+            if self.validate(sequence):
+                return sequence, stamp
+
+            if time.time() >= deadline:
+                return None
@@ -0,0 +1,58 @@
+import numpy as np
+
+def arc_distances(points, curvature, half_width, front, rear, cg2rearaxle):
+    '''
+        Returns the distance the rear axle travels along an arc of constant curvature before the rectangular
+        footprint of the vehicle first touches each point, which is zero for points within the footprint and inf
+        for points the footprint never sweeps. The vehicle turns about a centre of rotation on the line of its
+        rear axle, and a point at radius rho from it is first touched by the leading corner or edge of the
+        footprint at that radius, or by the rear overhang as it swings out, so every point is resolved in a single
+        vectorised pass.
+
+        Arguments:
+            points          - Array of shape (2, N) of points in the vehicle frame, which faces the y-axis, relative
+                              to the centre of gravity
+            curvature       - Curvature of the arc, positive when turning left
+            half_width      - Half of the width of the footprint
+            front, rear     - Length of the footprint ahead of and behind the centre of gravity
+            cg2rearaxle     - Distance from the centre of gravity to the rear axle
+    '''
+
+    x = points[0]
+    y = points[1]
+    inside = (np.abs(x) <= half_width) & (y >= -rear) & (y <= front)
+
+    if abs(curvature) < 1e-6:
+        distance = np.where((np.abs(x) <= half_width) & (y >= -rear), np.maximum(y - front, 0.0), np.inf)
+
+    else:
+        # Turns to the right are mirrored into turns to the left, where u points from the centre of rotation
+        # towards the vehicle and v is along the heading
+        radius = 1.0 / abs(curvature)
+        u = radius + np.sign(curvature) * x
+        v = y + cg2rearaxle
+
+        rho = np.hypot(u, v)
+        theta = np.arctan2(v, u)
+
+        # The footprint spans u_min to u_max and reaches v_front ahead of the rear axle
+        u_min = max(radius - half_width, 0.0)
+        u_max = radius + half_width
+        v_front = front + cg2rearaxle
+        swept = (rho >= u_min) & (rho <= np.hypot(u_max, v_front))
+
+        # Leading point of the footprint at the radius of each point, on the front edge or on the inner side
+        v_lead = np.minimum(v_front, np.sqrt(np.maximum(rho ** 2 - u_min ** 2, 0.0)))
+        theta_lead = np.arctan2(v_lead, np.sqrt(np.maximum(rho ** 2 - v_lead ** 2, 0.0)))
+
+        distance = np.where(swept, radius * np.mod(theta - theta_lead, 2.0 * np.pi), np.inf)
+
+        # Beyond the outer side, the rear overhang swings out through a second arc of the footprint at that radius
+        v_rear = cg2rearaxle - rear
+        swing = (rho > u_max) & (rho <= np.hypot(u_max, v_rear))
+        theta_swing = -np.arccos(np.minimum(u_max / rho, 1.0))
+        distance = np.minimum(distance, np.where(swing, radius * np.mod(theta - theta_swing, 2.0 * np.pi), np.inf))
+
+    distance[inside] = 0.0
+
+    return distance
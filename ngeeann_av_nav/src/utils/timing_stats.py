@@ -0,0 +1,48 @@
+import threading
+import numpy as np
+
+class TimingStats:
+
+    def __init__(self, name, size=1000):
+        '''
+            Records the most recent timing samples of a node in a preallocated ring buffer. Samples may be added
+            from several callback threads, so adding and summarising are guarded by a lock.
+
+            Arguments:
+                name    - Label used when printing the statistics
+                size    - Number of samples kept for the statistics
+        '''
+
+        self.name = name
+        self.size = size
+        self.samples = np.zeros(size)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+
+        ''' Records a single sample, in seconds '''
+
+        with self.lock:
+            self.samples[self.count % self.size] = seconds
+            self.count += 1
+
+    def summary(self):
+
+        ''' Returns the mean, median, 99th percentile and maximum of the recorded samples, in seconds '''
+
+        with self.lock:
+            samples = self.samples[:min(self.count, self.size)].copy()
+
+        if len(samples) == 0:
+            return 0.0, 0.0, 0.0, 0.0
+        p50, p99 = np.percentile(samples, (50, 99))
+
+        return np.mean(samples), p50, p99, np.max(samples)
+
+    def __str__(self):
+
+        mean, p50, p99, peak = self.summary()
+
+        return "{}: mean {:.3f} ms | p50 {:.3f} ms | p99 {:.3f} ms | max {:.3f} ms".format(self.name, mean * 1e3, p50 * 1e3,
+                                                                                         p99 * 1e3, peak * 1e3)
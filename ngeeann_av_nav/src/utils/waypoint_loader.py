@@ -0,0 +1,91 @@
+import os
+import csv
+import numpy as np
+
+def sidecar_path(csv_path):
+    '''
+    Returns the path of the binary .npy sidecar belonging to a waypoint csv file.
+    '''
+    root, _ = os.path.splitext(csv_path)
+
+    return root + '.npy'
+
+def load_waypoints_csv(csv_path, x_column='X-axis', y_column='Y-axis'):
+    '''
+        Streams the rows of a waypoint csv file into preallocated NumPy arrays
+
+        Arguments:
+            csv_path            - Path to the waypoint csv file
+            x_column, y_column  - Header names of the columns holding the x and y coordinates
+    '''
+
+    # Count the data rows first so that the arrays are only allocated once
+    with open(csv_path, 'r') as f:
+        rows = sum(1 for line in f if line.strip()) - 1
+
+    ax = np.empty(max(rows, 0))
+    ay = np.empty(max(rows, 0))
+
+    with open(csv_path, 'r') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+
+        try:
+            x_id = header.index(x_column)
+            y_id = header.index(y_column)
+
+        except ValueError:
+            raise ValueError("Columns {} and {} not found in {}".format(x_column, y_column, csv_path))
+
+        n = 0
+        for row in reader:
+            if not row:
+                continue
+
+            ax[n] = float(row[x_id])
+            ay[n] = float(row[y_id])
+            n += 1
+
+    return ax[:n], ay[:n]
+
+def save_waypoints_npy(csv_path, ax, ay):
+    '''
+    Writes the waypoints as a (2, N) float64 array into the .npy sidecar of the csv file.
+    '''
+    path = sidecar_path(csv_path)
+    np.save(path, np.vstack((ax, ay)).astype(np.float64))
+
+    return path
+
+def load_waypoints(csv_path, x_column='X-axis', y_column='Y-axis', use_sidecar=True):
+    '''
+        Loads waypoints as two float64 NumPy arrays (ax, ay). If a .npy sidecar exists next to the csv file
+        and is at least as new as it, the sidecar is loaded instead of parsing the csv.
+
+        Arguments:
+            csv_path            - Path to the waypoint csv file
+            x_column, y_column  - Header names of the columns holding the x and y coordinates
+            use_sidecar         - Allows the binary sidecar to be used when it is up to date
+    '''
+
+    npy_path = sidecar_path(csv_path)
+
+    if use_sidecar and os.path.isfile(npy_path):
+        if not os.path.isfile(csv_path) or os.path.getmtime(npy_path) >= os.path.getmtime(csv_path):
+            waypoints = np.load(npy_path)
+            return waypoints[0], waypoints[1]
+
+    return load_waypoints_csv(csv_path, x_column, y_column)
+
+def main():
+
+    import sys
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'waypoints.csv'
+    ax, ay = load_waypoints_csv(csv_path)
+    npy_path = save_waypoints_npy(csv_path, ax, ay)
+
+    print("Wrote {} waypoints to {}".format(len(ax), npy_path))
+
+if __name__ == '__main__':
+    main()
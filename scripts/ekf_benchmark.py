@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ngeeann_av_nav', 'src'))
+
+from utils.ekf import ExtendedKalmanFilter
+from utils.timing_stats import TimingStats
+
+# Estimator parameters, as in navigation_params.yaml
+frequency = 100.0
+speed_var = 0.01
+yawrate_var = 0.01
+gyro_var = 0.0001
+process_noise = [0.01, 0.01, 0.001, 1.0, 0.1]
+
+# Sensor rates and noise
+odometry_rate = 30.0
+imu_rate = 100.0
+scan_match_rate = 10.0
+scan_match_var = (0.05, 0.05, 0.001)
+
+def main():
+
+    ''' Drives a lap of the circular road and fuses noisy sensors, timing every estimator cycle '''
+
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 120.0
+    radius = 103.67
+    vel = 10.0
+    yawrate = vel / radius
+    dt = 1.0 / frequency
+    random = np.random.RandomState(0)
+
+    ekf = ExtendedKalmanFilter([radius, 0.0, 0.0, 0.0, 0.0], [1.0, 1.0, 0.1, 1.0, 0.1], process_noise)
+    stats = TimingStats("Estimator cycle", size=int(duration * frequency))
+    errors = []
+
+    for n in range(0, int(duration * frequency)):
+        t = n * dt
+
+        # Ground truth on a counter-clockwise circle, with zero yaw facing the y-axis
+        yaw = yawrate * t
+        x = radius * np.cos(yaw)
+        y = radius * np.sin(yaw)
+
+        start = time.time()
+        ekf.predict(dt)
+
+        if n % int(frequency / odometry_rate) == 0:
+            ekf.update(3, vel + random.normal(0.0, np.sqrt(speed_var)), speed_var)
+            ekf.update(4, yawrate + random.normal(0.0, np.sqrt(yawrate_var)), yawrate_var)
+
+        if n % int(frequency / imu_rate) == 0:
+            ekf.update(4, yawrate + random.normal(0.0, np.sqrt(gyro_var)), gyro_var)
+
+        if n % int(frequency / scan_match_rate) == 0:
+            truth = (x, y, yaw % (2.0 * np.pi))
+
+            for i in range(0, 3):
+                ekf.update(i, truth[i] + random.normal(0.0, np.sqrt(scan_match_var[i])), scan_match_var[i])
+
+        stats.add(time.time() - start)
+        errors.append(np.hypot(ekf.x[0] - x, ekf.x[1] - y))
+
+    errors = np.array(errors[int(5.0 * frequency):])
+    mean, p50, p99, peak = stats.summary()
+
+    print(stats)
+    print("Sustainable rate     : {:.0f} Hz at the mean, {:.0f} Hz at the 99th percentile".format(1.0 / mean, 1.0 / p99))
+    print("Position error       : RMS {:.4f} m | max {:.4f} m".format(np.sqrt(np.mean(errors ** 2)), np.max(errors)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import sys
+import numpy as np
+
+from tracker_benchmark import simulate, frequency
+
+# Grid of the gain schedule
+speeds = [2.5, 5.0, 7.5, 10.0, 15.0, 20.0]
+curvatures = [0.0, 0.01, 0.02, 0.05, 0.1]
+
+# Candidate gains swept at every grid point
+control_gains = [0.25, 0.5, 1.0, 2.0, 4.0, 8.0]
+softening_gains = [0.5, 1.0, 2.0, 4.0, 8.0]
+
+# Weight of the steering rate in the tuning cost, which penalises oscillating gains
+steering_rate_weight = 0.05
+duration = 10.0
+
+# Initial offsets from the path, in metres to its right, which the cost of every candidate is averaged over,
+# so a single trajectory does not decide the gains
+initial_offsets = [-1.0, -0.5, 0.25, 0.5, 1.0]
+
+# Weight of the squared difference, in octaves, between the gains of neighbouring grid points. Costs are taken
+# relative to the best candidate of each grid point, so a step of one octave has to lower the tracking cost of
+# the grid point by 0.2% per neighbour. That keeps the softening gain rising with speed, while grid points whose
+# best candidate is less than that better than their neighbours' follow the neighbours instead.
+smoothness_weight = 0.002
+smoothing_passes = 20
+
+default_output = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ngeeann_av_nav', 'config', 'gain_schedule.yaml')
+
+def arc_path(curvature, length, ds=0.1):
+
+    ''' Returns a path of constant curvature starting at the origin, heading along the x-axis '''
+
+    s = np.arange(0.0, length, ds)
+    cyaw = curvature * s
+
+    if curvature == 0.0:
+        return s, np.zeros_like(s), cyaw
+
+    return np.sin(cyaw) / curvature, (1.0 - np.cos(cyaw)) / curvature, cyaw
+
+def tuning_cost(errors, commands):
+
+    steering_rate = np.diff(commands) * frequency
+
+    return np.sqrt(np.mean(errors ** 2)) + steering_rate_weight * np.sqrt(np.mean(steering_rate ** 2))
+
+def format_table(name, table):
+
+    rows = ["        - [{}]".format(", ".join("{:.2f}".format(g) for g in row)) for row in table]
+
+    return "    {}:\n{}\n".format(name, "\n".join(rows))
+
+def candidate_costs():
+
+    ''' Returns the tuning cost of every candidate at every grid point, averaged over the initial offsets '''
+
+    costs = np.zeros((len(speeds), len(curvatures), len(control_gains), len(softening_gains)))
+
+    for i, vel in enumerate(speeds):
+        for j, curvature in enumerate(curvatures):
+            cx, cy, cyaw = arc_path(curvature, vel * duration + 20.0)
+
+            for a, k in enumerate(control_gains):
+                for b, ksoft in enumerate(softening_gains):
+                    for offset in initial_offsets:
+                        errors, _, commands = simulate('stanley', cx, cy, cyaw, vel, duration, (k, ksoft), offset)
+                        costs[i, j, a, b] += tuning_cost(errors, commands) / len(initial_offsets)
+
+    return costs
+
+def regularised_choice(costs):
+    '''
+        Returns the indices of the candidate gains chosen at every grid point. Every grid point starts from the
+        candidate with the lowest relative cost over the whole grid, then every pass moves each grid point to the
+        candidate minimising its relative cost plus the smoothness penalty against its neighbours, until no choice
+        changes. Starting from a flat schedule, a grid point only departs from its neighbours where tracking
+        gains more than the step costs.
+
+        Arguments:
+            costs   - Array of shape (speeds, curvatures, control gains, softening gains) of the tuning costs
+    '''
+
+    relative = costs / costs.min(axis=(2, 3), keepdims=True) - 1.0
+    octaves_k = np.log2(control_gains)
+    octaves_soft = np.log2(softening_gains)
+    rows, cols = relative.shape[:2]
+
+    a, b = np.unravel_index(np.argmin(relative.sum(axis=(0, 1))), relative.shape[2:])
+    choice_k = np.full((rows, cols), a)
+    choice_soft = np.full((rows, cols), b)
+
+    for _ in range(0, smoothing_passes):
+        changed = False
+
+        for i in range(0, rows):
+            for j in range(0, cols):
+                penalty = np.zeros(relative.shape[2:])
+
+                for ni, nj in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+                    if 0 <= ni < rows and 0 <= nj < cols:
+                        penalty += (octaves_k[:, None] - octaves_k[choice_k[ni, nj]]) ** 2
+                        penalty += (octaves_soft[None, :] - octaves_soft[choice_soft[ni, nj]]) ** 2
+
+                a, b = np.unravel_index(np.argmin(relative[i, j] + smoothness_weight * penalty), penalty.shape)
+
+                if (a, b) != (choice_k[i, j], choice_soft[i, j]):
+                    choice_k[i, j], choice_soft[i, j] = a, b
+                    changed = True
+
+        if not changed:
+            break
+
+    return choice_k, choice_soft
+
+def main():
+
+    output = sys.argv[1] if len(sys.argv) > 1 else default_output
+
+    costs = candidate_costs()
+    choice_k, choice_soft = regularised_choice(costs)
+    control_table = np.array(control_gains)[choice_k]
+    softening_table = np.array(softening_gains)[choice_soft]
+
+    for i, vel in enumerate(speeds):
+        for j, curvature in enumerate(curvatures):
+            cost = costs[i, j, choice_k[i, j], choice_soft[i, j]]
+            print("Speed {:5.1f} m/s, curvature {:.3f}: control gain {:.2f}, softening gain {:.2f} "
+                  "(cost {:.4f}, best {:.4f})".format(vel, curvature, control_table[i, j], softening_table[i, j], cost,
+                                                      costs[i, j].min()))
+
+    with open(output, 'w') as f:
+        f.write("# Generated by scripts/gain_tuning.py\n")
+        f.write("gain_schedule:\n")
+        f.write("    speeds: [{}]\n".format(", ".join(str(v) for v in speeds)))
+        f.write("    curvatures: [{}]\n".format(", ".join(str(c) for c in curvatures)))
+        f.write(format_table("control_gain", control_table))
+        f.write(format_table("softening_gain", softening_table))
+
+    print("\nGain schedule written to {}".format(output))
+
+if __name__ == "__main__":
+    main()
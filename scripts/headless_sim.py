@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import yaml
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(root, 'ngeeann_av_nav', 'src'))
+sys.path.insert(0, os.path.join(root, 'ngeeann_av_nav', 'nodes'))
+
+from utils.inprocess_rospy import InProcessRospy, TopicBus, SimClock, thread_cpu_time
+from utils.timing_stats import TimingStats
+from utils.raycast import raycast_circles
+from utils.roadmap import barrier_rings
+
+# The stand-in has to replace rospy before any node module is imported
+rospy = InProcessRospy(TopicBus(), {}, SimClock())
+rospy.install()
+
+from ngeeann_av_msgs.msg import State2D, AckermannDriveStamped
+from sensor_msgs.msg import LaserScan
+from std_msgs.msg import Float64
+
+from globalplanner import GlobalPathPlanner
+from localplanner import LocalPathPlanner
+from tracker import PathTracker
+from bof import GridMapping
+from safety_monitor import SafetyMonitor
+
+# Obstacles of populated_road.world, approximated as cylinders (x, y, radius)
+barrier_cylinders = [(105.296, 7.73075, 1.2), (95.0666, 36.2265, 1.5), (108.756, 0.343662, 0.3)]
+
+# Hokuyo parameters, as in hokuyo.xacro
+lidar_samples = 720
+lidar_angle_min = -1.570796
+lidar_angle_max = 1.570796
+lidar_range_min = 0.10
+lidar_range_max = 30.0
+lidar_noise = 0.01
+lidar_rate = 40.0
+cg2lidar = 2.34
+
+# Vehicle parameters
+wheelbase = 2.531
+cg2frontaxle = 1.483
+steering_lag = 0.1
+
+class Vehicle:
+
+    def __init__(self, x, y, yaw):
+        '''
+            Kinematic bicycle model about the centre of gravity, with a first-order steering actuator and an
+            acceleration limited drive. The yaw follows the State2D convention, where zero faces the y-axis.
+        '''
+
+        self.x = x
+        self.y = y
+        self.yaw = yaw
+        self.vel = 0.0
+        self.yawrate = 0.0
+        self.steer = 0.0
+
+        self.cmd_steer = 0.0
+        self.cmd_speed = 0.0
+        self.cmd_accel = 0.0
+
+    def ackermann_cmd_cb(self, msg):
+
+        self.cmd_steer = msg.drive.steering_angle
+        self.cmd_speed = msg.drive.speed
+        self.cmd_accel = msg.drive.acceleration
+
+    def step(self, dt):
+
+        self.steer += (self.cmd_steer - self.steer) * dt / steering_lag
+
+        if self.cmd_accel > 0.0:
+            self.vel += np.clip(self.cmd_speed - self.vel, -self.cmd_accel * dt, self.cmd_accel * dt)
+
+        else:
+            self.vel = self.cmd_speed
+
+        lr = wheelbase - cg2frontaxle
+        beta = np.arctan(lr * np.tan(self.steer) / wheelbase)
+        heading = self.yaw + 0.5 * np.pi
+        yawrate = self.vel * np.cos(beta) * np.tan(self.steer) / wheelbase
+
+        self.x += self.vel * np.cos(heading + beta) * dt
+        self.y += self.vel * np.sin(heading + beta) * dt
+        self.yaw = (self.yaw + yawrate * dt) % (2.0 * np.pi)
+        self.yawrate = yawrate
+
+    def to_message(self):
+
+        state2d = State2D()
+        state2d.pose.x = self.x
+        state2d.pose.y = self.y
+        state2d.pose.theta = self.yaw
+        state2d.twist.x = self.vel * -np.sin(self.yaw)
+        state2d.twist.y = self.vel * np.cos(self.yaw)
+        state2d.twist.w = -self.yawrate
+
+        return state2d
+
+class Lidar:
+
+    def __init__(self, rings, cylinders, seed=0):
+        '''
+            Simulated planar LiDAR which ray-casts every beam against the barrier rings and cylinders at once
+
+            Arguments:
+                rings       - List of (inner radius, outer radius, value) of ring barriers centred on the origin
+                cylinders   - List of (x, y, radius) of cylindrical obstacles
+        '''
+
+        # Every ring contributes its inner and outer wall as a circle centred on the origin
+        circles = [(0.0, 0.0, r) for ring in rings for r in ring[:2]] + list(cylinders)
+        self.circles = np.array(circles)
+
+        self.angles = np.linspace(lidar_angle_min, lidar_angle_max, lidar_samples)
+        self.increment = (lidar_angle_max - lidar_angle_min) / (lidar_samples - 1)
+        self.random = np.random.RandomState(seed)
+
+    def scan(self, vehicle):
+
+        heading = vehicle.yaw + 0.5 * np.pi
+        ox = vehicle.x + cg2lidar * -np.sin(vehicle.yaw)
+        oy = vehicle.y + cg2lidar * np.cos(vehicle.yaw)
+
+        ranges = raycast_circles(ox, oy, heading + self.angles, self.circles, lidar_range_min)
+        ranges = ranges + self.random.normal(0.0, lidar_noise, ranges.shape)
+        ranges[ranges > lidar_range_max] = np.inf
+
+        msg = LaserScan()
+        msg.header.frame_id = "hokuyo_link"
+        msg.header.stamp = rospy.Time.now()
+        msg.angle_min = lidar_angle_min
+        msg.angle_max = lidar_angle_max
+        msg.angle_increment = self.increment
+        msg.range_min = lidar_range_min
+        msg.range_max = lidar_range_max
+        msg.ranges = ranges.tolist()
+
+        return msg
+
+class Scheduler:
+
+    def __init__(self, rate):
+
+        ''' Fires at a fixed rate of simulated time '''
+
+        self.period = 1.0 / rate
+        self.next = 0.0
+
+    def due(self, t):
+
+        if t + 1e-9 >= self.next:
+            self.next += self.period
+            return True
+
+        return False
+
+def load_params(target_vel):
+
+    config = os.path.join(root, 'ngeeann_av_nav', 'config')
+    params = {}
+
+    for name in ('navigation_params.yaml', 'gain_schedule.yaml'):
+        with open(os.path.join(config, name), 'r') as f:
+            params.update(yaml.safe_load(f))
+
+    params['waypoints'] = os.path.join(root, 'ngeeann_av_nav', 'data', 'waypoints.csv')
+    params['local_path_planner']['target_velocity'] = target_vel
+
+    # The map is shared through a segment of this process, so a stack running on the same host is left alone
+    segment = 'headless_sim_{}'.format(os.getpid())
+    params['bayesian_occupancy_filter']['shared_memory'] = segment
+    params['local_path_planner']['shared_map'] = segment
+
+    return params
+
+class Quiet:
+
+    ''' Silences the per-cycle prints of the nodes '''
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+def timed(stats, cpu_time, name, step):
+
+    ''' Runs a cycle of a node, recording its wall time and adding its CPU time to the total of the node '''
+
+    start = time.time()
+    start_cpu = thread_cpu_time()
+    step()
+    cpu_time[name] = cpu_time.get(name, 0.0) + thread_cpu_time() - start_cpu
+    stats[name].add(time.time() - start)
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Runs the navigation stack in closed loop against a kinematic vehicle model")
+    parser.add_argument('--duration', type=float, default=60.0, help="simulated time in seconds")
+    parser.add_argument('--velocity', type=float, default=5.0, help="target velocity of the local planner")
+    parser.add_argument('--dt', type=float, default=0.01, help="physics time step in seconds")
+    parser.add_argument('--no-obstacles', action='store_true', help="only ray-cast against the barrier rings")
+    parser.add_argument('--verbose', action='store_true', help="show the prints of the nodes")
+    args = parser.parse_args()
+
+    rospy.params.update(load_params(args.velocity))
+    rospy.init_node('headless_sim')
+
+    vehicle = Vehicle(101.835, 0.0, 0.0)
+    lidar = Lidar(barrier_rings, [] if args.no_obstacles else barrier_cylinders)
+    rospy.Subscriber('/ngeeann_av/ackermann_cmd', AckermannDriveStamped, vehicle.ackermann_cmd_cb)
+
+    state_pub = rospy.Publisher('/ngeeann_av/state2D', State2D, queue_size=10)
+    scan_pub = rospy.Publisher('/laser/scan', LaserScan, queue_size=10)
+
+    with Quiet():
+        global_planner = GlobalPathPlanner()
+        local_planner = LocalPathPlanner()
+        path_tracker = PathTracker()
+        gridmapping = GridMapping()
+        safety_monitor = SafetyMonitor()
+
+    # Shortest time to collision seen by the safety monitor
+    ttc = [np.inf]
+    rospy.Subscriber('/ngeeann_av/time_to_collision', Float64, lambda msg: ttc.__setitem__(0, min(ttc[0], msg.data)))
+
+    # Node rates, as in the nodes' main functions
+    state_timer = Scheduler(rospy.get_param('/localisation/update_frequency'))
+    scan_timer = Scheduler(lidar_rate)
+    bof_timer = Scheduler(10.0)
+    global_timer = Scheduler(global_planner.frequency)
+    local_timer = Scheduler(local_planner.frequency)
+    tracker_timer = Scheduler(path_tracker.frequency)
+
+    stats = {
+        'GridMapping': TimingStats("GridMapping cycle"),
+        'GlobalPathPlanner': TimingStats("GlobalPathPlanner cycle"),
+        'LocalPathPlanner': TimingStats("LocalPathPlanner cycle"),
+        'PathTracker': TimingStats("PathTracker cycle")
+    }
+
+    # Exact CPU time spent in the cycles of every node, in seconds
+    cpu_time = {}
+
+    crosstrack_errors = []
+    heading = np.arctan2(vehicle.y, vehicle.x)
+    travelled_angle = 0.0
+
+    wall_start = time.time()
+    quiet = None if args.verbose else Quiet()
+
+    if quiet:
+        quiet.__enter__()
+
+    try:
+        while rospy.clock.now() < args.duration:
+            t = rospy.clock.now()
+
+            if state_timer.due(t):
+                state_pub.publish(vehicle.to_message())
+
+            if scan_timer.due(t):
+                scan_pub.publish(lidar.scan(vehicle))
+
+            rospy.bus.spin_once()
+
+            if bof_timer.due(t) and gridmapping.x is not None:
+                timed(stats, cpu_time, 'GridMapping', gridmapping.update)
+
+            if global_timer.due(t) and global_planner.x is not None:
+                timed(stats, cpu_time, 'GlobalPathPlanner', global_planner.set_waypoints)
+
+            rospy.bus.spin_once()
+
+            if local_timer.due(t) and local_planner.ax and local_planner.update_map():
+                def local_cycle():
+                    local_planner.create_pub_path()
+                    local_planner.target_vel_pub.publish(local_planner.target_vel)
+
+                timed(stats, cpu_time, 'LocalPathPlanner', local_cycle)
+
+            rospy.bus.spin_once()
+
+            if tracker_timer.due(t):
+                timed(stats, cpu_time, 'PathTracker', path_tracker.update)
+
+                if path_tracker.target_idx is not None:
+                    crosstrack_errors.append(path_tracker.crosstrack_error)
+
+            rospy.bus.spin_once()
+
+            vehicle.step(args.dt)
+            rospy.clock.advance(args.dt)
+
+            new_heading = np.arctan2(vehicle.y, vehicle.x)
+            travelled_angle += np.arctan2(np.sin(new_heading - heading), np.cos(new_heading - heading))
+            heading = new_heading
+
+    finally:
+        if quiet:
+            quiet.__exit__()
+
+        if gridmapping.shared_map is not None:
+            gridmapping.shared_map.close()
+
+    wall_time = time.time() - wall_start
+    errors = np.array(crosstrack_errors) if crosstrack_errors else np.zeros(1)
+
+    print("Simulated time       : {:.1f} s in {:.1f} s of wall time ({:.1f}x real time)".format(args.duration, wall_time,
+                                                                                               args.duration / wall_time))
+    print("Laps completed       : {:.3f}".format(travelled_angle / (2.0 * np.pi)))
+    print("Tracking error       : RMS {:.4f} m | max {:.4f} m".format(np.sqrt(np.mean(errors ** 2)), np.max(np.abs(errors))))
+    print("\nPlanning cycle timing")
+
+    for name in ('GridMapping', 'GlobalPathPlanner', 'LocalPathPlanner', 'PathTracker'):
+        print("    {}".format(stats[name]))
+
+    print("\nGridMapping stages")
+    gridmapping.print_stats()
+
+    print("\nSafety monitor")
+    print("    Emergency brakes: {} | shortest time to collision: {:.2f} s".format(safety_monitor.brakes, ttc[0]))
+    print("    {}".format(safety_monitor.decision_stats))
+
+    print("\nSensor to actuation latency")
+
+    for tracer in (gridmapping.tracer, local_planner.tracer, path_tracker.tracer):
+        print("    " + str(tracer).replace("\n", "\n    "))
+
+    print("\nCPU time per node, in its cycles and callbacks")
+
+    for name in ('GridMapping', 'GlobalPathPlanner', 'LocalPathPlanner', 'PathTracker', 'SafetyMonitor'):
+        total = cpu_time.get(name, 0.0) + rospy.bus.callback_cpu_time.get(name, 0.0)
+        print("    {:<18}: {:.3f} s ({:.1f}% of simulated time)".format(name, total, 100.0 * total / args.duration))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import sys
+import time
+import numpy as np
+import yaml
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(root, 'ngeeann_av_nav', 'src'))
+sys.path.insert(0, os.path.join(root, 'ngeeann_av_nav', 'nodes'))
+
+from utils.inprocess_rospy import InProcessRospy, TopicBus, SimClock
+from utils.point_cloud import cloud_array, height_band
+from utils.raycast import raycast_circles
+from utils.roadmap import barrier_rings
+from utils.timing_stats import TimingStats
+
+# The stand-in has to replace rospy before any node module is imported
+rospy = InProcessRospy(TopicBus(), {}, SimClock())
+rospy.install()
+
+from sensor_msgs.msg import PointCloud2, PointField
+
+from bof import GridMapping
+
+# A 32 layer lidar, with the point layout of a Velodyne driver: x, y, z, padding, intensity and ring
+layers = 32
+azimuths = 1800
+elevation_min = -0.27
+elevation_max = 0.27
+range_max = 100.0
+sensor_height = 1.9
+cg2sensor = 2.34
+frequency = 10.0
+
+def synthetic_cloud(x, y, yaw, circles):
+
+    ''' Ray-casts a multi-layer lidar at the given pose against the ground and the barrier walls '''
+
+    azimuth = np.linspace(-np.pi, np.pi, azimuths, endpoint=False)
+    elevation = np.linspace(elevation_min, elevation_max, layers)
+
+    # Sensor position, and the direction of every azimuth in the world frame, where the sensor faces its x-axis
+    ox = x + cg2sensor * -np.sin(yaw)
+    oy = y + cg2sensor * np.cos(yaw)
+    planar = raycast_circles(ox, oy, yaw + 0.5 * np.pi + azimuth, circles, 0.5)
+
+    # Beams which reach the ground before the walls return from the ground
+    with np.errstate(divide='ignore'):
+        ground = np.where(elevation < 0.0, sensor_height / -np.tan(elevation), np.inf)
+
+    horizontal = np.minimum(planar[None, :], ground[:, None])
+    horizontal = np.minimum(horizontal, range_max * np.cos(elevation)[:, None])
+    invalid = horizontal >= range_max * np.cos(elevation)[:, None]
+
+    points = np.zeros((layers, azimuths), dtype=[('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('pad', '<f4'),
+                                                  ('intensity', '<f4'), ('ring', '<u2'), ('pad2', 'V10')])
+    points['x'] = horizontal * np.cos(azimuth)[None, :]
+    points['y'] = horizontal * np.sin(azimuth)[None, :]
+    points['z'] = np.maximum(horizontal * np.tan(elevation)[:, None], -sensor_height)
+    points['intensity'] = 100.0
+    points['ring'] = np.arange(0, layers)[:, None]
+
+    for name in ('x', 'y', 'z'):
+        points[name][invalid] = np.nan
+
+    fields = [PointField('x', 0, 7, 1), PointField('y', 4, 7, 1), PointField('z', 8, 7, 1),
+              PointField('intensity', 16, 7, 1), PointField('ring', 20, 4, 1)]
+
+    return PointCloud2(height=layers, width=azimuths, fields=fields, is_bigendian=False, point_step=32,
+                       row_step=32 * azimuths, data=points.tobytes(), is_dense=False)
+
+def main():
+
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    with open(os.path.join(root, 'ngeeann_av_nav', 'config', 'navigation_params.yaml'), 'r') as f:
+        rospy.params.update(yaml.safe_load(f))
+
+    rospy.params['bayesian_occupancy_filter']['sensors'] = [{'name': 'lidar', 'model': 'point_cloud', 'topic': '/points',
+                                                             'extrinsic': [0.0, cg2sensor, 0.0], 'sensor_height': sensor_height,
+                                                             'min_height': 0.3, 'max_height': 2.5}]
+
+    gridmapping = GridMapping()
+    sensor = gridmapping.sensors[0]
+    circles = np.array([(0.0, 0.0, r) for ring in barrier_rings for r in ring[:2]])
+
+    decode = TimingStats("Zero-copy decode", size=trials)
+    band = TimingStats("Height band", size=trials)
+    total = TimingStats("Point cloud integration", size=trials)
+    kept = 0
+
+    for i in range(0, trials):
+        phi = 0.1 + 1.3 * i / trials
+        gridmapping.x = 103.0 * np.cos(phi)
+        gridmapping.y = 103.0 * np.sin(phi)
+        gridmapping.yaw = phi
+        cloud = synthetic_cloud(gridmapping.x, gridmapping.y, gridmapping.yaw, circles)
+
+        start = time.time()
+        points = cloud_array(cloud)
+        decode.add(time.time() - start)
+
+        start = time.time()
+        kept += height_band(points, sensor.sensor_height, sensor.min_height, sensor.max_height).shape[1]
+        band.add(time.time() - start)
+
+        start = time.time()
+        gridmapping.gmap.set_cells(gridmapping.frame_transform(sensor.points(cloud)), 0.5)
+        total.add(time.time() - start)
+
+    mean = total.summary()[0]
+
+    print("Cloud size           : {} points, {:.0f} points/s at {:.0f} Hz".format(layers * azimuths,
+                                                                              layers * azimuths * frequency, frequency))
+    print("Points in the band   : {:.1%}".format(kept / float(trials * layers * azimuths)))
+    print(decode)
+    print(band)
+    print(total)
+    print("Throughput           : {:.2f} million points/s, {:.1%} of the {:.0f} Hz budget".format(
+          layers * azimuths / mean / 1e6, mean * frequency, frequency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ngeeann_av_nav', 'src'))
+
+from utils.normalise_angle import normalise_angle
+from utils.raycast import raycast_circles
+from utils.roadmap import roadmap_grid, barrier_rings
+from utils.scan_matcher import ScanMatcher
+from utils.timing_stats import TimingStats
+
+# Map and matcher parameters, as in navigation_params.yaml
+resolution = 0.2
+occupied_threshold = 0.8
+sigma = 0.2
+max_distance = 1.0
+depth = 3
+linear_window = 1.0
+angular_window = 0.1
+covariance_scale = 5.0
+
+# Hokuyo parameters, as in hokuyo.xacro
+lidar_samples = 720
+lidar_range_min = 0.10
+lidar_range_max = 30.0
+lidar_noise = 0.01
+cg2lidar = 2.34
+
+# Obstacles of populated_road.world, approximated as cylinders (x, y, radius), which are absent from the map
+cylinders = [(105.296, 7.73075, 1.2), (95.0666, 36.2265, 1.5), (108.756, 0.343662, 0.3)]
+
+def scan_points(x, y, yaw, circles, angles, random):
+
+    ''' Simulates a scan from the given pose and returns its points in the vehicle frame, which faces the y-axis '''
+
+    ox = x + cg2lidar * -np.sin(yaw)
+    oy = y + cg2lidar * np.cos(yaw)
+
+    ranges = raycast_circles(ox, oy, yaw + 0.5 * np.pi + angles, circles, lidar_range_min)
+    ranges = ranges + random.normal(0.0, lidar_noise, ranges.shape)
+    valid = ranges < lidar_range_max
+
+    return np.vstack((-ranges[valid] * np.sin(angles[valid]), ranges[valid] * np.cos(angles[valid]) + cg2lidar))
+
+def main():
+
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    random = np.random.RandomState(0)
+
+    start = time.time()
+    roadmap = roadmap_grid(resolution=resolution)
+    matcher = ScanMatcher(roadmap >= occupied_threshold, resolution, 0.0, 0.0, sigma, max_distance, depth, linear_window,
+                          angular_window, covariance_scale)
+    print("Likelihood field and pyramid built in {:.3f} s".format(time.time() - start))
+
+    circles = np.array([(0.0, 0.0, r) for ring in barrier_rings for r in ring[:2]] + cylinders)
+    angles = np.linspace(-0.5 * np.pi, 0.5 * np.pi, lidar_samples)
+
+    stats = TimingStats("Match time", size=trials)
+    radial = []
+    along = []
+    heading = []
+    radial_std = []
+    along_std = []
+    evaluations = []
+    failures = 0
+
+    for _ in range(0, trials):
+        # Poses along the road within the first quadrant, which is all the map covers
+        phi = random.uniform(0.1, 1.45)
+        r = random.uniform(101.5, 105.5)
+        x = r * np.cos(phi)
+        y = r * np.sin(phi)
+        yaw = phi + random.normal(0.0, 0.02)
+
+        points = scan_points(x, y, yaw, circles, angles, random)
+
+        # Priors offset within the search window, as a drifting estimate would be
+        px = x + np.clip(random.normal(0.0, 0.3), -0.9, 0.9)
+        py = y + np.clip(random.normal(0.0, 0.3), -0.9, 0.9)
+        pyaw = yaw + np.clip(random.normal(0.0, 0.03), -0.09, 0.09)
+
+        begin = time.time()
+        result = matcher.match(points, px, py, pyaw)
+        stats.add(time.time() - begin)
+
+        if result is None:
+            failures += 1
+            continue
+
+        pose, score, covariance = result
+        dx = pose[0] - x
+        dy = pose[1] - y
+
+        radial.append(dx * np.cos(phi) + dy * np.sin(phi))
+        along.append(-dx * np.sin(phi) + dy * np.cos(phi))
+        heading.append(normalise_angle(pose[2] - yaw))
+
+        normal = np.array((np.cos(phi), np.sin(phi)))
+        tangent = np.array((-np.sin(phi), np.cos(phi)))
+        radial_std.append(np.sqrt(normal.dot(covariance[0:2, 0:2]).dot(normal)))
+        along_std.append(np.sqrt(tangent.dot(covariance[0:2, 0:2]).dot(tangent)))
+        evaluations.append((matcher.search_evaluations, matcher.exhaustive))
+
+    evaluations = np.array(evaluations)
+    radial = np.array(radial)
+    along = np.array(along)
+    heading = np.array(heading)
+
+    print(stats)
+    print("Matches per second   : {:.1f}".format(1.0 / stats.summary()[0]))
+    print("Candidates scored    : {:.0f} per match on average, against {:.0f} for an exhaustive search".format(
+          np.mean(evaluations[:, 0]), np.mean(evaluations[:, 1])))
+    print("Failed matches       : {} of {}".format(failures, trials))
+    print("Radial error         : RMS {:.4f} m | max {:.4f} m | predicted std {:.4f} m".format(
+          np.sqrt(np.mean(radial ** 2)), np.max(np.abs(radial)), np.median(radial_std)))
+    print("Along-track error    : RMS {:.4f} m | max {:.4f} m | predicted std {:.4f} m".format(
+          np.sqrt(np.mean(along ** 2)), np.max(np.abs(along)), np.median(along_std)))
+    print("Heading error        : RMS {:.4f} rad | max {:.4f} rad".format(np.sqrt(np.mean(heading ** 2)),
+                                                                       np.max(np.abs(heading))))
+
+if __name__ == "__main__":
+    main()
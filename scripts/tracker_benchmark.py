@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import sys
+import time
+import yaml
+import numpy as np
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(root, 'ngeeann_av_nav', 'src'))
+sys.path.insert(0, os.path.join(root, 'ngeeann_av_nav', 'nodes'))
+
+from utils.inprocess_rospy import InProcessRospy, TopicBus, SimClock
+from utils.cubic_spline_interpolator import generate_cubic_path
+from utils.waypoint_loader import load_waypoints
+
+# The stand-in has to replace rospy before the tracker is imported
+rospy = InProcessRospy(TopicBus(), {}, SimClock())
+rospy.install()
+
+from ngeeann_av_msgs.msg import State2D, Path2D, AckermannDriveStamped
+from geometry_msgs.msg import Pose2D
+from std_msgs.msg import Float64
+
+from tracker import PathTracker
+
+config = os.path.join(root, 'ngeeann_av_nav', 'config')
+
+for name in ('navigation_params.yaml', 'gain_schedule.yaml'):
+    with open(os.path.join(config, name), 'r') as f:
+        rospy.params.update(yaml.safe_load(f))
+
+# Vehicle and controller parameters, as the tracker loads them
+cg2frontaxle = rospy.get_param('/vehicle/centreofgravity_to_frontaxle')
+wheelbase = rospy.get_param('/vehicle/wheelbase')
+frequency = rospy.get_param('/path_tracker/update_frequency')
+tracker_params = rospy.get_param('/path_tracker')
+
+steering_lag = 0.1  # First-order time constant of the steering actuator. Unit: second.
+actuation_delay = 0.1  # Delay between a command being computed and reaching the actuator. Unit: second.
+
+def path_message(cx, cy, cyaw):
+
+    path = Path2D()
+    path.header.frame_id = "map"
+    path.header.stamp = rospy.Time.now()
+    path.poses = [Pose2D(x, y, yaw) for x, y, yaw in zip(cx, cy, cyaw)]
+
+    return path
+
+def state_message(x, y, yaw, vel, yawrate):
+
+    state2d = State2D()
+    state2d.pose.x = x
+    state2d.pose.y = y
+    state2d.pose.theta = yaw
+    state2d.twist.x = vel * -np.sin(yaw)
+    state2d.twist.y = vel * np.cos(yaw)
+    state2d.twist.w = yawrate
+
+    return state2d
+
+def simulate(controller, cx, cy, cyaw, vel, duration, gains=None, offset=0.5):
+
+    '''
+        Runs PathTracker against a kinematic bicycle model along the path, starting offset metres to the right of
+        it, and returns the crosstrack errors, control cycle times and steering commands. The Stanley gains are
+        fixed to the given pair, or taken from the configuration file if there is none.
+    '''
+
+    # Every run starts from a fresh bus and clock, with the tracker parameters of the run
+    rospy.bus = TopicBus()
+    rospy.clock = SimClock()
+    rospy.params['path_tracker'] = dict(tracker_params, controller=controller)
+
+    if gains is not None:
+        rospy.params['path_tracker'].update(control_gain=gains[0], softening_gain=gains[1], gain_scheduling=False)
+
+    tracker = PathTracker()
+
+    commands = []
+    rospy.Subscriber('/ngeeann_av/ackermann_cmd', AckermannDriveStamped,
+                     lambda msg: commands.append(msg.drive.steering_angle))
+
+    rospy.Publisher('/ngeeann_av/path', Path2D).publish(path_message(cx, cy, cyaw))
+    rospy.Publisher('/ngeeann_av/target_velocity', Float64).publish(Float64(vel))
+    state_pub = rospy.Publisher('/ngeeann_av/state2D', State2D)
+
+    dt = 1.0 / frequency
+    lr = wheelbase - cg2frontaxle
+
+    # Start off the path, with the heading convention of State2D
+    x = cx[0] + offset * np.cos(cyaw[0] - 0.5 * np.pi)
+    y = cy[0] + offset * np.sin(cyaw[0] - 0.5 * np.pi)
+    yaw = cyaw[0] - 0.5 * np.pi
+    steer = 0.0
+    yawrate = 0.0
+
+    delayed = [0.0] * max(int(round(actuation_delay * frequency)), 1)
+    errors = []
+    cycle_times = []
+
+    for _ in range(0, int(duration * frequency)):
+        state_pub.publish(state_message(x, y, yaw, vel, yawrate))
+        rospy.bus.spin_once()
+
+        start = time.time()
+        tracker.update()
+        cycle_times.append(time.time() - start)
+
+        rospy.bus.spin_once()
+
+        if tracker.target_idx + 3 >= len(cx):
+            cycle_times.pop()
+            commands.pop()
+            break
+
+        errors.append(tracker.crosstrack_error)
+
+        # Actuation delay, steering actuator lag and kinematic bicycle model about the centre of gravity
+        delayed.append(commands[-1])
+        steer += (delayed.pop(0) - steer) * dt / steering_lag
+        beta = np.arctan(lr * np.tan(steer) / wheelbase)
+        heading = yaw + 0.5 * np.pi
+        x += vel * np.cos(heading + beta) * dt
+        y += vel * np.sin(heading + beta) * dt
+        yaw += vel * np.cos(beta) * np.tan(steer) / wheelbase * dt
+
+        # Yaw rate with the sign convention of State2D
+        yawrate = -vel * np.cos(beta) * np.tan(steer) / wheelbase
+
+        rospy.clock.advance(dt)
+
+    return np.array(errors), np.array(cycle_times), np.array(commands)
+
+def main():
+
+    ax, ay = load_waypoints(os.path.join(root, 'ngeeann_av_nav', 'data', 'waypoints.csv'))
+    cx, cy, cyaw, _ = generate_cubic_path(ax.tolist(), ay.tolist(), 0.1)
+    cx, cy, cyaw = np.array(cx), np.array(cy), np.array(cyaw)
+
+    speeds = [float(v) for v in sys.argv[1:]] or [5.0, 10.0, 15.0, 20.0]
+
+    print("{:>8} {:>14} {:>14} {:>14} {:>14} {:>14}".format("Speed", "Mode", "RMS error (m)", "Max error (m)",
+                                                            "Mean cycle (ms)", "p99 cycle (ms)"))
+
+    for vel in speeds:
+        duration = (len(cx) * 0.1) / vel
+
+        for controller in ('stanley', 'pure_pursuit', 'mpc'):
+            errors, cycle_times, _ = simulate(controller, cx, cy, cyaw, vel, duration)
+
+            # The initial offset is excluded from the steady state errors
+            settled = errors[int(5.0 * frequency):]
+
+            print("{:>8.1f} {:>14} {:>14.4f} {:>14.4f} {:>14.3f} {:>14.3f}".format(vel, controller,
+                  np.sqrt(np.mean(settled ** 2)), np.max(np.abs(settled)),
+                  np.mean(cycle_times) * 1e3, np.percentile(cycle_times, 99) * 1e3))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import sys
+import timeit
+import subprocess
+
+utils_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ngeeann_av_nav', 'src', 'utils')
+default_csv = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ngeeann_av_nav', 'data', 'waypoints.csv')
+
+# Each loader is timed in a fresh interpreter so that the cost of importing its dependencies is included
+loaders = {
+    'pandas': "import pandas as pd; df = pd.read_csv(r'{csv}'); ax = df['X-axis'].values; ay = df['Y-axis'].values",
+    'csv stream': "import sys; sys.path.insert(0, r'{utils}'); from waypoint_loader import load_waypoints; ax, ay = load_waypoints(r'{csv}', use_sidecar=False)",
+    'npy sidecar': "import sys; sys.path.insert(0, r'{utils}'); from waypoint_loader import load_waypoints; ax, ay = load_waypoints(r'{csv}')"
+}
+
+def time_startup(statement, repeats):
+
+    times = []
+    devnull = open(os.devnull, 'w')
+
+    for _ in range(repeats):
+        start = timeit.default_timer()
+        code = subprocess.call([sys.executable, '-c', statement], stderr=devnull)
+        times.append(timeit.default_timer() - start)
+
+        if code != 0:
+            return None
+
+    return min(times)
+
+def main():
+
+    csv_path = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else os.path.abspath(default_csv)
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    sys.path.insert(0, utils_dir)
+    from waypoint_loader import load_waypoints_csv, save_waypoints_npy, sidecar_path
+
+    # Create the sidecar for the duration of the benchmark only, if one does not already exist
+    created_sidecar = not os.path.isfile(sidecar_path(csv_path))
+    ax, ay = load_waypoints_csv(csv_path)
+    save_waypoints_npy(csv_path, ax, ay)
+
+    baseline = time_startup('pass', repeats)
+    print("Waypoints: {} from {}".format(len(ax), csv_path))
+    print("Interpreter baseline: {:.1f} ms\n".format(baseline * 1000.0))
+
+    try:
+        for name in ('pandas', 'csv stream', 'npy sidecar'):
+            t = time_startup(loaders[name].format(csv=csv_path, utils=utils_dir), repeats)
+
+            if t is None:
+                print("{:<12}: unavailable".format(name))
+
+            else:
+                print("{:<12}: {:.1f} ms (+{:.1f} ms over baseline)".format(name, t * 1000.0, (t - baseline) * 1000.0))
+
+    finally:
+        if created_sidecar:
+            os.remove(sidecar_path(csv_path))
+
+if __name__ == "__main__":
+    main()